@@ -0,0 +1,116 @@
+"""
+Per-step overhead of the dynamic action models with many custom actions.
+
+Registers custom actions on a Controller, a third of them limited to some domains or pages,
+and repeats what Agent.step does before each LLM call: the action and done models for the
+page with their AgentOutput models, and the prompt descriptions of the page and of all
+unfiltered actions. Runs once with the models and descriptions cached, and once with the
+caches cleared before every step, the behavior without caching. Telemetry events are counted
+instead of sent.
+
+Usage:
+	python benchmarks/action_models.py [--actions 60] [--steps 50]
+"""
+
+import argparse
+import os
+import time
+from dataclasses import dataclass
+
+os.environ.setdefault('ANONYMIZED_TELEMETRY', 'false')
+
+from pydantic import BaseModel, Field
+
+from browser_use.agent.views import AgentOutput
+from browser_use.controller.service import Controller
+
+URLS = ['https://shop.example.com/cart', 'https://www.example.org/search?q=shoes', 'https://docs.example.net/guide']
+
+
+@dataclass
+class FakePage:
+	"""Only the url is read by the domain and page filters"""
+
+	url: str
+
+
+class CustomParams(BaseModel):
+	query: str = Field(description='What to look for')
+	limit: int = Field(10, description='Maximum number of results')
+	exact: bool = False
+	tags: list[str] = []
+
+
+def register_actions(controller: Controller, count: int) -> None:
+	for i in range(count):
+		kind = i % 3
+		domains = ['*.example.com'] if kind == 1 else None
+		page_filter = (lambda page: 'search' in page.url) if kind == 2 else None
+
+		async def action(params: CustomParams):
+			return None
+
+		action.__name__ = f'custom_action_{i}'
+		register = controller.registry.action(
+			f'Custom action number {i}', param_model=CustomParams, domains=domains, page_filter=page_filter
+		)
+		register(action)
+
+
+def step_overhead(controller: Controller, page: FakePage) -> None:
+	registry = controller.registry
+	action_model = registry.create_action_model(page=page)
+	AgentOutput.type_with_custom_actions(action_model)
+	done_model = registry.create_action_model(include_actions=['done'], page=page)
+	AgentOutput.type_with_custom_actions(done_model)
+	registry.get_prompt_description(page)
+	registry.get_prompt_description()
+
+
+def clear_caches(controller: Controller) -> None:
+	controller.registry._action_models.clear()
+	AgentOutput.type_with_custom_actions.cache_clear()
+	for action in controller.registry.registry.actions.values():
+		action._prompt_description = None
+
+
+def run(controller: Controller, steps: int, cached: bool) -> tuple[float, int]:
+	events = 0
+
+	def count_event(event) -> None:
+		nonlocal events
+		events += 1
+
+	controller.registry.telemetry.capture = count_event
+	clear_caches(controller)
+
+	start = time.perf_counter()
+	for step in range(steps):
+		if not cached:
+			clear_caches(controller)
+		step_overhead(controller, FakePage(URLS[step % len(URLS)]))
+	return (time.perf_counter() - start) / steps, events
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--actions', type=int, default=60)
+	parser.add_argument('--steps', type=int, default=50)
+	args = parser.parse_args()
+
+	controller = Controller()
+	register_actions(controller, args.actions)
+	total = len(controller.registry.registry.actions)
+	print(f'{total} registered actions ({args.actions} custom), {args.steps} steps over {len(URLS)} pages')
+
+	uncached, uncached_events = run(controller, args.steps, cached=False)
+	cached, cached_events = run(controller, args.steps, cached=True)
+
+	print(f'{"":<10} {"ms/step":>9} {"telemetry events":>17}')
+	print(f'{"uncached":<10} {uncached * 1000:>9.2f} {uncached_events:>17}')
+	print(f'{"cached":<10} {cached * 1000:>9.2f} {cached_events:>17}')
+	print(f'speedup {uncached / cached:.0f}x')
+
+
+if __name__ == '__main__':
+	main()
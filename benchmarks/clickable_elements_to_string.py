@@ -0,0 +1,166 @@
+"""
+Micro-benchmark for DOMElementNode.clickable_elements_to_string.
+
+Builds synthetic element trees and times the single-pass serializer against the
+previous implementation, which re-walked the subtree of every highlighted element
+and walked up to the root for every text node. The output of both is compared,
+and the time per node shows whether the serializer scales linearly.
+
+Usage:
+	python benchmarks/clickable_elements_to_string.py [--sizes 10000 50000] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+
+from browser_use.dom.views import DOMBaseNode, DOMElementNode, DOMTextNode
+
+INCLUDE_ATTRIBUTES = ['title', 'type', 'name', 'role', 'tabindex', 'aria-label', 'placeholder', 'value', 'alt']
+TAGS = ['div', 'span', 'a', 'li', 'button', 'section', 'p']
+WORDS = ['Home', 'About', 'Contact', 'Reply', 'Share', 'Read more', 'Next', 'Previous', 'Sign in', 'Search']
+
+
+def make_tree(node_count: int, seed: int = 0) -> DOMElementNode:
+	"""Random tree with long chains of wrappers, like the div soup of real pages"""
+	rng = random.Random(seed)
+	root = DOMElementNode(
+		tag_name='body', xpath='/body', attributes={}, children=[], is_visible=True, is_top_element=True, parent=None
+	)
+	elements = [root]
+	depths = {id(root): 0}
+	highlight_index = 0
+
+	for _ in range(node_count - 1):
+		# Prefer recent elements as parents to get deep branches, up to 60 levels
+		parent = elements[max(0, len(elements) - 1 - int(rng.expovariate(0.05)))]
+		while depths[id(parent)] >= 60:
+			parent = parent.parent
+		node: DOMBaseNode
+		if rng.random() < 0.35:
+			node = DOMTextNode(text=rng.choice(WORDS), is_visible=True, parent=parent)
+		else:
+			highlighted = rng.random() < 0.2
+			node = DOMElementNode(
+				tag_name=rng.choice(TAGS),
+				xpath='',
+				attributes={'role': 'button', 'aria-label': rng.choice(WORDS)} if highlighted else {},
+				children=[],
+				is_visible=rng.random() < 0.95,
+				is_top_element=rng.random() < 0.9,
+				highlight_index=highlight_index if highlighted else None,
+				parent=parent,
+			)
+			if highlighted:
+				highlight_index += 1
+			depths[id(node)] = depths[id(parent)] + 1
+			elements.append(node)
+		parent.children.append(node)
+
+	return root
+
+
+def legacy_clickable_elements_to_string(root: DOMElementNode, include_attributes: list[str] | None = None) -> str:
+	"""The serializer before the single-pass rewrite, kept here as the baseline"""
+	formatted_text = []
+
+	def has_parent_with_highlight_index(node: DOMTextNode) -> bool:
+		current = node.parent
+		while current is not None:
+			if current.highlight_index is not None:
+				return True
+			current = current.parent
+		return False
+
+	def process_node(node: DOMBaseNode, depth: int) -> None:
+		next_depth = int(depth)
+		depth_str = depth * '\t'
+
+		if isinstance(node, DOMElementNode):
+			if node.highlight_index is not None:
+				next_depth += 1
+
+				text = node.get_all_text_till_next_clickable_element()
+				attributes_html_str = ''
+				if include_attributes:
+					attributes_to_include = {
+						key: str(value) for key, value in node.attributes.items() if key in include_attributes
+					}
+					if node.tag_name == attributes_to_include.get('role'):
+						del attributes_to_include['role']
+					if (
+						attributes_to_include.get('aria-label')
+						and attributes_to_include.get('aria-label', '').strip() == text.strip()
+					):
+						del attributes_to_include['aria-label']
+					if (
+						attributes_to_include.get('placeholder')
+						and attributes_to_include.get('placeholder', '').strip() == text.strip()
+					):
+						del attributes_to_include['placeholder']
+					if attributes_to_include:
+						attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
+
+				if node.is_new:
+					highlight_indicator = f'*[{node.highlight_index}]*'
+				else:
+					highlight_indicator = f'[{node.highlight_index}]'
+
+				line = f'{depth_str}{highlight_indicator}<{node.tag_name}'
+				if attributes_html_str:
+					line += f' {attributes_html_str}'
+				if text:
+					if not attributes_html_str:
+						line += ' '
+					line += f'>{text}'
+				elif not attributes_html_str:
+					line += ' '
+				line += ' />'
+				formatted_text.append(line)
+
+			for child in node.children:
+				process_node(child, next_depth)
+
+		elif isinstance(node, DOMTextNode):
+			if (
+				not has_parent_with_highlight_index(node)
+				and node.parent
+				and node.parent.is_visible
+				and node.parent.is_top_element
+			):
+				formatted_text.append(f'{depth_str}{node.text}')
+
+	process_node(root, 0)
+	return '\n'.join(formatted_text)
+
+
+def best_of(repeat: int, fn) -> float:
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000])
+	parser.add_argument('--repeat', type=int, default=3)
+	args = parser.parse_args()
+
+	print(f'{"nodes":>8} {"legacy ms":>10} {"new ms":>10} {"new us/node":>12} {"speedup":>8}')
+	for size in args.sizes:
+		root = make_tree(size)
+
+		expected = legacy_clickable_elements_to_string(root, INCLUDE_ATTRIBUTES)
+		assert root.clickable_elements_to_string(INCLUDE_ATTRIBUTES) == expected, 'serializer output changed'
+
+		legacy = best_of(args.repeat, lambda: legacy_clickable_elements_to_string(root, INCLUDE_ATTRIBUTES))
+		new = best_of(args.repeat, lambda: root.clickable_elements_to_string(INCLUDE_ATTRIBUTES))
+
+		print(f'{size:>8} {legacy * 1000:>10.1f} {new * 1000:>10.1f} {new / size * 1e6:>12.2f} {legacy / new:>7.1f}x')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,164 @@
+"""
+Compare the default buildDomTree.js payload with the columnar wire format.
+
+Builds a synthetic payload shaped like the one buildDomTree.js returns, encodes it
+the same way encodeColumnar does, and reports the JSON size and the time needed to
+parse and decode each format into a DOMElementNode tree.
+
+Usage:
+	python benchmarks/dom_wire_format.py [--nodes 20000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from browser_use.dom.service import (
+	WIRE_FLAG_IN_VIEWPORT,
+	WIRE_FLAG_INTERACTIVE,
+	WIRE_FLAG_SHADOW_ROOT,
+	WIRE_FLAG_TEXT_NODE,
+	WIRE_FLAG_TOP_ELEMENT,
+	WIRE_FLAG_VISIBLE,
+	DomService,
+)
+
+TAGS = ['div', 'span', 'a', 'li', 'ul', 'p', 'button', 'input', 'section', 'img']
+CLASSES = ['btn', 'btn-primary', 'nav-item', 'card', 'card-body', 'row', 'col-6', 'text-muted', 'active']
+WORDS = ['Home', 'About', 'Contact', 'Reply', 'Share', 'Read more', 'Next', 'Previous', 'Sign in', 'Search']
+
+
+def make_payload(node_count: int, seed: int = 0) -> dict:
+	"""Build a map in the default format, children always come before their parent"""
+	rng = random.Random(seed)
+	node_map: dict[str, dict] = {}
+	next_id = 0
+	highlight_index = 0
+
+	def build(xpath: str, depth: int) -> str:
+		nonlocal next_id, highlight_index
+
+		children = []
+		if depth < 12 and next_id < node_count:
+			for position in range(1, rng.randint(1, 6) + 1):
+				if next_id >= node_count:
+					break
+				if rng.random() < 0.35:
+					node_map[str(next_id)] = {'type': 'TEXT_NODE', 'text': rng.choice(WORDS), 'isVisible': rng.random() < 0.9}
+					children.append(str(next_id))
+					next_id += 1
+				else:
+					tag = rng.choice(TAGS)
+					children.append(build(f'{xpath}/{tag}[{position}]', depth + 1))
+
+		node = {
+			'tagName': xpath.rsplit('/', 1)[-1].split('[')[0],
+			'xpath': xpath,
+			'attributes': {},
+			'children': children,
+			'isVisible': rng.random() < 0.9,
+			'isTopElement': rng.random() < 0.8,
+			'isInViewport': rng.random() < 0.5,
+		}
+		if rng.random() < 0.3:
+			node['attributes'] = {'class': ' '.join(rng.sample(CLASSES, 2)), 'href': f'/page/{rng.randint(0, 500)}'}
+			node['isInteractive'] = True
+			node['highlightIndex'] = highlight_index
+			highlight_index += 1
+
+		node_id = str(next_id)
+		next_id += 1
+		node_map[node_id] = node
+		return node_id
+
+	root_id = build('html/body', 0)
+	while next_id < node_count:
+		extra = build(f'html/body/div[{next_id}]', 1)
+		node_map[root_id]['children'].append(extra)
+
+	return {'rootId': root_id, 'map': node_map}
+
+
+def encode_columnar(payload: dict) -> dict:
+	"""Python mirror of encodeColumnar in buildDomTree.js"""
+	strings: list[str] = []
+	string_index: dict[str, int] = {}
+
+	def intern(value: str) -> int:
+		index = string_index.get(value)
+		if index is None:
+			index = string_index[value] = len(strings)
+			strings.append(value)
+		return index
+
+	columns: dict[str, list] = {
+		key: []
+		for key in ('ids', 'flags', 'tags', 'xpaths', 'texts', 'highlights', 'attrCounts', 'attrs', 'childCounts', 'children')
+	}
+	for id, data in payload['map'].items():
+		columns['ids'].append(int(id))
+		if data.get('type') == 'TEXT_NODE':
+			columns['flags'].append(WIRE_FLAG_TEXT_NODE | (WIRE_FLAG_VISIBLE if data['isVisible'] else 0))
+			columns['tags'].append(-1)
+			columns['xpaths'].append(-1)
+			columns['texts'].append(intern(data['text']))
+			columns['highlights'].append(-1)
+			columns['attrCounts'].append(0)
+			columns['childCounts'].append(0)
+			continue
+
+		columns['flags'].append(
+			(WIRE_FLAG_VISIBLE if data.get('isVisible') else 0)
+			| (WIRE_FLAG_INTERACTIVE if data.get('isInteractive') else 0)
+			| (WIRE_FLAG_TOP_ELEMENT if data.get('isTopElement') else 0)
+			| (WIRE_FLAG_IN_VIEWPORT if data.get('isInViewport') else 0)
+			| (WIRE_FLAG_SHADOW_ROOT if data.get('shadowRoot') else 0)
+		)
+		columns['tags'].append(intern(data['tagName']))
+		columns['xpaths'].append(intern(data['xpath']))
+		columns['texts'].append(-1)
+		columns['highlights'].append(data.get('highlightIndex', -1))
+		columns['attrCounts'].append(len(data['attributes']))
+		for name, value in data['attributes'].items():
+			columns['attrs'].extend((intern(name), intern(value)))
+		columns['childCounts'].append(len(data['children']))
+		columns['children'].extend(int(child_id) for child_id in data['children'])
+
+	return {'rootId': payload['rootId'], 'columns': {'strings': strings, **columns}}
+
+
+def measure(dom_service: DomService, raw: str, repeat: int) -> float:
+	"""Best time to parse the JSON and build the node tree"""
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		asyncio.run(dom_service._construct_dom_tree(json.loads(raw)))
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--nodes', type=int, default=20_000)
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	payload = make_payload(args.nodes)
+	default_raw = json.dumps(payload, separators=(',', ':'))
+	columnar_raw = json.dumps(encode_columnar(payload), separators=(',', ':'))
+
+	dom_service = DomService(page=None)  # type: ignore[arg-type]
+	default_time = measure(dom_service, default_raw, args.repeat)
+	columnar_time = measure(dom_service, columnar_raw, args.repeat)
+
+	print(f'nodes: {len(payload["map"])}')
+	print(f'{"format":<10} {"bytes":>12} {"decode ms":>12}')
+	print(f'{"default":<10} {len(default_raw):>12,} {default_time * 1000:>12.1f}')
+	print(f'{"columnar":<10} {len(columnar_raw):>12,} {columnar_time * 1000:>12.1f}')
+	print(f'size ratio: {len(default_raw) / len(columnar_raw):.2f}x, decode speedup: {default_time / columnar_time:.2f}x')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,108 @@
+"""
+Accuracy of the length based token estimate against real tokenizer counts.
+
+Counts typical message manager texts (the system prompt, serialized page states, model
+outputs and non-English page text) with the tokenizer get_token_counter selects for each
+model, and reports how far the previous len(text) // 3 estimate is off. Also times a cold
+and a cached count of the largest text.
+
+Needs tiktoken (installed with langchain-openai), and for open models optionally a
+tokenizer in the local Hugging Face cache.
+
+Usage:
+	python benchmarks/token_counting.py [--models gpt-4o claude-3-7-sonnet-20250219] [--elements 300]
+"""
+
+import argparse
+import json
+import random
+import time
+from importlib import resources
+
+from browser_use.agent.message_manager.tokenizer import TokenCounter, get_token_counter
+
+TAGS = ['a', 'button', 'input', 'select', 'div', 'span', 'li']
+WORDS = ['Home', 'About', 'Contact', 'Reply', 'Share', 'Read more', 'Next', 'Previous', 'Sign in', 'Search', 'Add to cart']
+NON_ENGLISH = [
+	'Suchergebnisse für Ihre Anfrage werden geladen, bitte warten Sie einen Moment.',
+	'登录您的账户以查看订单历史记录和保存的地址。',
+	'Добавить в корзину и перейти к оформлению заказа',
+	'検索結果を並べ替える: 関連度順、価格の安い順、新着順',
+]
+
+
+def make_page_state(element_count: int, seed: int = 0) -> str:
+	"""Text shaped like DOMElementNode.clickable_elements_to_string output"""
+	rng = random.Random(seed)
+	lines = []
+	for index in range(element_count):
+		depth = '\t' * rng.randint(0, 6)
+		tag = rng.choice(TAGS)
+		attributes = f"aria-label='{rng.choice(WORDS)}'" if rng.random() < 0.5 else f"type='{rng.choice(['text', 'submit'])}'"
+		lines.append(f'{depth}[{index}]<{tag} {attributes}>{rng.choice(WORDS)} />')
+		if rng.random() < 0.4:
+			lines.append(f'{depth}{" ".join(rng.choices(WORDS, k=rng.randint(3, 12)))}')
+		if rng.random() < 0.05:
+			lines.append(f'{depth}https://example.com/item/{rng.getrandbits(64):x}?ref=search&page={rng.randint(1, 20)}')
+	return '\n'.join(lines)
+
+
+def make_model_output(seed: int = 0) -> str:
+	rng = random.Random(seed)
+	return json.dumps(
+		{
+			'current_state': {
+				'evaluation_previous_goal': 'Success - The search results page is loaded',
+				'memory': 'Searched for the product, 3 of 10 results checked, next is the fourth result',
+				'next_goal': 'Open the fourth result to check the price',
+			},
+			'action': [{'click_element_by_index': {'index': rng.randint(0, 300)}}, {'scroll_down': {}}],
+		}
+	)
+
+
+def samples(element_count: int) -> dict[str, str]:
+	system_prompt = resources.files('browser_use.agent').joinpath('system_prompt.md').read_text()
+	return {
+		'system prompt': system_prompt,
+		'page state': make_page_state(element_count),
+		'model output': make_model_output(),
+		'non-English text': '\n'.join(NON_ENGLISH * 5),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--models', nargs='+', default=['gpt-4o', 'claude-3-7-sonnet-20250219', 'deepseek-chat'])
+	parser.add_argument('--elements', type=int, default=300)
+	args = parser.parse_args()
+
+	texts = samples(args.elements)
+	estimate = TokenCounter('estimate')
+
+	for model in args.models:
+		counter = get_token_counter(model)
+		if type(counter) is TokenCounter:
+			print(f'{model}: no tokenizer available, install tiktoken to compare\n')
+			continue
+
+		print(f'{model} ({counter.name})')
+		print(f'{"text":<18} {"chars":>8} {"estimate":>9} {"real":>8} {"error":>8}')
+		for name, text in texts.items():
+			real = counter.count_text(text)
+			estimated = estimate.count_text(text)
+			print(f'{name:<18} {len(text):>8} {estimated:>9} {real:>8} {(estimated - real) / real:>+8.0%}')
+
+		largest = max(texts.values(), key=len)
+		counter.count_text.cache_clear()
+		start = time.perf_counter()
+		counter.count_text(largest)
+		cold = time.perf_counter() - start
+		start = time.perf_counter()
+		counter.count_text(largest)
+		cached = time.perf_counter() - start
+		print(f'count of {len(largest)} chars: cold {cold * 1000:.2f} ms, cached {cached * 1e6:.1f} us\n')
+
+
+if __name__ == '__main__':
+	main()
@@ -2,10 +2,18 @@ from __future__ import annotations
 
 import base64
 import io
+import itertools
 import logging
 import os
 import platform
-from typing import TYPE_CHECKING, Optional
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
 
 from browser_use.agent.views import AgentHistoryList
 
@@ -30,6 +38,35 @@ def decode_unicode_escapes_to_utf8(text: str) -> str:
 		return text
 
 
+# Encoder arguments of ffmpeg for the video formats create_history_gif can write
+VIDEO_CODECS = {
+	'.mp4': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-movflags', '+faststart'],
+	'.webm': ['-c:v', 'libvpx-vp9', '-pix_fmt', 'yuv420p', '-b:v', '0', '-crf', '40'],
+}
+
+
+@dataclass(frozen=True)
+class _FrameOptions:
+	show_goals: bool
+	show_logo: bool
+	font_size: int
+	title_font_size: int
+	goal_font_size: int
+	margin: int
+	line_spacing: float
+
+
+@dataclass(frozen=True)
+class _FrameJob:
+	"""One frame to render, small enough to send to a worker process"""
+
+	options: _FrameOptions
+	screenshot: str
+	task: Optional[str] = None  # set for the task frame
+	step_number: int = 0
+	goal_text: Optional[str] = None
+
+
 def create_history_gif(
 	task: str,
 	history: AgentHistoryList,
@@ -44,21 +81,197 @@ def create_history_gif(
 	goal_font_size: int = 44,
 	margin: int = 40,
 	line_spacing: float = 1.5,
+	workers: int = 1,
 ) -> None:
-	"""Create a GIF from the agent's history with overlaid task and goal text."""
+	"""
+	Create a GIF from the agent's history with overlaid task and goal text.
+
+	If output_path ends with .mp4 or .webm, a video is written with a local ffmpeg instead,
+	which is much smaller than a GIF. With workers > 1 the screenshots are decoded and the
+	overlays drawn in that many processes. Frames are written to the file as they are
+	rendered, so only a few of them are held in memory at a time.
+	"""
 	if not history.history:
 		logger.warning('No history to create GIF from')
 		return
 
-	from PIL import Image, ImageFont
-
-	images = []
-
 	# if history is empty or first screenshot is None, we can't create a gif
-	if not history.history or not history.history[0].state.screenshot:
+	first_screenshot = history.history[0].state.get_screenshot() if history.history else None
+	if not first_screenshot:
 		logger.warning('No history or first screenshot to create GIF from')
 		return
 
+	options = _FrameOptions(
+		show_goals=show_goals,
+		show_logo=show_logo,
+		font_size=font_size,
+		title_font_size=title_font_size,
+		goal_font_size=goal_font_size,
+		margin=margin,
+		line_spacing=line_spacing,
+	)
+
+	def frame_jobs() -> Iterator[_FrameJob]:
+		# Create task frame if requested
+		if show_task and task:
+			yield _FrameJob(options, first_screenshot, task=task)
+
+		# Process each history item, screenshots of a HistoryStore are read from disk one at a time
+		for i, item in enumerate(history.history, 1):
+			screenshot = item.state.get_screenshot()
+			if not screenshot:
+				continue
+			goal_text = item.model_output.current_state.next_goal if item.model_output else None
+			yield _FrameJob(options, screenshot, step_number=i, goal_text=goal_text)
+
+	frames = _render_frames(frame_jobs(), workers)
+
+	codec_args = VIDEO_CODECS.get(Path(output_path).suffix.lower())
+	if codec_args is not None and shutil.which('ffmpeg') is None:
+		output_path = str(Path(output_path).with_suffix('.gif'))
+		logger.warning(f'ffmpeg not found, creating a GIF at {output_path} instead')
+		codec_args = None
+
+	if codec_args is not None:
+		created = _write_video(frames, output_path, duration, codec_args)
+	else:
+		created = _write_gif(frames, output_path, duration)
+
+	if created:
+		logger.info(f'Created {"video" if codec_args is not None else "GIF"} at {output_path}')
+	else:
+		logger.warning('No images found in history to create GIF')
+
+
+def _render_frames(jobs: Iterator[_FrameJob], workers: int) -> Iterator['Image.Image']:
+	"""Render the frames in order, with at most two frames per worker rendered ahead of the encoder"""
+	if workers <= 1:
+		yield from map(_render_frame, jobs)
+		return
+
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		pending: deque[Future] = deque()
+		for job in jobs:
+			pending.append(executor.submit(_render_frame, job))
+			if len(pending) >= workers * 2:
+				yield pending.popleft().result()
+		while pending:
+			yield pending.popleft().result()
+
+
+def _render_frame(job: _FrameJob) -> 'Image.Image':
+	from PIL import Image
+
+	options = job.options
+	regular_font, title_font, _ = _load_fonts(options.font_size, options.title_font_size, options.goal_font_size)
+	logo = _load_logo() if options.show_logo else None
+
+	if job.task is not None:
+		return _create_task_frame(
+			job.task,
+			job.screenshot,
+			title_font,  # type: ignore
+			regular_font,  # type: ignore
+			logo,
+			options.line_spacing,
+		)
+
+	# Convert base64 screenshot to PIL Image
+	img_data = base64.b64decode(job.screenshot)
+	image = Image.open(io.BytesIO(img_data))
+
+	if options.show_goals and job.goal_text is not None:
+		image = _add_overlay_to_image(
+			image=image,
+			step_number=job.step_number,
+			goal_text=job.goal_text,
+			regular_font=regular_font,  # type: ignore
+			title_font=title_font,  # type: ignore
+			margin=options.margin,
+			logo=logo,
+		)
+
+	return image
+
+
+def _write_gif(frames: Iterator['Image.Image'], output_path: str, duration: int) -> bool:
+	"""
+	Write the frames to the file one at a time, each with its own color table. Image.save with
+	append_images would convert and keep every frame before writing anything.
+	"""
+	from PIL import GifImagePlugin, Image
+
+	first_frame = next(frames, None)
+	if first_frame is None:
+		return False
+
+	size = first_frame.size
+	with open(output_path, 'wb') as f:
+		for i, frame in enumerate(itertools.chain([first_frame], frames)):
+			# The canvas has the size of the first frame
+			if frame.size != size:
+				frame = frame.resize(size)
+			palette_frame = frame.convert('RGB').convert('P', palette=Image.Palette.ADAPTIVE)
+			if i == 0:
+				header, _ = GifImagePlugin.getheader(palette_frame, info={'loop': 0, 'duration': duration})
+				f.writelines(header)
+			f.writelines(GifImagePlugin.getdata(palette_frame, duration=duration, include_color_table=True))
+		f.write(b';')  # trailer
+	return True
+
+
+def _write_video(frames: Iterator['Image.Image'], output_path: str, duration: int, codec_args: list[str]) -> bool:
+	"""Pipe the frames as raw RGB into ffmpeg, every frame is shown for duration milliseconds"""
+	first_frame = next(frames, None)
+	if first_frame is None:
+		return False
+
+	size = first_frame.size
+	command = [
+		'ffmpeg',
+		'-y',
+		'-loglevel',
+		'error',
+		'-f',
+		'rawvideo',
+		'-pix_fmt',
+		'rgb24',
+		'-s',
+		f'{size[0]}x{size[1]}',
+		'-framerate',
+		f'{1000 / duration}',
+		'-i',
+		'-',
+		# yuv420p needs even dimensions
+		'-vf',
+		'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+		*codec_args,
+		output_path,
+	]
+	process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+	assert process.stdin is not None
+	try:
+		for frame in itertools.chain([first_frame], frames):
+			# All frames of a raw video have the size of the first one
+			if frame.size != size:
+				frame = frame.resize(size)
+			process.stdin.write(frame.convert('RGB').tobytes())
+	finally:
+		process.stdin.close()
+		_, stderr = process.communicate()
+
+	if process.returncode != 0:
+		raise RuntimeError(f'ffmpeg failed to create {output_path}: {stderr.decode(errors="replace").strip()}')
+	return True
+
+
+@cache
+def _load_fonts(
+	font_size: int, title_font_size: int, goal_font_size: int
+) -> tuple['ImageFont.FreeTypeFont', 'ImageFont.FreeTypeFont', 'ImageFont.FreeTypeFont']:
+	"""Regular, title and goal fonts, loaded once per process"""
+	from PIL import ImageFont
+
 	# Try to load nicer fonts
 	try:
 		# Try different font options in order of preference
@@ -74,7 +287,6 @@ def create_history_gif(
 			'DejaVuSans',
 			'Verdana',
 		]
-		font_loaded = False
 
 		for font_name in font_options:
 			try:
@@ -84,80 +296,35 @@ def create_history_gif(
 				regular_font = ImageFont.truetype(font_name, font_size)
 				title_font = ImageFont.truetype(font_name, title_font_size)
 				goal_font = ImageFont.truetype(font_name, goal_font_size)
-				font_loaded = True
-				break
+				return regular_font, title_font, goal_font
 			except OSError:
 				continue
 
-		if not font_loaded:
-			raise OSError('No preferred fonts found')
+		raise OSError('No preferred fonts found')
 
 	except OSError:
 		regular_font = ImageFont.load_default()
 		title_font = ImageFont.load_default()
 
 		goal_font = regular_font
+		return regular_font, title_font, goal_font  # type: ignore
 
-	# Load logo if requested
-	logo = None
-	if show_logo:
-		try:
-			logo = Image.open('./static/browser-use.png')
-			# Resize logo to be small (e.g., 40px height)
-			logo_height = 150
-			aspect_ratio = logo.width / logo.height
-			logo_width = int(logo_height * aspect_ratio)
-			logo = logo.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
-		except Exception as e:
-			logger.warning(f'Could not load logo: {e}')
-
-	# Create task frame if requested
-	if show_task and task:
-		task_frame = _create_task_frame(
-			task,
-			history.history[0].state.screenshot,
-			title_font,  # type: ignore
-			regular_font,  # type: ignore
-			logo,
-			line_spacing,
-		)
-		images.append(task_frame)
-
-	# Process each history item
-	for i, item in enumerate(history.history, 1):
-		if not item.state.screenshot:
-			continue
-
-		# Convert base64 screenshot to PIL Image
-		img_data = base64.b64decode(item.state.screenshot)
-		image = Image.open(io.BytesIO(img_data))
-
-		if show_goals and item.model_output:
-			image = _add_overlay_to_image(
-				image=image,
-				step_number=i,
-				goal_text=item.model_output.current_state.next_goal,
-				regular_font=regular_font,  # type: ignore
-				title_font=title_font,  # type: ignore
-				margin=margin,
-				logo=logo,
-			)
-
-		images.append(image)
-
-	if images:
-		# Save the GIF
-		images[0].save(
-			output_path,
-			save_all=True,
-			append_images=images[1:],
-			duration=duration,
-			loop=0,
-			optimize=False,
-		)
-		logger.info(f'Created GIF at {output_path}')
-	else:
-		logger.warning('No images found in history to create GIF')
+
+@cache
+def _load_logo() -> Optional['Image.Image']:
+	"""Logo for the top right corner, loaded once per process"""
+	from PIL import Image
+
+	try:
+		logo = Image.open('./static/browser-use.png')
+		# Resize logo to be small (e.g., 40px height)
+		logo_height = 150
+		aspect_ratio = logo.width / logo.height
+		logo_width = int(logo_height * aspect_ratio)
+		return logo.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
+	except Exception as e:
+		logger.warning(f'Could not load logo: {e}')
+		return None
 
 
 def _create_task_frame(
@@ -0,0 +1,101 @@
+"""
+Append-only agent history on disk.
+
+A history store is a directory with one JSON line per step, appended as each step completes,
+and the screenshots as separate image files named after the hash of their content:
+
+	history/
+		steps.jsonl
+		screenshots/<hash>.png
+
+Steps are read back one at a time and without their screenshots, which are only loaded
+from disk when needed, see BrowserStateHistory.get_screenshot.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Iterator, Type
+
+from browser_use.agent.views import AgentHistory, AgentHistoryList, AgentOutput
+
+logger = logging.getLogger(__name__)
+
+STEPS_FILE = 'steps.jsonl'
+SCREENSHOTS_DIR = 'screenshots'
+
+# Leading bytes of the screenshot formats, see BrowserContextConfig.screenshot_format
+IMAGE_SIGNATURES = ((b'\x89PNG', 'png'), (b'\xff\xd8', 'jpg'), (b'RIFF', 'webp'))
+
+
+class HistoryStore:
+	"""
+	Writes and reads the history of an agent run step by step, so neither saving nor
+	loading holds all steps and screenshots in memory at once.
+
+	Identical screenshots, e.g. reused by screenshot_change_detection, are stored once.
+	The methods block on file IO, the agent runs append in a worker thread.
+	"""
+
+	def __init__(self, directory: str | Path):
+		# Absolute, so the screenshot paths of the steps do not depend on the working directory
+		self.directory = Path(directory).resolve()
+		self.steps_file = self.directory / STEPS_FILE
+		self.screenshots_dir = self.directory / SCREENSHOTS_DIR
+
+	@staticmethod
+	def is_store(path: str | Path) -> bool:
+		return (Path(path) / STEPS_FILE).is_file()
+
+	def reset(self) -> None:
+		"""Start a new history, removing the steps of an earlier run. Screenshots are kept for reuse."""
+		self.steps_file.unlink(missing_ok=True)
+
+	def append(self, item: AgentHistory) -> None:
+		"""
+		Append one step. Its screenshot is moved to an image file and the item keeps only the
+		path, so the base64 data does not stay in memory.
+		"""
+		self.screenshots_dir.mkdir(parents=True, exist_ok=True)
+		if item.state.screenshot is not None:
+			item.state.screenshot_path = str(self._save_screenshot(item.state.screenshot))
+			item.state.screenshot = None
+
+		data = item.model_dump()
+		if item.state.screenshot_path is not None:
+			# Relative to the store, so the directory can be moved
+			data['state']['screenshot_path'] = Path(item.state.screenshot_path).relative_to(self.directory).as_posix()
+
+		with open(self.steps_file, 'a', encoding='utf-8') as f:
+			f.write(json.dumps(data) + '\n')
+
+	def iter_steps(self, output_model: Type[AgentOutput]) -> Iterator[AgentHistory]:
+		"""Read the steps one at a time, with screenshot_path set instead of the screenshot data"""
+		with open(self.steps_file, 'r', encoding='utf-8') as f:
+			for line_number, line in enumerate(f, 1):
+				if not line.strip():
+					continue
+				try:
+					data = json.loads(line)
+				except json.JSONDecodeError:
+					# Only the last line can be cut off, by a run that was killed while writing it
+					logger.warning(f'Skipping incomplete step on line {line_number} of {self.steps_file}')
+					continue
+
+				screenshot_path = data['state'].get('screenshot_path')
+				if screenshot_path is not None:
+					data['state']['screenshot_path'] = str(self.directory / screenshot_path)
+				yield AgentHistory.load_from_dict(data, output_model)
+
+	def load(self, output_model: Type[AgentOutput]) -> AgentHistoryList:
+		return AgentHistoryList(history=list(self.iter_steps(output_model)))
+
+	def _save_screenshot(self, screenshot: str) -> Path:
+		data = base64.b64decode(screenshot)
+		extension = next((ext for signature, ext in IMAGE_SIGNATURES if data.startswith(signature)), 'png')
+		path = self.screenshots_dir / f'{hashlib.sha256(data).hexdigest()[:32]}.{extension}'
+		if not path.exists():
+			path.write_bytes(data)
+		return path
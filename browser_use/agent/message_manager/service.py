@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Dict, List, Optional
 
@@ -12,7 +13,9 @@ from langchain_core.messages import (
 )
 from pydantic import BaseModel
 
-from browser_use.agent.message_manager.views import MessageMetadata
+from browser_use.agent.message_manager.state_diff import MAX_DIFF_RATIO, diff_element_lines, normalize_element_lines
+from browser_use.agent.message_manager.tokenizer import TokenCounter, get_token_counter, image_size
+from browser_use.agent.message_manager.views import MessageMetadata, PageStateBaseline
 from browser_use.agent.prompts import AgentMessagePrompt
 from browser_use.agent.views import ActionResult, AgentOutput, AgentStepInfo, MessageManagerState
 from browser_use.browser.views import BrowserState
@@ -23,12 +26,22 @@ logger = logging.getLogger(__name__)
 
 class MessageManagerSettings(BaseModel):
 	max_input_tokens: int = 128000
+	# Model the tokenizer is chosen for, see get_token_counter
+	model_name: str = ''
+	# Used if no tokenizer is available
 	estimated_characters_per_token: int = 3
+	# Used for images whose dimensions cannot be read
 	image_tokens: int = 800
 	include_attributes: list[str] = []
 	message_context: Optional[str] = None
 	sensitive_data: Optional[Dict[str, str]] = None
 	available_file_paths: Optional[List[str]] = None
+	# Mark the end of the stable prefix with Anthropic cache_control blocks
+	cache_control_markers: bool = False
+	# List only the element changes since the last page state in the history, see _diff_page_state
+	diff_state_messages: bool = False
+	# Number of state messages diffed against one page state before the full listing is sent again
+	full_state_interval: int = 10
 
 
 class MessageManager:
@@ -43,11 +56,32 @@ class MessageManager:
 		self.settings = settings
 		self.state = state
 		self.system_prompt = system_message
+		# The length based estimate until load_token_counter is done
+		self.token_counter = TokenCounter(self.settings.model_name, self.settings.estimated_characters_per_token)
+		self._token_counter_loaded = False
 
 		# Only initialize messages if state is empty
 		if len(self.state.history.messages) == 0:
 			self._init_messages()
 
+	async def load_token_counter(self) -> None:
+		"""
+		Load the tokenizer of the model in a thread, it can take a while, and count the messages
+		added until then again with it
+		"""
+		if self._token_counter_loaded:
+			return
+		self._token_counter_loaded = True
+		self.token_counter = await asyncio.to_thread(
+			get_token_counter, self.settings.model_name, self.settings.estimated_characters_per_token
+		)
+
+		history = self.state.history
+		for managed_message in history.messages:
+			tokens = self._count_tokens(managed_message.message)
+			history.current_tokens += tokens - managed_message.metadata.tokens
+			managed_message.metadata.tokens = tokens
+
 	def _init_messages(self) -> None:
 		"""Initialize the message history with system message, context, task, and other initial messages"""
 		self._add_message_with_tokens(self.system_prompt, message_type='init')
@@ -126,8 +160,13 @@ class MessageManager:
 		result: Optional[List[ActionResult]] = None,
 		step_info: Optional[AgentStepInfo] = None,
 		use_vision=True,
+		page_actions: Optional[str] = None,
 	) -> None:
-		"""Add browser state as human message"""
+		"""Add browser state as human message
+
+		page_actions: description of the actions only available on the current page, part of this
+		message so it is removed with the state instead of staying in the history
+		"""
 
 
 		print('add_state_message POOP: ',self.state)
@@ -148,15 +187,53 @@ class MessageManager:
 						self._add_message_with_tokens(msg)
 					result = None  # if result in history, we dont want to add it again
 
+		elements_text = self._diff_page_state(state) if self.settings.diff_state_messages else None
+
 		# otherwise add state message and result to next message (which will not stay in memory)
 		state_message = AgentMessagePrompt(
 			state,
 			result,
 			include_attributes=self.settings.include_attributes,
 			step_info=step_info,
+			page_actions=page_actions,
+			elements_text=elements_text,
 		).get_user_message(use_vision)
 		self._add_message_with_tokens(state_message)
 
+	def _diff_page_state(self, state: BrowserState) -> Optional[str]:
+		"""
+		Element listing for the state message as changes to the page state kept in the history.
+
+		The full listing is added to the history as a new page state instead, replacing the old one,
+		if the url changed, too many lines changed, full_state_interval state messages were already
+		diffed against it, or it was summarized away by the procedural memory.
+		Returns None for an empty page, which is listed as usual.
+		"""
+		elements_text = state.element_tree.clickable_elements_to_string(include_attributes=self.settings.include_attributes)
+		lines = normalize_element_lines(elements_text)
+		baseline = self.state.page_state
+
+		if (
+			baseline is not None
+			and baseline.url == state.url
+			and baseline.diffs < self.settings.full_state_interval
+			and any(m.metadata.message_type == 'page_state' for m in self.state.history.messages)
+		):
+			diff = diff_element_lines(baseline.lines, lines)
+			if diff.changed_lines <= MAX_DIFF_RATIO * max(len(lines), 1):
+				baseline.diffs += 1
+				return diff.text
+
+		self.state.history.remove_messages_of_type('page_state')
+		self.state.page_state = None
+		if not lines:
+			return None
+
+		page_state_message = HumanMessage(content=f'Page state of {state.url}, interactive elements:\n{elements_text}')
+		self._add_message_with_tokens(page_state_message, message_type='page_state')
+		self.state.page_state = PageStateBaseline(url=state.url, lines=lines)
+		return diff_element_lines(lines, lines).text
+
 	def add_model_output(self, model_output: AgentOutput) -> None:
 		"""Add model output as AI message"""
 		tool_calls = [
@@ -188,15 +265,38 @@ class MessageManager:
 
 		msg = [m.message for m in self.state.history.messages]
 		# debug which messages are in history with token count # log
-		total_input_tokens = 0
-		logger.debug(f'Messages in history: {len(self.state.history.messages)}:')
-		for m in self.state.history.messages:
-			total_input_tokens += m.metadata.tokens
-			logger.debug(f'{m.message.__class__.__name__} - Token count: {m.metadata.tokens}')
-		logger.debug(f'Total input tokens: {total_input_tokens}')
+		if logger.isEnabledFor(logging.DEBUG):
+			logger.debug(f'Messages in history: {len(self.state.history.messages)}:')
+			for m in self.state.history.messages:
+				logger.debug(f'{m.message.__class__.__name__} - Token count: {m.metadata.tokens}')
+			logger.debug(f'Total input tokens: {self.state.history.current_tokens} ({self.token_counter.name})')
+
+		if self.settings.cache_control_markers:
+			msg = self._add_cache_control(msg)
 
 		return msg
 
+	@staticmethod
+	def _add_cache_control(messages: List[BaseMessage]) -> List[BaseMessage]:
+		"""
+		Copies of the messages with cache breakpoints after the system prompt and at the end of the
+		history before the state message. Stored messages stay unmarked, so there are never more
+		than two breakpoints.
+		"""
+		marked = list(messages)
+		history_end = next((i for i in range(len(messages) - 2, 0, -1) if messages[i].content), None)
+		for i in (0, history_end):
+			if i is None or i >= len(messages) or not messages[i].content:
+				continue
+			message = messages[i]
+			if isinstance(message.content, str):
+				content = [{'type': 'text', 'text': message.content}]
+			else:
+				content = [block if isinstance(block, dict) else {'type': 'text', 'text': block} for block in message.content]
+			content[-1] = {**content[-1], 'cache_control': {'type': 'ephemeral'}}
+			marked[i] = message.model_copy(update={'content': content})
+		return marked
+
 	def _add_message_with_tokens(
 		self, message: BaseMessage, position: int | None = None, message_type: str | None = None
 	) -> None:
@@ -240,7 +340,7 @@ class MessageManager:
 		if isinstance(message.content, list):
 			for item in message.content:
 				if 'image_url' in item:
-					tokens += self.settings.image_tokens
+					tokens += self._count_image_tokens(item)
 				elif isinstance(item, dict) and 'text' in item:
 					tokens += self._count_text_tokens(item['text'])
 		else:
@@ -252,8 +352,16 @@ class MessageManager:
 
 	def _count_text_tokens(self, text: str) -> int:
 		"""Count tokens in a text string"""
-		tokens = len(text) // self.settings.estimated_characters_per_token  # Rough estimate if no tokenizer available
-		return tokens
+		return self.token_counter.count_text(text)
+
+	def _count_image_tokens(self, item: dict) -> int:
+		"""Count tokens of an image content item from the dimensions of the image"""
+		image_url = item['image_url']
+		url = image_url.get('url', '') if isinstance(image_url, dict) else image_url
+		size = image_size(url)
+		if size is None:
+			return self.settings.image_tokens
+		return self.token_counter.count_image(*size)
 
 	def cut_messages(self):
 		"""Get current message list, potentially trimmed to max tokens"""
@@ -269,11 +377,12 @@ class MessageManager:
 			for item in msg.message.content:
 				if 'image_url' in item:
 					msg.message.content.remove(item)
-					diff -= self.settings.image_tokens
-					msg.metadata.tokens -= self.settings.image_tokens
-					self.state.history.current_tokens -= self.settings.image_tokens
+					image_tokens = self._count_image_tokens(item)
+					diff -= image_tokens
+					msg.metadata.tokens -= image_tokens
+					self.state.history.current_tokens -= image_tokens
 					logger.debug(
-						f'Removed image with {self.settings.image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
+						f'Removed image with {image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
 					)
 				elif 'text' in item and isinstance(item, dict):
 					text += item['text']
@@ -0,0 +1,64 @@
+"""
+Element listings of state messages as changes to an earlier listing.
+
+Lines of clickable_elements_to_string are compared after removing the *[index]* marker of
+new elements, so an element only counts as changed if its index, attributes or text changed.
+Unchanged runs are summarized by the range of element indices they contain.
+"""
+
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+# Resend the full listing if more than this share of the current lines was added, removed or changed
+MAX_DIFF_RATIO = 0.5
+
+NEW_ELEMENT_RE = re.compile(r'^(\t*)\*\[(\d+)\]\*')
+ELEMENT_INDEX_RE = re.compile(r'^\t*\[(\d+)\]')
+
+
+@dataclass
+class ElementsDiff:
+	text: str
+	changed_lines: int
+
+
+def normalize_element_lines(elements_text: str) -> list[str]:
+	"""Lines of an element listing without the markers of new elements"""
+	if not elements_text:
+		return []
+	return [NEW_ELEMENT_RE.sub(r'\1[\2]', line) for line in elements_text.split('\n')]
+
+
+def diff_element_lines(previous: list[str], current: list[str]) -> ElementsDiff:
+	"""
+	Changes from the previous to the current normalized listing: removed lines prefixed
+	with '- ', added or changed lines with '+ ', in page order.
+	"""
+	matcher = SequenceMatcher(None, previous, current, autojunk=False)
+	parts: list[str] = []
+	changed_lines = 0
+
+	for tag, previous_start, previous_end, current_start, current_end in matcher.get_opcodes():
+		if tag == 'equal':
+			parts.append(_unchanged_summary(current[current_start:current_end]))
+			continue
+		for line in previous[previous_start:previous_end]:
+			parts.append(f'- {line}')
+		for line in current[current_start:current_end]:
+			parts.append(f'+ {line}')
+		changed_lines += (previous_end - previous_start) + (current_end - current_start)
+
+	if not changed_lines:
+		return ElementsDiff(f'No changes since the page state above ({len(current)} lines)', 0)
+	return ElementsDiff('Changes since the page state above (- removed, + added or changed):\n' + '\n'.join(parts), changed_lines)
+
+
+def _unchanged_summary(lines: list[str]) -> str:
+	indices = [match.group(1) for match in map(ELEMENT_INDEX_RE.match, lines) if match]
+	count = f'{len(lines)} unchanged line' if len(lines) == 1 else f'{len(lines)} unchanged lines'
+	if not indices:
+		return f'... {count} ...'
+	if len(indices) == 1:
+		return f'... {count}, element [{indices[0]}] ...'
+	return f'... {count}, elements [{indices[0]}] to [{indices[-1]}] ...'
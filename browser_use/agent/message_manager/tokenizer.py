@@ -0,0 +1,193 @@
+"""
+Token counting for the message manager.
+
+The tokenizer is chosen by the model name: the tiktoken encoding of OpenAI models, a
+tokenizer from the local Hugging Face cache for open model families, and tiktoken's
+cl100k_base as a close approximation for models without a public tokenizer. Without
+tiktoken, tokens are estimated from the text length.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import math
+import re
+import struct
+from functools import cache, lru_cache
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MODEL_RE = re.compile(r'^(gpt-|o\d|chatgpt-)', re.IGNORECASE)
+
+# Tokenizers of open model families, only used if they are in the local Hugging Face cache
+HF_TOKENIZERS = (
+	(re.compile(r'deepseek', re.IGNORECASE), 'deepseek-ai/DeepSeek-V3'),
+	(re.compile(r'qwen', re.IGNORECASE), 'Qwen/Qwen2.5-7B-Instruct'),
+	(re.compile(r'llama', re.IGNORECASE), 'meta-llama/Llama-3.1-8B-Instruct'),
+	(re.compile(r'gemma', re.IGNORECASE), 'google/gemma-2-9b-it'),
+	(re.compile(r'mistral|mixtral', re.IGNORECASE), 'mistralai/Mistral-7B-Instruct-v0.3'),
+)
+
+# Counts of recently seen texts, e.g. the system prompt of every agent and messages added again
+TEXT_CACHE_SIZE = 256
+
+# Base64 characters decoded to read the dimensions of an image, a multiple of 4
+IMAGE_HEADER_CHARS = 4096
+
+# JPEG start of frame markers, which hold the image dimensions
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class TokenCounter:
+	"""Estimates tokens from the text length, the base for the tokenizer based counters"""
+
+	name = 'estimate'
+
+	def __init__(self, model_name: str, characters_per_token: int = 3):
+		self.model_name = model_name
+		self.characters_per_token = characters_per_token
+		self.count_text = lru_cache(maxsize=TEXT_CACHE_SIZE)(self._count_text)
+
+	def _count_text(self, text: str) -> int:
+		return len(text) // self.characters_per_token
+
+	def count_image(self, width: int, height: int) -> int:
+		return estimate_image_tokens(self.model_name, width, height)
+
+
+class TiktokenCounter(TokenCounter):
+	name = 'tiktoken'
+
+	def __init__(self, model_name: str, encoding: Any):
+		super().__init__(model_name)
+		self.encoding = encoding
+		self.name = f'tiktoken:{encoding.name}'
+
+	def _count_text(self, text: str) -> int:
+		# Special tokens in page content are counted as plain text
+		return len(self.encoding.encode_ordinary(text))
+
+
+class HuggingFaceCounter(TokenCounter):
+	name = 'huggingface'
+
+	def __init__(self, model_name: str, tokenizer: Any, repo_id: str):
+		super().__init__(model_name)
+		self.tokenizer = tokenizer
+		self.name = f'huggingface:{repo_id}'
+
+	def _count_text(self, text: str) -> int:
+		return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+
+@cache
+def get_token_counter(model_name: str, characters_per_token: int = 3) -> TokenCounter:
+	"""Token counter for a model, shared by all message managers of that model"""
+	for pattern, repo_id in HF_TOKENIZERS:
+		if pattern.search(model_name):
+			tokenizer = _load_hf_tokenizer(repo_id)
+			if tokenizer is not None:
+				return HuggingFaceCounter(model_name, tokenizer, repo_id)
+			break
+
+	try:
+		import tiktoken
+
+		if OPENAI_MODEL_RE.match(model_name):
+			try:
+				encoding = tiktoken.encoding_for_model(model_name)
+			except KeyError:
+				encoding = tiktoken.get_encoding('o200k_base')
+		else:
+			# Claude, Gemini and others have no public tokenizer, cl100k_base is much closer than the estimate
+			encoding = tiktoken.get_encoding('cl100k_base')
+	except Exception as e:
+		# Not installed, or the encoding could not be downloaded
+		logger.debug(f'Estimating tokens from the text length, tiktoken is not available: {str(e)}')
+		return TokenCounter(model_name, characters_per_token)
+
+	return TiktokenCounter(model_name, encoding)
+
+
+def _load_hf_tokenizer(repo_id: str) -> Optional[Any]:
+	try:
+		from transformers import AutoTokenizer
+	except ImportError:
+		return None
+
+	try:
+		return AutoTokenizer.from_pretrained(repo_id, local_files_only=True)
+	except Exception:
+		return None
+
+
+def estimate_image_tokens(model_name: str, width: int, height: int) -> int:
+	"""Input tokens of an image of this size, following the sizing rules of the model's provider"""
+	name = model_name.lower()
+
+	if 'claude' in name:
+		# Scaled down to at most 1568 px on the long side, then about one token per 750 pixels
+		scale = min(1.0, 1568 / max(width, height, 1))
+		return math.ceil(width * scale * height * scale / 750)
+
+	if 'gemini' in name:
+		# Up to 384 px on both sides is one tile, larger images are cut into 768 px tiles
+		if width <= 384 and height <= 384:
+			return 258
+		return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+	# OpenAI high detail: fit into 2048 x 2048, shortest side down to 768 px, then 170 tokens per 512 px tile
+	scale = min(1.0, 2048 / max(width, height, 1))
+	width, height = width * scale, height * scale
+	scale = min(1.0, 768 / max(min(width, height), 1))
+	width, height = width * scale, height * scale
+	return 170 * math.ceil(width / 512) * math.ceil(height / 512) + 85
+
+
+def image_size(url: str) -> Optional[tuple[int, int]]:
+	"""Width and height of a base64 data URL image (PNG, JPEG or WebP), read from its header"""
+	if not url.startswith('data:'):
+		return None
+
+	_, _, data = url.partition(',')
+	try:
+		header = base64.b64decode(data[:IMAGE_HEADER_CHARS])
+	except ValueError:
+		return None
+
+	try:
+		if header.startswith(b'\x89PNG\r\n\x1a\n'):
+			return struct.unpack('>II', header[16:24])
+
+		if header.startswith(b'\xff\xd8'):
+			position = 2
+			while position + 9 <= len(header):
+				if header[position] != 0xFF:
+					return None
+				marker = header[position + 1]
+				if marker == 0xFF:  # fill byte
+					position += 1
+					continue
+				if marker in JPEG_SOF_MARKERS:
+					height, width = struct.unpack('>HH', header[position + 5 : position + 9])
+					return width, height
+				(length,) = struct.unpack('>H', header[position + 2 : position + 4])
+				position += 2 + length
+			return None
+
+		if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+			chunk = header[12:16]
+			if chunk == b'VP8 ':
+				width, height = struct.unpack('<HH', header[26:30])
+				return width & 0x3FFF, height & 0x3FFF
+			if chunk == b'VP8L':
+				(bits,) = struct.unpack('<I', header[21:25])
+				return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+			if chunk == b'VP8X':
+				return int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+	except struct.error:
+		return None
+
+	return None
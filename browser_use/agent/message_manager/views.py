@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Optional
 from warnings import filterwarnings
 
 from langchain_core._api import LangChainBetaWarning
@@ -119,6 +119,12 @@ class MessageHistory(BaseModel):
 				self.messages.pop(i)
 				break
 
+	def remove_messages_of_type(self, message_type: str) -> None:
+		"""Remove all messages with this message_type from history"""
+		for msg in [m for m in self.messages if m.metadata.message_type == message_type]:
+			self.current_tokens -= msg.metadata.tokens
+			self.messages.remove(msg)
+
 	def remove_last_state_message(self) -> None:
 		"""Remove last state message from history"""
 		if len(self.messages) > 2 and isinstance(self.messages[-1].message, HumanMessage):
@@ -126,10 +132,19 @@ class MessageHistory(BaseModel):
 			self.messages.pop()
 
 
+class PageStateBaseline(BaseModel):
+	"""Element listing of the page state message in the history, that state messages are diffed against"""
+
+	url: str
+	lines: list[str]
+	diffs: int = 0  # State messages diffed against it so far
+
+
 class MessageManagerState(BaseModel):
 	"""Holds the state for MessageManager"""
 
 	history: MessageHistory = Field(default_factory=MessageHistory)
 	tool_id: int = 1
+	page_state: Optional[PageStateBaseline] = None
 
 	model_config = ConfigDict(arbitrary_types_allowed=True)
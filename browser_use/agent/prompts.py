@@ -66,14 +66,20 @@ class AgentMessagePrompt:
 		result: Optional[List['ActionResult']] = None,
 		include_attributes: list[str] | None = None,
 		step_info: Optional['AgentStepInfo'] = None,
+		page_actions: Optional[str] = None,
+		elements_text: Optional[str] = None,
 	):
 		self.state = state
 		self.result = result
 		self.include_attributes = include_attributes or []
 		self.step_info = step_info
+		self.page_actions = page_actions
+		self.elements_text = elements_text
 
 	def get_user_message(self, use_vision: bool = True) -> HumanMessage:
-		elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
+		elements_text = self.elements_text
+		if elements_text is None:
+			elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
 
 		has_content_above = (self.state.pixels_above or 0) > 0
 		has_content_below = (self.state.pixels_below or 0) > 0
@@ -113,6 +119,9 @@ Interactive elements from top layer of the current page inside the viewport:
 {step_info_description}
 """
 
+		if self.page_actions:
+			state_description += f'\n{self.page_actions}\n'
+
 		if self.result:
 			for i, result in enumerate(self.result):
 				if result.extracted_content:
@@ -129,7 +138,9 @@ Interactive elements from top layer of the current page inside the viewport:
 					{'type': 'text', 'text': state_description},
 					{
 						'type': 'image_url',
-						'image_url': {'url': f'data:image/png;base64,{self.state.screenshot}'},  # , 'detail': 'low'
+						'image_url': {
+							'url': f'data:{self.state.screenshot_mime_type};base64,{self.state.screenshot}'
+						},  # , 'detail': 'low'
 					},
 				]
 			)
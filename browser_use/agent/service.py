@@ -21,6 +21,7 @@ from langchain_core.messages import (
 from pydantic import BaseModel, ValidationError
 
 from browser_use.agent.gif import create_history_gif
+from browser_use.agent.history_store import HistoryStore
 from browser_use.agent.memory.service import Memory
 from browser_use.agent.memory.views import MemoryConfig
 from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
@@ -47,7 +48,7 @@ from browser_use.agent.views import (
 from browser_use.browser.browser import Browser
 from browser_use.browser.context import BrowserContext
 from browser_use.browser.views import BrowserState, BrowserStateHistory
-from browser_use.controller.registry.views import ActionModel
+from browser_use.controller.registry.views import ActionEffects, ActionModel
 from browser_use.controller.service import Controller
 from browser_use.dom.history_tree_processor.service import (
 	DOMHistoryElement,
@@ -154,6 +155,11 @@ class Agent(Generic[Context]):
 		enable_memory: bool = True,
 		memory_config: Optional[MemoryConfig] = None,
 		source: Optional[str] = None,
+		speculative_state_prefetch: bool = False,
+		history_store_path: Optional[str] = None,
+		cache_friendly_prompt: bool = False,
+		diff_state_messages: bool = False,
+		full_state_interval: int = 10,
 	):
 		if page_extraction_llm is None:
 			page_extraction_llm = llm
@@ -187,6 +193,11 @@ class Agent(Generic[Context]):
 			is_planner_reasoning=is_planner_reasoning,
 			save_playwright_script_path=save_playwright_script_path,
 			extend_planner_system_message=extend_planner_system_message,
+			speculative_state_prefetch=speculative_state_prefetch,
+			history_store_path=history_store_path,
+			cache_friendly_prompt=cache_friendly_prompt,
+			diff_state_messages=diff_state_messages,
+			full_state_interval=full_state_interval,
 		)
 
 		# Memory settings
@@ -255,10 +266,14 @@ class Agent(Generic[Context]):
 			).get_system_message(),
 			settings=MessageManagerSettings(
 				max_input_tokens=self.settings.max_input_tokens,
+				model_name=self.model_name,
 				include_attributes=self.settings.include_attributes,
 				message_context=self.settings.message_context,
 				sensitive_data=sensitive_data,
 				available_file_paths=self.settings.available_file_paths,
+				cache_control_markers=self.settings.cache_friendly_prompt and self.chat_model_library == 'ChatAnthropic',
+				diff_state_messages=self.settings.diff_state_messages,
+				full_state_interval=self.settings.full_state_interval,
 			),
 			state=self.state.message_manager_state,
 		)
@@ -299,6 +314,18 @@ class Agent(Generic[Context]):
 		# Context
 		self.context = context
 
+		# Background capture of the next state (speculative_state_prefetch)
+		self._state_prefetch: asyncio.Task[BrowserState] | None = None
+
+		# Token usage reported with the last LLM response, for the prompt cache share in StepMetadata
+		self._last_usage: Optional[dict] = None
+
+		# Steps are written to disk as they complete, with the screenshots kept only there
+		self._history_store = HistoryStore(history_store_path) if history_store_path else None
+		if self._history_store and not self.state.history.history:
+			# A new run replaces the steps of an earlier run in the same directory
+			self._history_store.reset()
+
 		# Telemetry
 		self.telemetry = ProductTelemetry()
 
@@ -404,8 +431,39 @@ class Agent(Generic[Context]):
 
 		if self.state.stopped or self.state.paused:
 			# logger.debug('Agent paused after getting state')
+			self._cancel_state_prefetch()
 			raise InterruptedError
 
+	def _start_state_prefetch(self) -> None:
+		"""Start capturing the state for the next step in the background"""
+		self._cancel_state_prefetch()
+		task = asyncio.create_task(self.browser_context.get_state(cache_clickable_elements_hashes=True))
+		# Failures are handled when the state is used, only mark the exception as retrieved here
+		task.add_done_callback(lambda t: t.cancelled() or t.exception())
+		self._state_prefetch = task
+
+	def _cancel_state_prefetch(self) -> None:
+		"""Discard the prefetched state, e.g. because the agent was paused or the page may have changed"""
+		if self._state_prefetch is not None:
+			self._state_prefetch.cancel()
+			self._state_prefetch = None
+
+	async def _get_step_state(self) -> BrowserState:
+		"""State for this step, from the prefetch started after the last step if there is one"""
+		prefetch, self._state_prefetch = self._state_prefetch, None
+		if prefetch is not None:
+			try:
+				return await prefetch
+			except asyncio.CancelledError:
+				# Also cancelled when this task is cancelled while awaiting it, e.g. by Ctrl+C or a timeout.
+				# Only a prefetch cancelled on its own falls back to a fresh capture.
+				current_task = asyncio.current_task()
+				if not prefetch.cancelled() or (current_task is not None and current_task.cancelling()):
+					raise
+			except Exception as e:
+				logger.debug(f'State prefetch failed, capturing the state again: {str(e)}')
+		return await self.browser_context.get_state(cache_clickable_elements_hashes=True)
+
 	# @observe(name='agent.step', ignore_output=True, ignore_input=True)
 	@time_execution_async('--step (agent)')
 	async def step(self, step_info: Optional[AgentStepInfo] = None) -> None:
@@ -416,10 +474,12 @@ class Agent(Generic[Context]):
 		result: list[ActionResult] = []
 		step_start_time = time.time()
 		tokens = 0
+		prewarm: asyncio.Task | None = None
+		self._last_usage = None
 
 		try:
 			print('step browser_context CUM:', self.browser_context)
-			state = await self.browser_context.get_state(cache_clickable_elements_hashes=True)
+			state = await self._get_step_state()
 			print('step state PEE: ',state)
 			active_page = await self.browser_context.get_current_page()
 
@@ -436,12 +496,16 @@ class Agent(Generic[Context]):
 			page_filtered_actions = self.controller.registry.get_prompt_description(active_page)
 
 			# If there are page-specific actions, add them as a special message for this step only
+			page_action_message = None
 			if page_filtered_actions:
 				page_action_message = f'For this page, these additional actions are available:\n{page_filtered_actions}'
-				self._message_manager._add_message_with_tokens(HumanMessage(content=page_action_message))
+				if not self.settings.cache_friendly_prompt:
+					self._message_manager._add_message_with_tokens(HumanMessage(content=page_action_message))
+					page_action_message = None
 
 			# If using raw tool calling method, we need to update the message context with new actions
-			if self.tool_calling_method == 'raw':
+			# (with the cache friendly layout, the page actions are part of the state message instead)
+			if self.tool_calling_method == 'raw' and not self.settings.cache_friendly_prompt:
 				# For raw tool calling, get all non-filtered actions plus the page-filtered ones
 				all_unfiltered_actions = self.controller.registry.get_prompt_description()
 				all_actions = all_unfiltered_actions
@@ -458,7 +522,10 @@ class Agent(Generic[Context]):
 				self._message_manager.settings.message_context = updated_context
 
 			print('agent_inject add_state_message NUT:', self.state)
-			self._message_manager.add_state_message(state, self.state.last_result, step_info, self.settings.use_vision)
+			await self._message_manager.load_token_counter()
+			self._message_manager.add_state_message(
+				state, self.state.last_result, step_info, self.settings.use_vision, page_actions=page_action_message
+			)
 
 			# Run planner at specified intervals if planner is configured
 			if self.settings.planner_llm and self.state.n_steps % self.settings.planner_interval == 0:
@@ -479,6 +546,10 @@ class Agent(Generic[Context]):
 			input_messages = self._message_manager.get_messages()
 			tokens = self._message_manager.state.history.current_tokens
 
+			# Prepare the next state capture while waiting for the LLM
+			if self.settings.speculative_state_prefetch:
+				prewarm = asyncio.create_task(self.browser_context.prewarm())
+
 			try:
 				model_output = await self.get_next_action(input_messages)
 				if (
@@ -539,12 +610,17 @@ class Agent(Generic[Context]):
 				self._message_manager._remove_last_state_message()
 				raise e
 
+			if prewarm is not None:
+				await prewarm
+
 			result: list[ActionResult] = await self.multi_act(model_output.action)
 
 			self.state.last_result = result
 
 			if len(result) > 0 and result[-1].is_done:
 				logger.info(f'📄 Result: {result[-1].extracted_content}')
+			elif self.settings.speculative_state_prefetch and not (self.state.stopped or self.state.paused):
+				self._start_state_prefetch()
 
 			self.state.consecutive_failures = 0
 
@@ -566,6 +642,9 @@ class Agent(Generic[Context]):
 			self.state.last_result = result
 
 		finally:
+			if prewarm is not None and not prewarm.done():
+				prewarm.cancel()
+
 			step_end_time = time.time()
 			actions = [a.model_dump(exclude_unset=True) for a in model_output.action] if model_output else []
 			self.telemetry.capture(
@@ -581,13 +660,17 @@ class Agent(Generic[Context]):
 				return
 
 			if state:
+				cached_tokens, cached_ratio = self._cached_input_tokens(self._last_usage)
 				metadata = StepMetadata(
 					step_number=self.state.n_steps,
 					step_start_time=step_start_time,
 					step_end_time=step_end_time,
 					input_tokens=tokens,
+					state_capture_timings=state.capture_timings,
+					cached_input_tokens=cached_tokens,
+					cached_token_ratio=cached_ratio,
 				)
-				self._make_history_item(model_output, state, result, metadata)
+				await self._make_history_item(model_output, state, result, metadata)
 
 	@time_execution_async('--handle_step_error (agent)')
 	async def _handle_step_error(self, error: Exception) -> list[ActionResult]:
@@ -634,7 +717,7 @@ class Agent(Generic[Context]):
 
 		return [ActionResult(error=error_msg, include_in_memory=True)]
 
-	def _make_history_item(
+	async def _make_history_item(
 		self,
 		model_output: AgentOutput | None,
 		state: BrowserState,
@@ -659,6 +742,9 @@ class Agent(Generic[Context]):
 		history_item = AgentHistory(model_output=model_output, result=result, state=state_history, metadata=metadata)
 
 		self.state.history.history.append(history_item)
+		if self._history_store:
+			# Writes the screenshot and the step to disk
+			await asyncio.to_thread(self._history_store.append, history_item)
 
 	THINK_TAGS = re.compile(r'<think>.*?</think>', re.DOTALL)
 	STRAY_CLOSE_TAG = re.compile(r'.*?</think>', re.DOTALL)
@@ -752,6 +838,8 @@ class Agent(Generic[Context]):
 				logger.warning(f'Failed to parse model output: {response["raw"].content} {str(e)}')
 				raise ValueError('Could not parse response.')
 
+		self._last_usage = getattr(response.get('raw'), 'usage_metadata', None)
+
 		# cut the number of actions to max_actions_per_step if needed
 		if len(parsed.action) > self.settings.max_actions_per_step:
 			parsed.action = parsed.action[: self.settings.max_actions_per_step]
@@ -761,6 +849,19 @@ class Agent(Generic[Context]):
 
 		return parsed
 
+	@staticmethod
+	def _cached_input_tokens(usage: Optional[dict]) -> tuple[Optional[int], Optional[float]]:
+		"""Cached input tokens and their share of all input tokens, from the usage reported with the LLM response"""
+		if not usage or not usage.get('input_tokens'):
+			return None, None
+		details = usage.get('input_token_details') or {}
+		if 'cache_read' not in details:
+			return None, None
+		cached = details['cache_read'] or 0
+		ratio = cached / usage['input_tokens']
+		logger.debug(f'Prompt cache: {cached}/{usage["input_tokens"]} input tokens ({ratio:.0%})')
+		return cached, ratio
+
 	def _log_agent_run(self) -> None:
 		"""Log the agent run"""
 		logger.info(f'🚀 Starting task: {self.task}')
@@ -852,12 +953,15 @@ class Agent(Generic[Context]):
 						break
 
 				if on_step_start is not None:
+					# The hook may change the page, so a prefetched state could be outdated
+					self._cancel_state_prefetch()
 					await on_step_start(self)
 
 				step_info = AgentStepInfo(step_number=step, max_steps=max_steps)
 				await self.step(step_info)
 
 				if on_step_end is not None:
+					self._cancel_state_prefetch()
 					await on_step_end(self)
 
 				if self.state.history.is_done():
@@ -870,20 +974,21 @@ class Agent(Generic[Context]):
 			else:
 				error_message = 'Failed to complete task in maximum steps'
 
-				self.state.history.history.append(
-					AgentHistory(
-						model_output=None,
-						result=[ActionResult(error=error_message, include_in_memory=True)],
-						state=BrowserStateHistory(
-							url='',
-							title='',
-							tabs=[],
-							interacted_element=[],
-							screenshot=None,
-						),
-						metadata=None,
-					)
+				history_item = AgentHistory(
+					model_output=None,
+					result=[ActionResult(error=error_message, include_in_memory=True)],
+					state=BrowserStateHistory(
+						url='',
+						title='',
+						tabs=[],
+						interacted_element=[],
+						screenshot=None,
+					),
+					metadata=None,
 				)
+				self.state.history.history.append(history_item)
+				if self._history_store:
+					await asyncio.to_thread(self._history_store.append, history_item)
 
 				logger.info(f'❌ {error_message}')
 
@@ -897,6 +1002,7 @@ class Agent(Generic[Context]):
 		finally:
 			# Unregister signal handlers before cleanup
 			signal_handler.unregister()
+			self._cancel_state_prefetch()
 
 			self.telemetry.capture(
 				AgentEndTelemetryEvent(
@@ -953,17 +1059,38 @@ class Agent(Generic[Context]):
 
 		await self.browser_context.remove_highlights()
 
-		for i, action in enumerate(actions):
-			if action.get_index() is not None and i != 0:
-				new_state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
-				new_selector_map = new_state.selector_map
+		# Locate all indexed targets in one round trip instead of before each action
+		await self.browser_context.resolve_elements(
+			[cached_selector_map[index] for action in actions if (index := action.get_index()) in cached_selector_map]
+		)
+
+		# Marker of the page to tell cheaply whether the previous action changed anything
+		page_marker = await self.browser_context.probe_page_changes() if len(actions) > 1 else None
+
+		i = 0
+		while i < len(actions):
+			# Neighbouring read_only or tab_local actions are run together, see ActionEffects
+			group, effects = self._next_action_group(actions, i)
+			indexed = [action for action in group if action.get_index() is not None]
+			if indexed and i != 0:
+				new_page_marker = await self.browser_context.probe_page_changes()
+				if page_marker is not None and new_page_marker == page_marker:
+					logger.debug(f'Page unchanged after action {i} / {len(actions)}, keeping the element indices')
+					new_selector_map = await self.browser_context.get_selector_map()
+				else:
+					new_selector_map = await self.browser_context.refresh_selector_map()
+					# The recapture may have changed the page, e.g. lazily loaded elements
+					page_marker = await self.browser_context.probe_page_changes()
 
 				# Detect index change after previous action
-				orig_target = cached_selector_map.get(action.get_index())  # type: ignore
-				orig_target_hash = orig_target.hash.branch_path_hash if orig_target else None
-				new_target = new_selector_map.get(action.get_index())  # type: ignore
-				new_target_hash = new_target.hash.branch_path_hash if new_target else None
-				if orig_target_hash != new_target_hash:
+				index_changed = False
+				for action in indexed:
+					orig_target = cached_selector_map.get(action.get_index())  # type: ignore
+					orig_target_hash = orig_target.hash.branch_path_hash if orig_target else None
+					new_target = new_selector_map.get(action.get_index())  # type: ignore
+					new_target_hash = new_target.hash.branch_path_hash if new_target else None
+					index_changed = index_changed or orig_target_hash != new_target_hash
+				if index_changed:
 					msg = f'Element index changed after action {i} / {len(actions)}, because page changed.'
 					logger.info(msg)
 					results.append(ActionResult(extracted_content=msg, include_in_memory=True))
@@ -980,22 +1107,17 @@ class Agent(Generic[Context]):
 			try:
 				await self._raise_if_stopped_or_paused()
 
-				result = await self.controller.act(
-					action,
-					self.browser_context,
-					self.settings.page_extraction_llm,
-					self.sensitive_data,
-					self.settings.available_file_paths,
-					context=self.context,
-				)
-
-				results.append(result)
+				group_results = await self._act_group(group, effects)
+				results.extend(group_results)
+				i += len(group)
 
-				logger.debug(f'Executed action {i + 1} / {len(actions)}')
-				if results[-1].is_done or results[-1].error or i == len(actions) - 1:
+				logger.debug(f'Executed action {i} / {len(actions)}')
+				if any(result.is_done or result.error for result in group_results) or i == len(actions):
 					break
 
-				await asyncio.sleep(self.browser_context.config.wait_between_actions)
+				# Read only actions leave nothing to settle
+				if effects != 'read_only':
+					await asyncio.sleep(self.browser_context.config.wait_between_actions)
 				# hash all elements. if it is a subset of cached_state its fine - else break (new elements on page)
 
 			except asyncio.CancelledError:
@@ -1004,8 +1126,48 @@ class Agent(Generic[Context]):
 				if not results:
 					# Add a result for the cancelled action
 					results.append(ActionResult(error='The action was cancelled due to Ctrl+C', include_in_memory=True))
+				await self.browser_context.clear_resolved_elements()
 				raise InterruptedError('Action cancelled by user')
 
+		await self.browser_context.clear_resolved_elements()
+		return results
+
+	def _next_action_group(self, actions: list[ActionModel], start: int) -> tuple[list[ActionModel], ActionEffects]:
+		"""The action at start, with the following actions of the same effects if they can run concurrently"""
+		effects = self.controller.registry.get_effects(actions[start])
+		end = start + 1
+		if effects != 'page_mutating':
+			while end < len(actions) and self.controller.registry.get_effects(actions[end]) == effects:
+				end += 1
+		return actions[start:end], effects
+
+	async def _act_group(self, group: list[ActionModel], effects: ActionEffects) -> list[ActionResult]:
+		"""Run a group of actions from _next_action_group, with the results in the order of the actions"""
+
+		async def act(action: ActionModel) -> ActionResult:
+			return await self.controller.act(
+				action,
+				self.browser_context,
+				self.settings.page_extraction_llm,
+				self.sensitive_data,
+				self.settings.available_file_paths,
+				context=self.context,
+			)
+
+		if len(group) == 1:
+			return [await act(group[0])]
+
+		# The tab that ends up active must be the one of the last action, so it runs after the others
+		concurrent = group[:-1] if effects == 'tab_local' else group
+		logger.debug(f'Running {len(concurrent)} {effects} actions concurrently')
+		outcomes = await asyncio.gather(*(act(action) for action in concurrent), return_exceptions=True)
+		results: list[ActionResult] = []
+		for outcome in outcomes:
+			if isinstance(outcome, BaseException):
+				raise outcome
+			results.append(outcome)
+		if effects == 'tab_local':
+			results.append(await act(group[-1]))
 		return results
 
 	async def _validate_output(self) -> bool:
@@ -1165,7 +1327,7 @@ class Agent(Generic[Context]):
 		if not historical_element or not current_state.element_tree:
 			return action
 
-		current_element = HistoryTreeProcessor.find_history_element_in_tree(historical_element, current_state.element_tree)
+		current_element = HistoryTreeProcessor.find_history_element_in_state(historical_element, current_state)
 
 		if not current_element or current_element.highlight_index is None:
 			return None
@@ -1182,7 +1344,7 @@ class Agent(Generic[Context]):
 		Load history from file and rerun it.
 
 		Args:
-				history_file: Path to the history file
+				history_file: Path to the history file, or the directory of a HistoryStore
 				**kwargs: Additional arguments passed to rerun_history
 		"""
 		if not history_file:
@@ -1200,6 +1362,7 @@ class Agent(Generic[Context]):
 		"""Pause the agent before the next step"""
 		print('\n\n⏸️  Got Ctrl+C, paused the agent and left the browser open.')
 		self.state.paused = True
+		self._cancel_state_prefetch()
 
 		# The signal handler will handle the asyncio pause logic for us
 		# No need to duplicate the code here
@@ -1225,6 +1388,7 @@ class Agent(Generic[Context]):
 		"""Stop the agent"""
 		logger.info('⏹️ Agent stopping')
 		self.state.stopped = True
+		self._cancel_state_prefetch()
 
 	def _convert_initial_actions(self, actions: List[Dict[str, Dict[str, Any]]]) -> List[ActionModel]:
 		"""Convert dictionary-based actions to ActionModel instances"""
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import json
+import textwrap
 import traceback
 import uuid
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Literal, Optional, Type
 
@@ -77,6 +79,19 @@ class AgentSettings(BaseModel):
 	# Playwright script generation setting
 	save_playwright_script_path: Optional[str] = None  # Path to save the generated Playwright script
 
+	# Capture the next state in the background while the step finishes
+	speculative_state_prefetch: bool = False
+
+	# Directory of a HistoryStore that each step is appended to as it completes
+	history_store_path: Optional[str] = None
+
+	# Keep the message prefix unchanged between steps, so provider prompt caching can reuse it
+	cache_friendly_prompt: bool = False
+
+	# On the same url, send only the element changes since the last full listing
+	diff_state_messages: bool = False
+	full_state_interval: int = 10  # Steps after which the full listing is sent again
+
 
 class AgentState(BaseModel):
 	"""Holds all state information for an Agent"""
@@ -123,6 +138,9 @@ class StepMetadata(BaseModel):
 	step_end_time: float
 	input_tokens: int  # Approximate tokens from message manager for this step
 	step_number: int
+	state_capture_timings: dict[str, float] = Field(default_factory=dict)  # Seconds per browser state capture stage
+	cached_input_tokens: Optional[int] = None  # Input tokens the provider read from its prompt cache, if reported
+	cached_token_ratio: Optional[float] = None  # Share of the reported input tokens that were cached
 
 	@property
 	def duration_seconds(self) -> float:
@@ -154,8 +172,10 @@ class AgentOutput(BaseModel):
 	)
 
 	@staticmethod
+	# Bounded, the cache is shared by every agent and registry of the process
+	@lru_cache(maxsize=64)
 	def type_with_custom_actions(custom_actions: Type[ActionModel]) -> Type['AgentOutput']:
-		"""Extend actions with custom actions"""
+		"""Extend actions with custom actions, one model per action model (see Registry.create_action_model)"""
 		model_ = create_model(
 			'AgentOutput',
 			__base__=AgentOutput,
@@ -191,6 +211,18 @@ class AgentHistory(BaseModel):
 				elements.append(None)
 		return elements
 
+	@staticmethod
+	def load_from_dict(data: dict, output_model: Type[AgentOutput]) -> AgentHistory:
+		"""Validate one serialized history item, enriching the actions with the custom actions of output_model"""
+		if data['model_output']:
+			if isinstance(data['model_output'], dict):
+				data['model_output'] = output_model.model_validate(data['model_output'])
+			else:
+				data['model_output'] = None
+		if 'interacted_element' not in data['state']:
+			data['state']['interacted_element'] = None
+		return AgentHistory.model_validate(data)
+
 	def model_dump(self, **kwargs) -> Dict[str, Any]:
 		"""Custom serialization handling circular references"""
 
@@ -249,12 +281,25 @@ class AgentHistoryList(BaseModel):
 		return self.__str__()
 
 	def save_to_file(self, filepath: str | Path) -> None:
-		"""Save history to JSON file with proper serialization"""
+		"""
+		Save history to JSON file with proper serialization.
+
+		The items are serialized and written one at a time, the file is the same as
+		json.dump(self.model_dump(), f, indent=2) would write.
+		"""
 		try:
 			Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-			data = self.model_dump()
 			with open(filepath, 'w', encoding='utf-8') as f:
-				json.dump(data, f, indent=2)
+				if not self.history:
+					f.write('{\n  "history": []\n}')
+					return
+
+				f.write('{\n  "history": [\n')
+				for i, h in enumerate(self.history):
+					if i:
+						f.write(',\n')
+					f.write(textwrap.indent(json.dumps(h.model_dump(), indent=2), '    '))
+				f.write('\n  ]\n}')
 		except Exception as e:
 			raise e
 
@@ -295,20 +340,16 @@ class AgentHistoryList(BaseModel):
 
 	@classmethod
 	def load_from_file(cls, filepath: str | Path, output_model: Type[AgentOutput]) -> 'AgentHistoryList':
-		"""Load history from JSON file"""
+		"""Load history from JSON file, or from the directory of a HistoryStore"""
+		from browser_use.agent.history_store import HistoryStore
+
+		if HistoryStore.is_store(filepath):
+			return HistoryStore(filepath).load(output_model)
+
 		with open(filepath, 'r', encoding='utf-8') as f:
 			data = json.load(f)
 		# loop through history and validate output_model actions to enrich with custom actions
-		for h in data['history']:
-			if h['model_output']:
-				if isinstance(h['model_output'], dict):
-					h['model_output'] = output_model.model_validate(h['model_output'])
-				else:
-					h['model_output'] = None
-			if 'interacted_element' not in h['state']:
-				h['state']['interacted_element'] = None
-		history = cls.model_validate(data)
-		return history
+		return cls(history=[AgentHistory.load_from_dict(h, output_model) for h in data['history']])
 
 	def last_action(self) -> None | dict:
 		"""Last action in history"""
@@ -357,7 +398,7 @@ class AgentHistoryList(BaseModel):
 
 	def screenshots(self) -> list[str | None]:
 		"""Get all screenshots from history"""
-		return [h.state.screenshot if h.state.screenshot is not None else None for h in self.history]
+		return [h.state.get_screenshot() for h in self.history]
 
 	def action_names(self) -> list[str]:
 		"""Get all action names from history"""
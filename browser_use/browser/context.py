@@ -5,14 +5,16 @@ Playwright browser on steroids.
 import asyncio
 import base64
 import gc
+import io
 import json
 import logging
 import os
 import re
 import time
 import uuid
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, Optional
+import weakref
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Literal, Optional
 
 import anyio
 from patchright._impl._errors import TimeoutError
@@ -21,6 +23,7 @@ from patchright.async_api import (
 	BrowserContext as PlaywrightBrowserContext,
 )
 from patchright.async_api import (
+	CDPSession,
 	ElementHandle,
 	FrameLocator,
 	Page,
@@ -33,7 +36,9 @@ from browser_use.browser.views import (
 	TabInfo,
 	URLNotAllowedError,
 )
+from browser_use.browser.wait_profiles import PageLoadSample, PageLoadWaits, WaitProfileStore
 from browser_use.dom.clickable_element_processor.service import ClickableElementProcessor
+from browser_use.dom.element_hash_processor.service import ElementHashProcessor
 from browser_use.dom.service import DomService
 from browser_use.dom.views import DOMElementNode, SelectorMap
 from browser_use.utils import time_execution_async, time_execution_sync
@@ -51,6 +56,132 @@ BROWSER_NAVBAR_HEIGHT = {
 	'linux': 90,
 }.get(platform.system().lower(), 85)
 
+# Requests _wait_for_stable_network waits for
+NETWORK_RELEVANT_RESOURCE_TYPES = frozenset(
+	{
+		'document',
+		'stylesheet',
+		'image',
+		'font',
+		'script',
+		'iframe',
+	}
+)
+
+NETWORK_RELEVANT_CONTENT_TYPES = (
+	'text/html',
+	'text/css',
+	'application/javascript',
+	'image/',
+	'font/',
+	'application/json',
+)
+
+NETWORK_STREAMING_CONTENT_TYPES = (
+	'streaming',
+	'video',
+	'audio',
+	'webm',
+	'mp4',
+	'event-stream',
+	'websocket',
+	'protobuf',
+)
+
+# Additional patterns to filter out
+NETWORK_IGNORED_URL_PATTERNS = (
+	# Analytics and tracking
+	'analytics',
+	'tracking',
+	'telemetry',
+	'beacon',
+	'metrics',
+	# Ad-related
+	'doubleclick',
+	'adsystem',
+	'adserver',
+	'advertising',
+	# Social media widgets
+	'facebook.com/plugins',
+	'platform.twitter',
+	'linkedin.com/embed',
+	# Live chat and support
+	'livechat',
+	'zendesk',
+	'intercom',
+	'crisp.chat',
+	'hotjar',
+	# Push notifications
+	'push-notifications',
+	'onesignal',
+	'pushwoosh',
+	# Background sync/heartbeat
+	'heartbeat',
+	'ping',
+	'alive',
+	# WebRTC and streaming
+	'webrtc',
+	'rtmp://',
+	'wss://',
+	# Common CDNs for dynamic content
+	'cloudfront.net',
+	'fastly.net',
+)
+
+# Longest side of the thumbnails compared by screenshot_change_detection
+SCREENSHOT_THUMBNAIL_SIZE = 64
+# Largest per-pixel grayscale difference between thumbnails still treated as unchanged
+SCREENSHOT_CHANGE_TOLERANCE = 8
+
+# One regex instead of a substring scan per pattern for every request
+NETWORK_IGNORED_URL_RE = re.compile('|'.join(re.escape(pattern) for pattern in NETWORK_IGNORED_URL_PATTERNS))
+
+# Counts DOM mutations and scrolls in a frame, ignoring the highlight overlays and the attributes set by
+# browser-use, and returns the counters with the URL, viewport size and number of interactive elements.
+# With formState, also the focused element and the values of the form controls, which change without
+# any DOM mutation when typing, checking a box or selecting an option.
+PAGE_CHANGE_PROBE_JS = """
+(formState) => {
+	let probe = window.__browserUseChangeProbe;
+	if (!probe) {
+		probe = window.__browserUseChangeProbe = { mutations: 0, scrolls: 0, focusIds: new WeakMap(), nextFocusId: 0 };
+		const ignoredAttributes = new Set(['browser-user-highlight-id', 'browser-use-frame-key']);
+		const isHighlight = (node) => {
+			const element = node && node.nodeType === Node.ELEMENT_NODE ? node : node && node.parentElement;
+			return Boolean(element && element.closest('#playwright-highlight-container'));
+		};
+		new MutationObserver((records) => {
+			for (const record of records) {
+				if (record.type === 'attributes' && ignoredAttributes.has(record.attributeName)) continue;
+				if (isHighlight(record.target)) continue;
+				if (record.type === 'childList' && [...record.addedNodes, ...record.removedNodes].every(isHighlight)) continue;
+				probe.mutations++;
+			}
+		}).observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+		window.addEventListener('scroll', () => probe.scrolls++, { capture: true, passive: true });
+	}
+	const marker = [
+		location.href,
+		probe.mutations,
+		probe.scrolls,
+		window.innerWidth,
+		window.innerHeight,
+		document.querySelectorAll('a, button, input, select, textarea, [role], [onclick], [tabindex], [contenteditable]').length,
+	];
+	if (formState) {
+		const focused = document.activeElement;
+		if (focused && !probe.focusIds.has(focused)) probe.focusIds.set(focused, probe.nextFocusId++);
+		marker.push(
+			focused ? probe.focusIds.get(focused) : -1,
+			[...document.querySelectorAll('input, select, textarea')]
+				.map((control) => control.tagName === 'SELECT' ? `${control.selectedIndex}` : `${control.checked ? 1 : 0}${control.value}`)
+				.join('\\u0000'),
+		);
+	}
+	return marker;
+}
+"""
+
 
 class BrowserContextWindowSize(BaseModel):
 	"""Window size configuration for browser context"""
@@ -96,6 +227,15 @@ class BrowserContextConfig(BaseModel):
 	    wait_between_actions: 1.0
 	        Time to wait between multiple per step actions
 
+	    adaptive_page_load_wait: False
+	        Learn per domain how long pages take to load and use that instead of the minimum, network idle and maximum waits above on later visits.
+
+	    wait_profiles_file: None
+	        File to persist the learned page load waits in, so they survive restarts. Only used with adaptive_page_load_wait.
+
+	    wait_profiles_route_depth: 0
+	        Learn the page load waits per route instead of per domain, by this many leading path segments. Segments that look like IDs are grouped.
+
 	    browser_window_size: BrowserContextWindowSize(width=1280, height=1100)
 	        Default browser window size
 
@@ -120,9 +260,36 @@ class BrowserContextConfig(BaseModel):
 	    highlight_elements: True
 	        Highlight elements in the DOM on the screen
 
+	    highlight_renderer: 'dom'
+	        How highlights are drawn: 'dom' adds an overlay and a label element per highlighted element, 'canvas' draws all of them onto a single canvas element, which is faster to draw and remove on pages with many interactive elements.
+
 	    viewport_expansion: 0
 	        Viewport expansion in pixels. This amount will increase the number of elements which are included in the state what the LLM will see. If set to -1, all elements will be included (this leads to high token usage). If set to 0, only the elements which are visible in the viewport will be included.
 
+	    incremental_dom_snapshots: False
+	        Track DOM mutations in the page between steps and only re-walk the subtrees that changed. Unchanged parts of the element tree are reused from the previous step.
+
+	    screenshot_format: 'png'
+	        Image format of the screenshots: 'png', 'jpeg' or 'webp'. JPEG and WebP are much smaller and faster to encode.
+
+	    screenshot_quality: 80
+	        Compression quality (0-100) for 'jpeg' and 'webp' screenshots.
+
+	    screenshot_max_dimension: None
+	        Downscale screenshots so their longest side is at most this many pixels. Smaller images cost fewer vision tokens.
+
+	    screenshot_change_detection: False
+	        Reuse the previous screenshot if no element or form field changed, the focus did not move and nothing scrolled since the previous step, and a small thumbnail of the page looks the same.
+
+	    columnar_dom_payload: False
+	        Transfer the extracted DOM tree as parallel arrays with an interned string table instead of one object per node. Reduces the payload size and decode time on large pages.
+
+	    parallel_frame_extraction: False
+	        Extract every frame of the page concurrently and stitch the frame trees together, instead of walking iframes from the top document. Ad and hidden frames are skipped. Incremental snapshots are not used in this mode.
+
+	    lazy_viewport_extraction: False
+	        Extract only the viewport band (plus viewport_expansion) at first, and add the band around the current scroll position on every later step. Parts of the page already captured are reused and not walked again. Meant for infinite-scroll feeds. Use expand_dom_snapshot() to capture more of the page below the viewport. Has no effect with viewport_expansion -1.
+
 	    allowed_domains: None
 	        List of allowed domains that can be accessed. If None, all domains are allowed.
 	        Example: ['example.com', 'api.example.com']
@@ -167,6 +334,9 @@ class BrowserContextConfig(BaseModel):
 	wait_for_network_idle_page_load_time: float = 0.5
 	maximum_wait_page_load_time: float = 5
 	wait_between_actions: float = 0.5
+	adaptive_page_load_wait: bool = False
+	wait_profiles_file: str | None = None
+	wait_profiles_route_depth: int = 0
 
 	disable_security: bool = False  # disable_security=True is dangerous as any malicious URL visited could embed an iframe for the user's bank, and use their cookies to steal money
 
@@ -183,7 +353,16 @@ class BrowserContextConfig(BaseModel):
 	user_agent: str | None = None
 
 	highlight_elements: bool = True
+	highlight_renderer: Literal['dom', 'canvas'] = 'dom'
 	viewport_expansion: int = 0
+	incremental_dom_snapshots: bool = False
+	columnar_dom_payload: bool = False
+	screenshot_format: Literal['png', 'jpeg', 'webp'] = 'png'
+	screenshot_quality: int = 80
+	screenshot_max_dimension: int | None = None
+	screenshot_change_detection: bool = False
+	parallel_frame_extraction: bool = False
+	lazy_viewport_extraction: bool = False
 	allowed_domains: list[str] | None = None
 	include_dynamic_attributes: bool = True
 	http_credentials: dict[str, str] | None = None
@@ -260,6 +439,15 @@ class BrowserSession:
 
 		self.cached_state_clickable_elements_hashes: CachedStateClickableElementsHashes | None = None
 
+		# One DomService per page, so incremental snapshots can reuse the previous tree
+		self.dom_services: dict[Page, DomService] = {}
+
+		# CDP sessions for Page.captureScreenshot, one per page
+		self.cdp_sessions: dict[Page, CDPSession] = {}
+
+		# Page change marker, thumbnail and screenshot of the last state, for screenshot_change_detection
+		self.last_screenshot: tuple[tuple, bytes, str] | None = None
+
 		self.context.on('page', lambda page: page.add_init_script(init_script))
 
 
@@ -290,6 +478,18 @@ class BrowserContext:
 		self.session: BrowserSession | None = None
 		self.active_tab: Page | None = None
 
+		# Learned page load waits, see BrowserContextConfig.adaptive_page_load_wait
+		self.wait_profiles = (
+			WaitProfileStore(self.config.wait_profiles_file, self.config.wait_profiles_route_depth)
+			if self.config.adaptive_page_load_wait
+			else None
+		)
+		# Per page, URL and performance.timeOrigin of the document the last page load wait ended on
+		self._loaded_documents: weakref.WeakKeyDictionary[Page, tuple[str, float]] = weakref.WeakKeyDictionary()
+
+		# Handles located ahead of time by resolve_elements, keyed by ElementHashProcessor.element_key
+		self._resolved_elements: dict[str, ElementHandle] = {}
+
 	async def __aenter__(self):
 		"""Async context manager entry"""
 		await self._initialize_session()
@@ -318,6 +518,10 @@ class BrowserContext:
 
 			await self.save_cookies()
 
+			if self.wait_profiles:
+				logger.debug(f'Page load wait profiles: {self.wait_profiles.metrics}')
+				await self.wait_profiles.save()
+
 			if self.config.trace_path:
 				try:
 					await self.session.context.tracing.stop(path=os.path.join(self.config.trace_path, f'{self.context_id}.zip'))
@@ -548,174 +752,143 @@ class BrowserContext:
 		except Exception as e:
 			logger.debug(f'Failed to set viewport size for page: {e}')
 
-	async def _wait_for_stable_network(self):
+	async def _wait_for_stable_network(
+		self,
+		waits: PageLoadWaits | None = None,
+		waits_for_navigation: Callable[[str], PageLoadWaits] | None = None,
+		idle_gaps: list[float] | None = None,
+	) -> bool:
+		"""
+		Wait until no relevant request has been pending for the idle wait, or at most the maximum
+		wait (default wait_for_network_idle_page_load_time and maximum_wait_page_load_time).
+		Returns False on timeout.
+
+		Event driven: an idle timer is armed whenever the last pending request settles and
+		cancelled when a new one starts, so this returns as soon as the network is quiet.
+		If the main frame navigates meanwhile, waits_for_navigation gives the waits for its
+		new URL, the maximum counted from the start of the wait. The quiet periods that ended
+		with a new request are appended to idle_gaps.
+		"""
 		page = await self.get_current_page()
+		loop = asyncio.get_running_loop()
+		waits = waits or self._configured_page_load_waits()
 
 		pending_requests = set()
-		last_activity = asyncio.get_event_loop().time()
-
-		# Define relevant resource types and content types
-		RELEVANT_RESOURCE_TYPES = {
-			'document',
-			'stylesheet',
-			'image',
-			'font',
-			'script',
-			'iframe',
-		}
-
-		RELEVANT_CONTENT_TYPES = {
-			'text/html',
-			'text/css',
-			'application/javascript',
-			'image/',
-			'font/',
-			'application/json',
-		}
+		last_activity = loop.time()
+		network_idle = asyncio.Event()
+		idle_timer: asyncio.TimerHandle | None = None
 
-		# Additional patterns to filter out
-		IGNORED_URL_PATTERNS = {
-			# Analytics and tracking
-			'analytics',
-			'tracking',
-			'telemetry',
-			'beacon',
-			'metrics',
-			# Ad-related
-			'doubleclick',
-			'adsystem',
-			'adserver',
-			'advertising',
-			# Social media widgets
-			'facebook.com/plugins',
-			'platform.twitter',
-			'linkedin.com/embed',
-			# Live chat and support
-			'livechat',
-			'zendesk',
-			'intercom',
-			'crisp.chat',
-			'hotjar',
-			# Push notifications
-			'push-notifications',
-			'onesignal',
-			'pushwoosh',
-			# Background sync/heartbeat
-			'heartbeat',
-			'ping',
-			'alive',
-			# WebRTC and streaming
-			'webrtc',
-			'rtmp://',
-			'wss://',
-			# Common CDNs for dynamic content
-			'cloudfront.net',
-			'fastly.net',
-		}
+		def arm_idle_timer():
+			nonlocal idle_timer
+			delay = last_activity + waits.idle - loop.time()
+			idle_timer = loop.call_later(max(delay, 0), network_idle.set)
 
-		async def on_request(request):
+		def on_request(request):
+			nonlocal last_activity, idle_timer
 			# Filter by resource type
-			if request.resource_type not in RELEVANT_RESOURCE_TYPES:
-				return
-
-			# Filter out streaming, websocket, and other real-time requests
-			if request.resource_type in {
-				'websocket',
-				'media',
-				'eventsource',
-				'manifest',
-				'other',
-			}:
+			if request.resource_type not in NETWORK_RELEVANT_RESOURCE_TYPES:
 				return
 
-			# Filter out by URL patterns
+			# Filter out data URLs, blob URLs and by URL patterns
 			url = request.url.lower()
-			if any(pattern in url for pattern in IGNORED_URL_PATTERNS):
-				return
-
-			# Filter out data URLs and blob URLs
-			if url.startswith(('data:', 'blob:')):
+			if url.startswith(('data:', 'blob:')) or NETWORK_IGNORED_URL_RE.search(url):
 				return
 
 			# Filter out requests with certain headers
 			headers = request.headers
-			if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in [
-				'video',
-				'audio',
-			]:
+			if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in ('video', 'audio'):
 				return
 
-			nonlocal last_activity
+			if idle_gaps is not None and not pending_requests:
+				idle_gaps.append(loop.time() - last_activity)
 			pending_requests.add(request)
-			last_activity = asyncio.get_event_loop().time()
+			last_activity = loop.time()
+			if idle_timer is not None:
+				idle_timer.cancel()
+				idle_timer = None
 			# logger.debug(f'Request started: {request.url} ({request.resource_type})')
 
-		async def on_response(response):
-			request = response.request
+		def settle(request, is_activity: bool):
+			nonlocal last_activity
 			if request not in pending_requests:
 				return
+			pending_requests.remove(request)
+			if is_activity:
+				last_activity = loop.time()
+			if not pending_requests:
+				arm_idle_timer()
 
-			# Filter by content type if available
+		def on_response(response):
+			# Streaming, irrelevant or very large responses do not count as activity
 			content_type = response.headers.get('content-type', '').lower()
+			content_length = response.headers.get('content-length')
+			is_activity = (
+				not any(t in content_type for t in NETWORK_STREAMING_CONTENT_TYPES)
+				and any(ct in content_type for ct in NETWORK_RELEVANT_CONTENT_TYPES)
+				and not (content_length and int(content_length) > 5 * 1024 * 1024)  # 5MB
+			)
+			settle(response.request, is_activity)
+			# logger.debug(f'Request resolved: {response.request.url} ({content_type})')
 
-			# Skip if content type indicates streaming or real-time data
-			if any(
-				t in content_type
-				for t in [
-					'streaming',
-					'video',
-					'audio',
-					'webm',
-					'mp4',
-					'event-stream',
-					'websocket',
-					'protobuf',
-				]
-			):
-				pending_requests.remove(request)
-				return
+		def on_request_done(request):
+			# Failed and cancelled requests never get a response
+			settle(request, False)
 
-			# Only process relevant content types
-			if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
-				pending_requests.remove(request)
-				return
+		start = loop.time()
+		deadline = start + waits.maximum
 
-			# Skip if response is too large (likely not essential for page load)
-			content_length = response.headers.get('content-length')
-			if content_length and int(content_length) > 5 * 1024 * 1024:  # 5MB
-				pending_requests.remove(request)
-				return
-
-			nonlocal last_activity
-			pending_requests.remove(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request resolved: {request.url} ({content_type})')
+		def on_frame_navigated(frame):
+			nonlocal deadline, waits, idle_timer
+			if waits_for_navigation is not None and frame == page.main_frame:
+				waits = waits_for_navigation(frame.url)
+				deadline = start + waits.maximum
+				if idle_timer is not None:
+					idle_timer.cancel()
+					arm_idle_timer()
 
 		# Attach event listeners
 		page.on('request', on_request)
 		page.on('response', on_response)
+		page.on('requestfinished', on_request_done)
+		page.on('requestfailed', on_request_done)
+		page.on('framenavigated', on_frame_navigated)
 
 		try:
-			# Wait for idle time
-			start_time = asyncio.get_event_loop().time()
-			while True:
-				await asyncio.sleep(0.1)
-				now = asyncio.get_event_loop().time()
-				if len(pending_requests) == 0 and (now - last_activity) >= self.config.wait_for_network_idle_page_load_time:
-					break
-				if now - start_time > self.config.maximum_wait_page_load_time:
-					logger.debug(
-						f'Network timeout after {self.config.maximum_wait_page_load_time}s with {len(pending_requests)} '
-						f'pending requests: {[r.url for r in pending_requests]}'
-					)
-					break
-
+			arm_idle_timer()
+			# The deadline moves when the main frame navigates
+			while not network_idle.is_set():
+				remaining = deadline - loop.time()
+				if remaining <= 0:
+					raise asyncio.TimeoutError
+				try:
+					await asyncio.wait_for(network_idle.wait(), timeout=remaining)
+				except asyncio.TimeoutError:
+					pass
+		except asyncio.TimeoutError:
+			logger.debug(
+				f'Network timeout after {deadline - start:.2f}s with {len(pending_requests)} '
+				f'pending requests: {[r.url for r in pending_requests]}'
+			)
+			return False
 		finally:
+			if idle_timer is not None:
+				idle_timer.cancel()
 			# Clean up event listeners
 			page.remove_listener('request', on_request)
 			page.remove_listener('response', on_response)
-
-		logger.debug(f'⚖️  Network stabilized for {self.config.wait_for_network_idle_page_load_time} seconds')
+			page.remove_listener('requestfinished', on_request_done)
+			page.remove_listener('requestfailed', on_request_done)
+			page.remove_listener('framenavigated', on_frame_navigated)
+
+		logger.debug(f'⚖️  Network stabilized for {waits.idle} seconds')
+		return True
+
+	def _configured_page_load_waits(self) -> PageLoadWaits:
+		return PageLoadWaits(
+			minimum=self.config.minimum_wait_page_load_time,
+			idle=self.config.wait_for_network_idle_page_load_time,
+			maximum=self.config.maximum_wait_page_load_time,
+		)
 
 	async def _wait_for_page_and_frames_load(self, timeout_overwrite: float | None = None):
 		"""
@@ -725,10 +898,14 @@ class BrowserContext:
 		"""
 		# Start timing
 		start_time = time.time()
+		learned_load = None
 
 		# Wait for page load
 		try:
-			await self._wait_for_stable_network()
+			if self.wait_profiles:
+				learned_load = await self._wait_for_learned_page_load(start_time)
+			else:
+				await self._wait_for_stable_network()
 
 			# Check if the loaded URL is allowed
 			page = await self.get_current_page()
@@ -741,13 +918,83 @@ class BrowserContext:
 
 		# Calculate remaining time to meet minimum WAIT_TIME
 		elapsed = time.time() - start_time
-		remaining = max((timeout_overwrite or self.config.minimum_wait_page_load_time) - elapsed, 0)
+		minimum_wait = learned_load[1].minimum if learned_load else self.config.minimum_wait_page_load_time
+		remaining = max((timeout_overwrite or minimum_wait) - elapsed, 0)
 
 		logger.debug(f'--Page loaded in {elapsed:.2f} seconds, waiting for additional {remaining:.2f} seconds')
 
+		if learned_load:
+			await self._record_learned_page_load(*learned_load, start_time, remaining)
 		# Sleep remaining time if needed
+		elif remaining > 0:
+			await asyncio.sleep(remaining)
+
+	async def _wait_for_learned_page_load(self, start_time: float) -> tuple[str, PageLoadWaits, PageLoadSample] | None:
+		"""
+		_wait_for_stable_network with the learned waits of the page that is loading.
+
+		Only waits that follow a navigation are learned from, under the URL navigated to. The
+		navigation either committed before this call, then the document differs from the one
+		the last wait on this page ended on, or it commits during the wait. Returns the URL, the
+		waits and the network part of the sample for _record_learned_page_load, or None.
+		"""
+		assert self.wait_profiles is not None
+		await self.wait_profiles.load()
+		default = self._configured_page_load_waits()
+		page = await self.get_current_page()
+
+		waits = default
+		navigated = False
+		idle_gaps: list[float] = []
+
+		def waits_for_navigation(url: str) -> PageLoadWaits:
+			nonlocal waits, navigated
+			assert self.wait_profiles is not None
+			waits = self.wait_profiles.waits(url, default)
+			navigated = True
+			return waits
+
+		document = await self._get_loaded_document(page)
+		if document is not None and document != self._loaded_documents.get(page):
+			waits_for_navigation(page.url)
+
+		is_stable = await self._wait_for_stable_network(waits, waits_for_navigation, idle_gaps)
+
+		page = await self.get_current_page()
+		document = await self._get_loaded_document(page)
+		if document is not None:
+			self._loaded_documents[page] = document
+		if not navigated:
+			return None
+		sample = PageLoadSample(time.time() - start_time, not is_stable, max(idle_gaps, default=None))
+		return page.url, waits, sample
+
+	async def _record_learned_page_load(
+		self, url: str, waits: PageLoadWaits, sample: PageLoadSample, start_time: float, remaining: float
+	) -> None:
+		"""
+		Sleep the rest of the minimum wait and record the page load. The page is probed before
+		and after the sleep: the DOM settled before it if nothing changed, or is still changing.
+		"""
+		assert self.wait_profiles is not None
 		if remaining > 0:
+			before = await self.probe_page_changes()
+			settled = time.time() - start_time
 			await asyncio.sleep(remaining)
+			after = await self.probe_page_changes()
+			if before is not None and after is not None:
+				changed = before != after
+				sample = sample._replace(dom_settled=time.time() - start_time if changed else settled, dom_timed_out=changed)
+		self.wait_profiles.record(url, sample, waits, self._configured_page_load_waits())
+
+	@staticmethod
+	async def _get_loaded_document(page: Page) -> tuple[str, float] | None:
+		"""URL and time origin of the current document of a page, changes with every load"""
+		try:
+			return page.url, await page.evaluate('performance.timeOrigin')
+		except Exception:
+			# The document is being replaced
+			return None
 
 	def _is_url_allowed(self, url: str) -> bool:
 		"""Check if a URL is allowed based on the whitelist configuration."""
@@ -978,15 +1225,45 @@ class BrowserContext:
 				raise BrowserError('Browser closed: no valid pages available')
 
 		try:
-			await self.remove_highlights()
-			dom_service = DomService(page)
-			content = await dom_service.get_clickable_elements(
-				focus_element=focus_element,
-				viewport_expansion=self.config.viewport_expansion,
-				highlight_elements=self.config.highlight_elements,
-			)
+			dom_service = self._get_dom_service(session, page)
+			timings: dict[str, float] = {}
 
-			tabs_info = await self.get_tabs_info()
+			async def timed(stage: str, awaitable):
+				start = time.perf_counter()
+				try:
+					return await awaitable
+				finally:
+					timings[stage] = time.perf_counter() - start
+
+			async def capture_dom_and_screenshot():
+				# Highlights are removed, drawn by the DOM walk, then captured in the screenshot
+				await timed('remove_highlights', self.remove_highlights())
+				content = await timed(
+					'dom',
+					dom_service.get_clickable_elements(
+						focus_element=focus_element,
+						viewport_expansion=self.config.viewport_expansion,
+						highlight_elements=self.config.highlight_elements,
+						highlight_renderer=self.config.highlight_renderer,
+						incremental=self.config.incremental_dom_snapshots,
+						columnar=self.config.columnar_dom_payload,
+						parallel_frames=self.config.parallel_frame_extraction,
+						lazy=self.config.lazy_viewport_extraction,
+					),
+				)
+				screenshot = await timed('screenshot', self._take_state_screenshot(session, page))
+				return content, screenshot
+
+			# Tabs, scroll position and title do not depend on the highlights, fetch them meanwhile
+			start = time.perf_counter()
+			(content, (screenshot_b64, screenshot_unchanged)), tabs_info, scroll_info, title = await asyncio.gather(
+				capture_dom_and_screenshot(),
+				timed('tabs', self.get_tabs_info()),
+				timed('scroll_info', self.get_scroll_info(page)),
+				timed('title', page.title()),
+			)
+			timings['total'] = time.perf_counter() - start
+			pixels_above, pixels_below = scroll_info
 
 			# Get all cross-origin iframes within the page and open them in new tabs
 			# mark the titles of the new tabs so the LLM knows to check them for additional content
@@ -1008,18 +1285,18 @@ class BrowserContext:
 			# 		)
 			# 	)
 
-			screenshot_b64 = await self.take_screenshot()
-			pixels_above, pixels_below = await self.get_scroll_info(page)
-
 			self.current_state = BrowserState(
 				element_tree=content.element_tree,
 				selector_map=content.selector_map,
 				url=page.url,
-				title=await page.title(),
+				title=title,
 				tabs=tabs_info,
 				screenshot=screenshot_b64,
+				screenshot_mime_type=f'image/{self.config.screenshot_format}',
+				screenshot_unchanged=screenshot_unchanged,
 				pixels_above=pixels_above,
 				pixels_below=pixels_below,
+				capture_timings=timings,
 			)
 
 			return self.current_state
@@ -1030,6 +1307,42 @@ class BrowserContext:
 				return self.current_state
 			raise
 
+	def _get_dom_service(self, session: BrowserSession, page: Page) -> DomService:
+		"""Get the DomService of a page, creating it on first use"""
+		dom_service = session.dom_services.get(page)
+		if dom_service is None:
+			# Drop services of closed pages before adding a new one
+			for closed_page in [p for p in session.dom_services if p.is_closed()]:
+				del session.dom_services[closed_page]
+			dom_service = DomService(page)
+			session.dom_services[page] = dom_service
+		return dom_service
+
+	async def prewarm(self) -> None:
+		"""
+		Prepare the next state capture while the browser is otherwise idle, e.g. during the LLM call:
+		installs buildDomTree.js, opens the CDP session used for screenshots and loads the wait profiles.
+		Failures are only logged, the state capture does the same work again if needed.
+		"""
+		try:
+			session = await self.get_session()
+			page = await self.get_current_page()
+			await self._get_dom_service(session, page).prewarm()
+			# Screenshots go through CDP unless they are plain PNGs
+			config = self.config
+			if config.screenshot_format != 'png' or config.screenshot_max_dimension or config.screenshot_change_detection:
+				await self._get_cdp_session(session, page)
+			if self.wait_profiles:
+				await self.wait_profiles.load()
+		except Exception as e:
+			logger.debug(f'Failed to prewarm the state capture: {str(e)}')
+
+	async def expand_dom_snapshot(self, pixels: int) -> None:
+		"""Capture this many more pixels below the viewport in the next state (lazy_viewport_extraction only)"""
+		session = await self.get_session()
+		page = await self.get_current_page()
+		self._get_dom_service(session, page).expand_next_snapshot(pixels)
+
 	# region - Browser Actions
 	@time_execution_async('--take_screenshot')
 	async def take_screenshot(self, full_page: bool = False) -> str:
@@ -1041,6 +1354,18 @@ class BrowserContext:
 		await page.bring_to_front()
 		await page.wait_for_load_state()
 
+		return await self._screenshot_page(page, full_page)
+
+	async def _screenshot_page(self, page: Page, full_page: bool = False) -> str:
+		"""Base64 screenshot in the configured format and size"""
+		if self.config.screenshot_format != 'png' or self.config.screenshot_max_dimension:
+			return await self._capture_screenshot(
+				page,
+				self.config.screenshot_format,
+				self.config.screenshot_max_dimension,
+				full_page=full_page,
+			)
+
 		screenshot = await page.screenshot(
 			full_page=full_page,
 			animations='disabled',
@@ -1052,6 +1377,100 @@ class BrowserContext:
 
 		return screenshot_b64
 
+	async def _take_state_screenshot(self, session: BrowserSession, page: Page) -> tuple[str, bool]:
+		"""
+		Screenshot for the browser state. With screenshot_change_detection, the previous
+		screenshot is returned again if probe_page_changes reports no DOM change, form control
+		change, focus change or scroll since it was taken and a thumbnail of the page still
+		looks the same, e.g. no video or canvas changed. Returns the base64 screenshot and
+		whether it was reused.
+		"""
+		if not self.config.screenshot_change_detection:
+			return await self.take_screenshot(), False
+
+		await page.bring_to_front()
+		await page.wait_for_load_state()
+
+		marker, thumbnail_b64 = await asyncio.gather(
+			self.probe_page_changes(form_state=True),
+			self._capture_screenshot(page, 'png', SCREENSHOT_THUMBNAIL_SIZE),
+		)
+		thumbnail = base64.b64decode(thumbnail_b64)
+		last = session.last_screenshot
+		if (
+			last is not None
+			and marker is not None
+			and marker[0] is page
+			and last[0] == marker
+			and self._thumbnails_match(last[1], thumbnail)
+		):
+			return last[2], True
+
+		screenshot_b64 = await self._screenshot_page(page)
+		session.last_screenshot = (marker, thumbnail, screenshot_b64) if marker is not None else None
+		return screenshot_b64, False
+
+	@time_execution_async('--capture_screenshot')
+	async def _capture_screenshot(
+		self,
+		page: Page,
+		image_format: str,
+		max_dimension: int | None,
+		full_page: bool = False,
+	) -> str:
+		"""
+		Capture with CDP Page.captureScreenshot, which encodes JPEG/WebP and downscales in the
+		browser and returns base64 directly.
+		"""
+		cdp_session = await self._get_cdp_session(await self.get_session(), page)
+
+		x, y, width, height = await page.evaluate(
+			"""(fullPage) => fullPage
+				? [0, 0, document.documentElement.scrollWidth, document.documentElement.scrollHeight]
+				: [window.scrollX, window.scrollY, window.innerWidth, window.innerHeight]""",
+			full_page,
+		)
+		scale = min(1.0, max_dimension / max(width, height, 1)) if max_dimension else 1.0
+
+		params: dict = {
+			'format': image_format,
+			'clip': {'x': x, 'y': y, 'width': width, 'height': height, 'scale': scale},
+			'captureBeyondViewport': full_page,
+		}
+		if image_format != 'png':
+			params['quality'] = self.config.screenshot_quality
+
+		result = await cdp_session.send('Page.captureScreenshot', params)
+		return result['data']
+
+	async def _get_cdp_session(self, session: BrowserSession, page: Page) -> CDPSession:
+		"""Get the CDP session of a page, creating it on first use"""
+		cdp_session = session.cdp_sessions.get(page)
+		if cdp_session is None:
+			for closed_page in [p for p in session.cdp_sessions if p.is_closed()]:
+				del session.cdp_sessions[closed_page]
+			cdp_session = await session.context.new_cdp_session(page)
+			session.cdp_sessions[page] = cdp_session
+		return cdp_session
+
+	@staticmethod
+	def _thumbnails_match(previous: bytes, current: bytes) -> bool:
+		"""Compare two PNG thumbnails, with a small per-pixel tolerance if Pillow is installed"""
+		if previous == current:
+			return True
+
+		try:
+			from PIL import Image, ImageChops
+		except ImportError:
+			return False
+
+		previous_image = Image.open(io.BytesIO(previous)).convert('L')
+		current_image = Image.open(io.BytesIO(current)).convert('L')
+		if previous_image.size != current_image.size:
+			return False
+		_, max_difference = ImageChops.difference(previous_image, current_image).getextrema()
+		return max_difference <= SCREENSHOT_CHANGE_TOLERANCE
+
 	@time_execution_async('--remove_highlights')
 	async def remove_highlights(self):
 		"""
@@ -1060,8 +1479,12 @@ class BrowserContext:
 		"""
 		try:
 			page = await self.get_current_page()
-			await page.evaluate(
-				"""
+			# Highlights of separately extracted frames are drawn inside the frames
+			frames = page.frames if self.config.parallel_frame_extraction else [page.main_frame]
+			await asyncio.gather(
+				*(
+					frame.evaluate(
+						"""
                 try {
                     // Remove the highlight container and all its contents
                     const container = document.getElementById('playwright-highlight-container');
@@ -1078,6 +1501,9 @@ class BrowserContext:
                     console.error('Failed to remove highlights:', e);
                 }
                 """
+					)
+					for frame in frames
+				)
 			)
 		except Exception as e:
 			logger.debug(f'⚠  Failed to remove highlights (this is usually ok): {str(e)}')
@@ -1300,6 +1726,92 @@ class BrowserContext:
 			logger.error(f'❌  Failed to locate element: {str(e)}')
 			return None
 
+	@time_execution_async('--resolve_elements')
+	async def resolve_elements(self, elements: list[DOMElementNode]) -> None:
+		"""
+		Locate several elements with a single evaluate call, e.g. all targets of the actions
+		of one step. The handles are used by the next _click_element_node and
+		_input_text_element_node calls on the same elements instead of get_locate_element.
+
+		Elements inside same-origin iframes are found through the iframe documents. Those in
+		cross-origin iframes are left to get_locate_element.
+		"""
+		await self.clear_resolved_elements()
+		if not elements:
+			return
+
+		# For every element, the selectors of its iframe ancestors from the top, then its own
+		selector_chains = []
+		for element in elements:
+			chain = [self._enhanced_css_selector_for_element(element, self.config.include_dynamic_attributes)]
+			current = element.parent
+			while current is not None:
+				if current.tag_name == 'iframe':
+					chain.append(self._enhanced_css_selector_for_element(current, self.config.include_dynamic_attributes))
+				current = current.parent
+			chain.reverse()
+			selector_chains.append(chain)
+
+		try:
+			page = await self.get_current_page()
+			array_handle = await page.evaluate_handle(
+				"""
+				(selectorChains) => selectorChains.map((chain) => {
+					let root = document;
+					let element = null;
+					for (const selector of chain) {
+						if (!root) return null;
+						element = root.querySelector(selector);
+						root = element && element.tagName === 'IFRAME' ? element.contentDocument : null;
+					}
+					return element;
+				})
+				""",
+				selector_chains,
+			)
+			try:
+				properties = await array_handle.get_properties()
+			finally:
+				await array_handle.dispose()
+		except Exception as e:
+			logger.debug(f'Failed to resolve elements in batch, locating them one by one: {str(e)}')
+			return
+
+		# Property name of the handle kept for each element
+		kept: dict[str, str] = {}
+		for i, element in enumerate(elements):
+			property_handle = properties.get(str(i))
+			element_handle = property_handle.as_element() if property_handle else None
+			if element_handle is not None:
+				key = ElementHashProcessor.element_key(element)
+				self._resolved_elements[key] = element_handle
+				kept[key] = str(i)
+
+		# Null entries, the length and repeated elements would otherwise stay alive in the page
+		kept_names = set(kept.values())
+		await asyncio.gather(
+			*(handle.dispose() for name, handle in properties.items() if name not in kept_names),
+			return_exceptions=True,
+		)
+
+	async def clear_resolved_elements(self) -> None:
+		"""Release the handles of resolve_elements that were not used"""
+		handles = list(self._resolved_elements.values())
+		self._resolved_elements = {}
+		await asyncio.gather(*(handle.dispose() for handle in handles), return_exceptions=True)
+
+	async def _get_element_handle(self, element: DOMElementNode) -> Optional[ElementHandle]:
+		"""Handle from resolve_elements if the element is still attached, otherwise get_locate_element"""
+		element_handle = self._resolved_elements.pop(ElementHashProcessor.element_key(element), None)
+		if element_handle is not None:
+			try:
+				if await element_handle.evaluate('el => el.isConnected'):
+					return element_handle
+				await element_handle.dispose()
+			except Exception:
+				pass
+		return await self.get_locate_element(element)
+
 	@time_execution_async('--get_locate_element_by_xpath')
 	async def get_locate_element_by_xpath(self, xpath: str) -> Optional[ElementHandle]:
 		"""
@@ -1389,7 +1901,7 @@ class BrowserContext:
 			# if element_node.highlight_index is not None:
 			# 	await self._update_state(focus_element=element_node.highlight_index)
 
-			element_handle = await self.get_locate_element(element_node)
+			element_handle = await self._get_element_handle(element_node)
 
 			if element_handle is None:
 				raise BrowserError(f'Element: {repr(element_node)} not found')
@@ -1435,7 +1947,7 @@ class BrowserContext:
 			# if element_node.highlight_index is not None:
 			# 	await self._update_state(focus_element=element_node.highlight_index)
 
-			element_handle = await self.get_locate_element(element_node)
+			element_handle = await self._get_element_handle(element_node)
 
 			if element_handle is None:
 				raise Exception(f'Element: {repr(element_node)} not found')
@@ -1489,18 +2001,17 @@ class BrowserContext:
 		"""Get information about all tabs"""
 		session = await self.get_session()
 
-		tabs_info = []
-		for page_id, page in enumerate(session.context.pages):
+		async def get_tab_info(page_id: int, page: Page) -> TabInfo:
 			try:
-				tab_info = TabInfo(page_id=page_id, url=page.url, title=await asyncio.wait_for(page.title(), timeout=1))
+				return TabInfo(page_id=page_id, url=page.url, title=await asyncio.wait_for(page.title(), timeout=1))
 			except asyncio.TimeoutError:
 				# page.title() can hang forever on tabs that are crashed/disappeared/about:blank
 				# we dont want to try automating those tabs because they will hang the whole script
 				logger.debug('⚠  Failed to get tab info for tab #%s: %s (ignoring)', page_id, page.url)
-				tab_info = TabInfo(page_id=page_id, url='about:blank', title='ignore this tab and do not use it')
-			tabs_info.append(tab_info)
+				return TabInfo(page_id=page_id, url='about:blank', title='ignore this tab and do not use it')
 
-		return tabs_info
+		# Titles are fetched concurrently, one hanging tab costs the timeout once instead of per tab
+		return list(await asyncio.gather(*(get_tab_info(page_id, page) for page_id, page in enumerate(session.context.pages))))
 
 	@time_execution_async('--switch_to_tab')
 	async def switch_to_tab(self, page_id: int) -> None:
@@ -1605,6 +2116,51 @@ class BrowserContext:
 			self.active_tab = page
 			return page
 
+	@time_execution_async('--probe_page_changes')
+	async def probe_page_changes(self, form_state: bool = False) -> Optional[tuple]:
+		"""
+		Cheap marker of the current page, much faster than get_state. Two equal markers mean
+		that no element was added, removed or changed and nothing was scrolled in between, in
+		any frame. The first call installs the counters, so take a marker before the actions
+		to compare against. With form_state, the marker also changes when the focus or the value
+		of a form control changes. Returns None if the page could not be probed.
+		"""
+		try:
+			page = await self.get_current_page()
+			frames = [frame for frame in page.frames if not frame.is_detached()]
+			markers = await asyncio.gather(*(frame.evaluate(PAGE_CHANGE_PROBE_JS, form_state) for frame in frames))
+		except Exception as e:
+			logger.debug(f'Failed to probe the page for changes: {str(e)}')
+			return None
+		return (page, *(tuple(marker) for marker in markers))
+
+	@time_execution_async('--refresh_selector_map')
+	async def refresh_selector_map(self) -> SelectorMap:
+		"""
+		Extract the interactive elements again without a screenshot, e.g. between the actions of
+		one step, and update the selector map of the cached and current state with them. The
+		elements are numbered as in get_state, but no highlights are drawn.
+		"""
+		await self._wait_for_page_and_frames_load()
+		session = await self.get_session()
+		page = await self.get_current_page()
+		content = await self._get_dom_service(session, page).get_clickable_elements(
+			viewport_expansion=self.config.viewport_expansion,
+			highlight_elements=self.config.highlight_elements,
+			highlight_renderer=self.config.highlight_renderer,
+			incremental=self.config.incremental_dom_snapshots,
+			columnar=self.config.columnar_dom_payload,
+			parallel_frames=self.config.parallel_frame_extraction,
+			lazy=self.config.lazy_viewport_extraction,
+			draw_highlights=False,
+		)
+		changes = {'element_tree': content.element_tree, 'selector_map': content.selector_map, 'url': page.url}
+		if session.cached_state is not None:
+			session.cached_state = replace(session.cached_state, **changes)
+		if hasattr(self, 'current_state'):
+			self.current_state = replace(self.current_state, **changes)
+		return content.selector_map
+
 	async def get_selector_map(self) -> SelectorMap:
 		session = await self.get_session()
 		if session.cached_state is None:
@@ -1666,9 +2222,9 @@ class BrowserContext:
 
 	async def get_scroll_info(self, page: Page) -> tuple[int, int]:
 		"""Get scroll position information for the current page."""
-		scroll_y = await page.evaluate('window.scrollY')
-		viewport_height = await page.evaluate('window.innerHeight')
-		total_height = await page.evaluate('document.documentElement.scrollHeight')
+		scroll_y, viewport_height, total_height = await page.evaluate(
+			'[window.scrollY, window.innerHeight, document.documentElement.scrollHeight]'
+		)
 		pixels_above = scroll_y
 		pixels_below = total_height - (scroll_y + viewport_height)
 		return pixels_above, pixels_below
@@ -1,4 +1,6 @@
+import base64
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any, Optional
 
 from pydantic import BaseModel
@@ -33,9 +35,14 @@ class BrowserState(DOMState):
 	title: str
 	tabs: list[TabInfo]
 	screenshot: Optional[str] = None
+	screenshot_mime_type: str = 'image/png'
+	# The screenshot was reused from the previous state because the page looked the same
+	screenshot_unchanged: bool = False
 	pixels_above: int = 0
 	pixels_below: int = 0
 	browser_errors: list[str] = field(default_factory=list)
+	# Seconds spent per stage of the state capture, see BrowserContext._get_updated_state
+	capture_timings: dict[str, float] = field(default_factory=dict)
 
 
 @dataclass
@@ -45,11 +52,21 @@ class BrowserStateHistory:
 	tabs: list[TabInfo]
 	interacted_element: list[DOMHistoryElement | None] | list[None]
 	screenshot: Optional[str] = None
+	# Image file of the screenshot in a HistoryStore, read only when needed
+	screenshot_path: Optional[str] = None
+
+	def get_screenshot(self) -> Optional[str]:
+		"""Base64 screenshot, read from screenshot_path if it is not held in memory"""
+		if self.screenshot is None and self.screenshot_path is not None:
+			return base64.b64encode(Path(self.screenshot_path).read_bytes()).decode('utf-8')
+		return self.screenshot
 
 	def to_dict(self) -> dict[str, Any]:
 		data = {}
 		data['tabs'] = [tab.model_dump() for tab in self.tabs]
 		data['screenshot'] = self.screenshot
+		if self.screenshot_path is not None:
+			data['screenshot_path'] = self.screenshot_path
 		data['interacted_element'] = [el.to_dict() if el else None for el in self.interacted_element]
 		data['url'] = self.url
 		data['title'] = self.title
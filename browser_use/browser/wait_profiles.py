@@ -0,0 +1,180 @@
+"""
+Learned page load waits per domain.
+
+BrowserContext records for each page load how long the network took to become stable,
+the longest quiet period that was followed by more requests, and whether the DOM still
+changed during the minimum wait. High percentiles of those times replace the configured
+maximum, network idle and minimum waits on the next visit of the same domain.
+"""
+
+import json
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+# Path segments that identify one item rather than a route, e.g. /item/12345
+_ID_SEGMENT_RE = re.compile(r'^(\d+|[0-9a-f]{8,}|[0-9a-f-]{36})$', re.IGNORECASE)
+
+
+@dataclass
+class WaitProfileMetrics:
+	hits: int = 0
+	misses: int = 0
+	# Waits shortened by learned waits, and extra waits from a learned maximum above the default
+	time_saved: float = 0.0
+	extra_wait: float = 0.0
+
+
+@dataclass
+class PageLoadWaits:
+	"""The waits of one page load, see the *_page_load_time options of BrowserContextConfig"""
+
+	minimum: float
+	idle: float
+	maximum: float
+
+
+class PageLoadSample(NamedTuple):
+	"""One observed page load, stored as a list in the profiles file"""
+
+	# Until the network was stable, or the maximum wait if it timed out
+	seconds: float
+	timed_out: bool
+	# Longest quiet period that was followed by more requests, None if there was none
+	idle_gap: Optional[float] = None
+	# Until the DOM stopped changing, or the end of the minimum wait if it still changed then.
+	# None if the wait ended after the minimum, then the DOM was not observed.
+	dom_settled: Optional[float] = None
+	dom_timed_out: bool = False
+
+
+class WaitProfileStore:
+	"""
+	Observed page loads, keyed by domain and optionally the first route segments.
+
+	A key needs MIN_SAMPLES observations of a wait before it is learned. A learned wait is the
+	PERCENTILE of the last MAX_SAMPLES times with some HEADROOM. Timed out loads only tell that
+	the real time was longer, so if the percentile falls on one the configured wait is kept,
+	e.g. for long polling pages. The learned maximum is never below FLOOR seconds and never
+	above MAX_GROWTH times the configured maximum, the learned idle wait never below IDLE_FLOOR
+	seconds. The learned idle and minimum waits never exceed the configured ones.
+	"""
+
+	MAX_SAMPLES = 20
+	MIN_SAMPLES = 3
+	PERCENTILE = 95
+	HEADROOM = 1.5
+	FLOOR = 1.0
+	MAX_GROWTH = 2.0
+	IDLE_FLOOR = 0.1
+
+	def __init__(self, file: Optional[str] = None, route_depth: int = 0):
+		self.file = file
+		self.route_depth = route_depth
+		self.metrics = WaitProfileMetrics()
+		# key -> samples, oldest first
+		self._samples: dict[str, list[PageLoadSample]] = {}
+		self._loaded = False
+
+	def key(self, url: str) -> Optional[str]:
+		parsed = urlparse(url)
+		if not parsed.netloc:
+			return None
+
+		key = parsed.netloc.lower()
+		if self.route_depth:
+			segments = [s for s in parsed.path.split('/') if s][: self.route_depth]
+			key += ''.join('/*' if _ID_SEGMENT_RE.match(s) else f'/{s}' for s in segments)
+		return key
+
+	def waits(self, url: str, default: PageLoadWaits) -> PageLoadWaits:
+		"""Waits for the next load of url, counts a hit if any of them is learned"""
+		samples = self._samples.get(self.key(url) or '', [])
+
+		maximum = self._percentile([(s.seconds, s.timed_out) for s in samples])
+		idle = self._percentile([(s.idle_gap, False) for s in samples if s.idle_gap is not None])
+		minimum = self._percentile([(s.dom_settled, s.dom_timed_out) for s in samples if s.dom_settled is not None])
+
+		if maximum is None and idle is None and minimum is None:
+			self.metrics.misses += 1
+			return default
+
+		self.metrics.hits += 1
+		return PageLoadWaits(
+			minimum=default.minimum if minimum is None else min(minimum * self.HEADROOM, default.minimum),
+			idle=default.idle if idle is None else min(max(idle * self.HEADROOM, self.IDLE_FLOOR), default.idle),
+			maximum=default.maximum
+			if maximum is None
+			else min(max(maximum * self.HEADROOM, self.FLOOR), default.maximum * self.MAX_GROWTH),
+		)
+
+	def _percentile(self, times: list[tuple[float, bool]]) -> Optional[float]:
+		"""PERCENTILE of (seconds, timed_out) pairs, None if there are too few or it is a timeout"""
+		if len(times) < self.MIN_SAMPLES:
+			return None
+		# Timeouts go last, they are only a lower bound
+		times = sorted(times, key=lambda time: (time[1], time[0]))
+		seconds, timed_out = times[min(len(times) - 1, math.ceil(len(times) * self.PERCENTILE / 100) - 1)]
+		return None if timed_out else seconds
+
+	def record(self, url: str, sample: PageLoadSample, waits: PageLoadWaits, default: PageLoadWaits) -> None:
+		"""Record one load of url that used the given waits"""
+		key = self.key(url)
+		if key is None:
+			return
+
+		if sample.timed_out and waits.maximum < default.maximum:
+			self.metrics.time_saved += default.maximum - waits.maximum
+		elif sample.seconds > default.maximum:
+			self.metrics.extra_wait += sample.seconds - default.maximum
+		if not sample.timed_out:
+			self.metrics.time_saved += default.idle - waits.idle
+		# Until the network was stable the minimum wait did not matter
+		self.metrics.time_saved += max(sample.seconds, default.minimum) - max(sample.seconds, waits.minimum)
+
+		samples = self._samples.setdefault(key, [])
+		samples.append(
+			sample._replace(
+				seconds=round(sample.seconds, 3),
+				idle_gap=None if sample.idle_gap is None else round(sample.idle_gap, 3),
+				dom_settled=None if sample.dom_settled is None else round(sample.dom_settled, 3),
+			)
+		)
+		del samples[: -self.MAX_SAMPLES]
+
+	async def load(self) -> None:
+		if self._loaded:
+			return
+		self._loaded = True
+		if not self.file or not await anyio.Path(self.file).exists():
+			return
+
+		try:
+			async with await anyio.open_file(self.file, 'r') as f:
+				stored = json.loads(await f.read())
+			# Keep samples recorded before loading
+			for key, samples in stored.items():
+				samples = [PageLoadSample(*sample) for sample in samples]
+				self._samples[key] = (samples + self._samples.get(key, []))[-self.MAX_SAMPLES :]
+			logger.debug(f'Loaded page load wait profiles for {len(stored)} domains from {self.file}')
+		except Exception as e:
+			logger.warning(f'❌  Failed to load page load wait profiles: {str(e)}')
+
+	async def save(self) -> None:
+		if not self.file:
+			return
+
+		try:
+			await anyio.Path(self.file).parent.mkdir(parents=True, exist_ok=True)
+
+			async with await anyio.open_file(self.file, 'w') as f:
+				await f.write(json.dumps(self._samples))
+		except Exception as e:
+			logger.warning(f'❌  Failed to save page load wait profiles: {str(e)}')
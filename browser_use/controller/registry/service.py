@@ -1,4 +1,5 @@
 import asyncio
+import re
 from inspect import iscoroutinefunction, signature
 from typing import Any, Callable, Dict, Generic, Optional, Type, TypeVar
 
@@ -7,6 +8,7 @@ from pydantic import BaseModel, Field, create_model
 
 from browser_use.browser.context import BrowserContext
 from browser_use.controller.registry.views import (
+	ActionEffects,
 	ActionModel,
 	ActionRegistry,
 	RegisteredAction,
@@ -20,6 +22,21 @@ from browser_use.utils import time_execution_async
 
 Context = TypeVar('Context')
 
+SECRET_PATTERN = re.compile(r'<secret>(.*?)</secret>')
+
+
+def _contains_secret(value: Any) -> bool:
+	"""Whether a string in the params contains a <secret> placeholder"""
+	if isinstance(value, str):
+		return '<secret>' in value
+	if isinstance(value, BaseModel):
+		return any(_contains_secret(v) for _, v in value)
+	if isinstance(value, dict):
+		return any(_contains_secret(v) for v in value.values())
+	if isinstance(value, (list, tuple)):
+		return any(_contains_secret(v) for v in value)
+	return False
+
 
 class Registry(Generic[Context]):
 	"""Service for registering and managing actions"""
@@ -28,6 +45,8 @@ class Registry(Generic[Context]):
 		self.registry = ActionRegistry()
 		self.telemetry = ProductTelemetry()
 		self.exclude_actions = exclude_actions if exclude_actions is not None else []
+		# Action models by the names of the actions they contain, cleared when an action is registered
+		self._action_models: dict[frozenset[str], Type[ActionModel]] = {}
 
 	# @time_execution_sync('--create_param_model')
 	def _create_param_model(self, function: Callable) -> Type[BaseModel]:
@@ -51,8 +70,13 @@ class Registry(Generic[Context]):
 		param_model: Optional[Type[BaseModel]] = None,
 		domains: Optional[list[str]] = None,
 		page_filter: Optional[Callable[[Any], bool]] = None,
+		effects: ActionEffects = 'page_mutating',
 	):
-		"""Decorator for registering actions"""
+		"""Decorator for registering actions
+
+		effects: what the action changes, see ActionEffects. Actions that only read the page can be
+		marked read_only so several of them in one step run concurrently.
+		"""
 
 		def decorator(func: Callable):
 			# Skip registration if action is in exclude_actions
@@ -83,8 +107,10 @@ class Registry(Generic[Context]):
 				param_model=actual_param_model,
 				domains=domains,
 				page_filter=page_filter,
+				effects=effects,
 			)
 			self.registry.actions[func.__name__] = action
+			self._action_models.clear()
 			return func
 
 		return decorator
@@ -106,43 +132,29 @@ class Registry(Generic[Context]):
 			raise ValueError(f'Action {action_name} not found')
 
 		action = self.registry.actions[action_name]
+		invocation = action.invocation
 		try:
 			# Create the validated Pydantic model
 			validated_params = action.param_model(**params)
 
-			# Check if the first parameter is a Pydantic model
-			sig = signature(action.function)
-			parameters = list(sig.parameters.values())
-			is_pydantic = parameters and issubclass(parameters[0].annotation, BaseModel)
-			parameter_names = [param.name for param in parameters]
-
 			if sensitive_data:
 				validated_params = self._replace_sensitive_data(validated_params, sensitive_data)
 
-			# Check if the action requires browser
-			if 'browser' in parameter_names and not browser:
-				raise ValueError(f'Action {action_name} requires browser but none provided.')
-			if 'page_extraction_llm' in parameter_names and not page_extraction_llm:
-				raise ValueError(f'Action {action_name} requires page_extraction_llm but none provided.')
-			if 'available_file_paths' in parameter_names and not available_file_paths:
-				raise ValueError(f'Action {action_name} requires available_file_paths but none provided.')
-
-			if 'context' in parameter_names and not context:
-				raise ValueError(f'Action {action_name} requires context but none provided.')
-
-			# Prepare arguments based on parameter type
+			# Fill in the dependencies the action takes, which must be provided
+			dependencies = {
+				'browser': browser,
+				'page_extraction_llm': page_extraction_llm,
+				'available_file_paths': available_file_paths,
+				'context': context,
+			}
 			extra_args = {}
-			if 'context' in parameter_names:
-				extra_args['context'] = context
-			if 'browser' in parameter_names:
-				extra_args['browser'] = browser
-			if 'page_extraction_llm' in parameter_names:
-				extra_args['page_extraction_llm'] = page_extraction_llm
-			if 'available_file_paths' in parameter_names:
-				extra_args['available_file_paths'] = available_file_paths
+			for name in invocation.injected:
+				if not dependencies[name]:
+					raise ValueError(f'Action {action_name} requires {name} but none provided.')
+				extra_args[name] = dependencies[name]
 			if action_name == 'input_text' and sensitive_data:
 				extra_args['has_sensitive_data'] = True
-			if is_pydantic:
+			if invocation.params_as_model:
 				return await action.function(validated_params, **extra_args)
 			return await action.function(**validated_params.model_dump(), **extra_args)
 
@@ -153,17 +165,16 @@ class Registry(Generic[Context]):
 		"""Replaces the sensitive data in the params"""
 		# if there are any str with <secret>placeholder</secret> in the params, replace them with the actual value from sensitive_data
 
-		import re
+		# Most params have no placeholders, they are returned without dumping and validating them again
+		if not _contains_secret(params):
+			return params
 
-		secret_pattern = re.compile(r'<secret>(.*?)</secret>')
+		def replace_placeholder(match: re.Match) -> str:
+			return sensitive_data.get(match.group(1), match.group(0))
 
 		def replace_secrets(value):
 			if isinstance(value, str):
-				matches = secret_pattern.findall(value)
-				for placeholder in matches:
-					if placeholder in sensitive_data:
-						value = value.replace(f'<secret>{placeholder}</secret>', sensitive_data[placeholder])
-				return value
+				return SECRET_PATTERN.sub(replace_placeholder, value)
 			elif isinstance(value, dict):
 				return {k: replace_secrets(v) for k, v in value.items()}
 			elif isinstance(value, list):
@@ -176,8 +187,38 @@ class Registry(Generic[Context]):
 
 	# @time_execution_sync('--create_action_model')
 	def create_action_model(self, include_actions: Optional[list[str]] = None, page=None) -> Type[ActionModel]:
-		"""Creates a Pydantic model from registered actions, used by LLM APIs that support tool calling & enforce a schema"""
+		"""Creates a Pydantic model from registered actions, used by LLM APIs that support tool calling & enforce a schema
+
+		Models are cached by the set of actions available after filtering, so pages that allow the same
+		actions share one model, and the registered functions are only sent to telemetry for new sets.
+		"""
+		available_actions = self._available_actions(include_actions, page)
+		key = frozenset(available_actions)
+		if key in self._action_models:
+			return self._action_models[key]
+
+		fields = {
+			name: (
+				Optional[action.param_model],
+				Field(default=None, description=action.description),
+			)
+			for name, action in available_actions.items()
+		}
+
+		self.telemetry.capture(
+			ControllerRegisteredFunctionsTelemetryEvent(
+				registered_functions=[
+					RegisteredFunction(name=name, params=action.param_model.model_json_schema())
+					for name, action in available_actions.items()
+				]
+			)
+		)
+
+		model = create_model('ActionModel', __base__=ActionModel, **fields)  # type:ignore
+		self._action_models[key] = model
+		return model
 
+	def _available_actions(self, include_actions: Optional[list[str]], page) -> dict[str, RegisteredAction]:
 		# Filter actions based on page if provided:
 		#   if page is None, only include actions with no filters
 		#   if page is provided, only include actions that match the page
@@ -201,24 +242,15 @@ class Registry(Generic[Context]):
 			if domain_is_allowed and page_is_allowed:
 				available_actions[name] = action
 
-		fields = {
-			name: (
-				Optional[action.param_model],
-				Field(default=None, description=action.description),
-			)
-			for name, action in available_actions.items()
-		}
-
-		self.telemetry.capture(
-			ControllerRegisteredFunctionsTelemetryEvent(
-				registered_functions=[
-					RegisteredFunction(name=name, params=action.param_model.model_json_schema())
-					for name, action in available_actions.items()
-				]
-			)
-		)
+		return available_actions
 
-		return create_model('ActionModel', __base__=ActionModel, **fields)  # type:ignore
+	def get_effects(self, action: ActionModel) -> ActionEffects:
+		"""Effects of the registered action an action model calls, page_mutating if unknown"""
+		for name, params in action.model_dump(exclude_unset=True).items():
+			if params is not None:
+				registered = self.registry.actions.get(name)
+				return registered.effects if registered else 'page_mutating'
+		return 'page_mutating'
 
 	def get_prompt_description(self, page=None) -> str:
 		"""Get a description of all actions for the prompt
@@ -1,7 +1,37 @@
-from typing import Callable, Dict, Type
+from dataclasses import dataclass
+from inspect import signature
+from typing import Any, Callable, Dict, Literal, Type
 
 from patchright.async_api import Page
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+# Parameters of action functions that are filled in by Registry.execute_action instead of the LLM
+INJECTED_PARAMETERS = ('browser', 'page_extraction_llm', 'available_file_paths', 'context')
+
+# What an action changes, which decides how Agent.multi_act may schedule it:
+#   read_only: changes no page and not which tab is active, runs concurrently with neighbouring read_only actions
+#   tab_local: only works in a tab of its own that it opens and waits on itself, never through the active tab,
+#              runs concurrently with neighbouring tab_local actions
+#   page_mutating: may change the current page or tabs, runs alone and in order
+ActionEffects = Literal['read_only', 'tab_local', 'page_mutating']
+
+
+@dataclass(frozen=True)
+class ActionInvocation:
+	"""How an action function is called, worked out once from its signature"""
+
+	params_as_model: bool  # The first parameter is annotated with a pydantic model, else params are passed as kwargs
+	injected: tuple[str, ...]  # INJECTED_PARAMETERS the function takes
+
+	@classmethod
+	def from_function(cls, function: Callable) -> 'ActionInvocation':
+		parameters = list(signature(function).parameters.values())
+		first_annotation = parameters[0].annotation if parameters else None
+		parameter_names = {parameter.name for parameter in parameters}
+		return cls(
+			params_as_model=isinstance(first_annotation, type) and issubclass(first_annotation, BaseModel),
+			injected=tuple(name for name in INJECTED_PARAMETERS if name in parameter_names),
+		)
 
 
 class RegisteredAction(BaseModel):
@@ -16,10 +46,27 @@ class RegisteredAction(BaseModel):
 	domains: list[str] | None = None  # e.g. ['*.google.com', 'www.bing.com', 'yahoo.*]
 	page_filter: Callable[[Page], bool] | None = None
 
+	effects: ActionEffects = 'page_mutating'
+
 	model_config = ConfigDict(arbitrary_types_allowed=True)
 
+	_prompt_description: str | None = PrivateAttr(default=None)
+	_invocation: ActionInvocation = PrivateAttr()
+
+	def model_post_init(self, __context: Any) -> None:
+		self._invocation = ActionInvocation.from_function(self.function)
+
+	@property
+	def invocation(self) -> ActionInvocation:
+		return self._invocation
+
 	def prompt_description(self) -> str:
-		"""Get a description of the action for the prompt"""
+		"""Get a description of the action for the prompt, built once from the JSON schema of the param model"""
+		if self._prompt_description is None:
+			self._prompt_description = self._build_prompt_description()
+		return self._prompt_description
+
+	def _build_prompt_description(self) -> str:
 		skip_keys = ['title']
 		s = f'{self.description}: \n'
 		s += '{' + str(self.name) + ': '
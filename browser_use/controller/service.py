@@ -217,6 +217,7 @@ class Controller(Generic[Context]):
 		# Content Actions
 		@self.registry.action(
 			'Extract page content to retrieve specific information from the page, e.g. all company names, a specific description, all information about, links with companies in structured format or simply links',
+			effects='read_only',
 		)
 		async def extract_content(
 			goal: str, should_strip_link_urls: bool, browser: BrowserContext, page_extraction_llm: BaseChatModel
@@ -352,6 +353,7 @@ class Controller(Generic[Context]):
 
 		@self.registry.action(
 			description='Get all options from a native dropdown',
+			effects='read_only',
 		)
 		async def get_dropdown_options(index: int, browser: BrowserContext) -> ActionResult:
 			"""Get all options from a native dropdown"""
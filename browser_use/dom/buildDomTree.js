@@ -4,9 +4,30 @@
     focusHighlightIndex: -1,
     viewportExpansion: 0,
     debugMode: false,
+    incremental: false,
+    forceFull: false,
+    columnar: false,
+    skipIframes: false,
+    deferHighlights: false,
+    lazyBands: false,
+    bandExpansion: 0,
+    canvasHighlights: false,
+    drawHighlights: true,
   }
 ) => {
   const { doHighlightElements, focusHighlightIndex, viewportExpansion, debugMode } = args;
+  const incremental = args.incremental || false;
+  const forceFull = args.forceFull || false;
+  const columnar = args.columnar || false;
+  const skipIframes = args.skipIframes || false;
+  const deferHighlights = args.deferHighlights || false;
+  // Lazy mode builds on the incremental state and needs a bounded viewport
+  const lazyBands = incremental && viewportExpansion !== -1 && (args.lazyBands || false);
+  const bandExpansion = args.bandExpansion || 0;
+  // Draw all highlights onto one canvas instead of overlay elements per element
+  const canvasHighlights = args.canvasHighlights || false;
+  // Number the elements as if highlighting but draw nothing, e.g. to refresh the indices between actions
+  const drawHighlights = args.drawHighlights !== false;
   let highlightIndex = 0; // Reset highlight index
 
   // Only initialize performance tracking if in debug mode
@@ -37,6 +58,7 @@
       totalNodes: 0,
       processedNodes: 0,
       skippedNodes: 0,
+      reusedNodes: 0,
     },
     buildDomTreeBreakdown: {
       totalTime: 0,
@@ -158,16 +180,299 @@
    */
   const DOM_HASH_MAP = {};
 
+  // Highlight targets by index when deferHighlights is set
+  const DEFERRED_HIGHLIGHTS = [];
+
   const ID = { current: 0 };
 
   const HIGHLIGHT_CONTAINER_ID = "playwright-highlight-container";
 
+  const HIGHLIGHT_COLORS = [
+    "#FF0000",
+    "#00FF00",
+    "#0000FF",
+    "#FFA500",
+    "#800080",
+    "#008080",
+    "#FF69B4",
+    "#4B0082",
+    "#FF4500",
+    "#2E8B57",
+    "#DC143C",
+    "#4682B4",
+  ];
+
+  // Highlights collected by highlightElement in canvas mode, drawn by drawCanvasHighlights
+  const CANVAS_HIGHLIGHTS = [];
+
+  /**
+   * Incremental snapshots.
+   *
+   * The state below survives between calls on the same document. Node IDs are
+   * stable, a MutationObserver marks what changed since the last snapshot, and
+   * the walk returns only the ID of any subtree that is still clean instead of
+   * re-walking and re-sending it. The caller keeps the previously returned
+   * nodes and resolves those IDs from its own cache.
+   */
+  const INCREMENTAL_STATE_KEY = "__browserUseDomState";
+  // Force a full walk every N snapshots to pick up layout-only changes
+  const MAX_INCREMENTAL_SNAPSHOTS = 20;
+
+  function isHighlightNode(node) {
+    if (!node) return false;
+    if (node.id === HIGHLIGHT_CONTAINER_ID) return true;
+    const parent = node.parentElement;
+    return !!(parent && parent.closest && parent.closest(`#${HIGHLIGHT_CONTAINER_ID}`));
+  }
+
+  function markDirtyPath(state, node) {
+    let current = node;
+    while (current && !state.dirtyPath.has(current)) {
+      state.dirtyPath.add(current);
+      current = current.parentNode || current.host || null;
+    }
+  }
+
+  // Inserting or removing an element shifts the xpath index of its later
+  // siblings with the same tag, so those subtrees have to be walked again.
+  function markShiftedSiblings(state, record) {
+    const parent = record.target;
+    const tags = new Set();
+    for (const changed of [...record.addedNodes, ...record.removedNodes]) {
+      if (changed.nodeType === Node.ELEMENT_NODE) tags.add(changed.nodeName);
+    }
+    if (tags.size === 0 || !parent.children) return;
+
+    const counts = {};
+    for (const child of parent.children) {
+      counts[child.nodeName] = (counts[child.nodeName] || 0) + 1;
+    }
+    const next = record.nextSibling;
+    const positionUnknown = next !== null && next.parentNode !== parent;
+    let afterMutation = false;
+    for (const child of parent.childNodes) {
+      if (child === next) afterMutation = true;
+      if (child.nodeType !== Node.ELEMENT_NODE || !tags.has(child.nodeName)) continue;
+      // With one or two siblings left the "[n]" suffix may have appeared or disappeared
+      if (positionUnknown || afterMutation || counts[child.nodeName] <= 2) {
+        state.dirty.add(child);
+      }
+    }
+  }
+
+  // Changes to stylesheets can restyle any element, the snapshot is taken again in full
+  function isStyleNode(node) {
+    const element = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement;
+    if (!element) return false;
+    return (document.head && document.head.contains(element)) || element.closest("style, link") !== null;
+  }
+
+  function markMutations(state, records) {
+    for (const record of records) {
+      const target = record.target;
+      if (isHighlightNode(target)) continue;
+      const changed = [...record.addedNodes, ...record.removedNodes];
+      if (isStyleNode(target) || changed.some((node) => node.nodeName === "STYLE" || node.nodeName === "LINK")) {
+        state.stylesChanged = true;
+        continue;
+      }
+
+      if (record.type === "childList") {
+        if (!changed.some((node) => !isHighlightNode(node))) continue;
+        // A moved node keeps its ID but its xpath changed, walk it again
+        for (const added of record.addedNodes) state.dirty.add(added);
+        markShiftedSiblings(state, record);
+        markDirtyPath(state, target);
+      } else {
+        if (record.type === "attributes" && record.attributeName === "browser-user-highlight-id") continue;
+        // A dirty node is walked with its whole subtree, so style or class changes reach the descendants
+        state.dirty.add(target);
+        markDirtyPath(state, target);
+      }
+      // May have moved or covered elements elsewhere, see recheckLayout
+      state.layoutChanged = true;
+    }
+  }
+
+  function resetIncrementalState(state) {
+    state.emitted = new WeakSet();
+    state.dirty = new WeakSet();
+    state.dirtyPath = new WeakSet();
+    state.highlightIndices = new WeakMap();
+    state.nextHighlightIndex = 0;
+    state.highlighted = new Map();
+    state.snapshotsSinceFull = 0;
+    state.layoutChanged = false;
+    // Interactive elements without a highlight index because they were covered or outside the viewport
+    state.covered = new Set();
+    // Lazy mode: captured vertical bands in page coordinates, and the nodes found outside of them
+    state.bands = [];
+    state.pending = new Map();
+  }
+
+  function getIncrementalState() {
+    let state = window[INCREMENTAL_STATE_KEY];
+    if (state) return state;
+
+    state = {
+      ids: new WeakMap(),
+      nextId: 0,
+      viewportKey: null,
+      body: null,
+      scrolled: false,
+      stylesChanged: false,
+      adoptedStyleSheets: [],
+      observer: null,
+    };
+    resetIncrementalState(state);
+    state.observer = new MutationObserver((records) => markMutations(state, records));
+    state.observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    // Scrolling inside a container changes positions without touching the DOM
+    window.addEventListener("scroll", (e) => {
+      if (e.target !== document) state.scrolled = true;
+    }, true);
+    window[INCREMENTAL_STATE_KEY] = state;
+    return state;
+  }
+
+  /**
+   * Decides whether this call may reuse the previous snapshot. Anything that
+   * moves elements without mutating them forces a full walk.
+   */
+  function beginIncrementalSnapshot(state) {
+    markMutations(state, state.observer.takeRecords());
+
+    // In lazy mode scrolling only adds a band, the captured ones stay valid
+    const scrollKey = lazyBands ? "lazy" : window.scrollY;
+    const viewportKey = [window.scrollX, scrollKey, window.innerWidth, window.innerHeight, viewportExpansion].join(":");
+    const adoptedStyleSheets = [...(document.adoptedStyleSheets || [])];
+    const adoptedUnchanged = adoptedStyleSheets.length === state.adoptedStyleSheets.length &&
+      adoptedStyleSheets.every((sheet, i) => sheet === state.adoptedStyleSheets[i]);
+    const reuse = !forceFull &&
+      state.viewportKey === viewportKey &&
+      state.body === document.body &&
+      !state.scrolled &&
+      !state.stylesChanged &&
+      adoptedUnchanged &&
+      state.snapshotsSinceFull < MAX_INCREMENTAL_SNAPSHOTS;
+
+    state.viewportKey = viewportKey;
+    state.body = document.body;
+    state.scrolled = false;
+    state.stylesChanged = false;
+    state.adoptedStyleSheets = adoptedStyleSheets;
+    if (reuse) {
+      state.snapshotsSinceFull++;
+    } else {
+      resetIncrementalState(state);
+    }
+    if (lazyBands) {
+      addBand(state, window.scrollY - viewportExpansion, window.scrollY + window.innerHeight + viewportExpansion + bandExpansion);
+      if (reuse) markElementsOutsideBands(state);
+    }
+    return reuse;
+  }
+
+  /**
+   * Lazy mode: highlighted elements that moved out of every band without being
+   * mutated are walked again, so they lose their highlight index.
+   */
+  function markElementsOutsideBands(state) {
+    for (const { node } of state.highlighted.values()) {
+      if (!node.isConnected) continue;
+      const rect = node.getBoundingClientRect();
+      const top = rect.top + window.scrollY;
+      const bottom = rect.bottom + window.scrollY;
+      if (!state.bands.some(([bandTop, bandBottom]) => bottom >= bandTop && top <= bandBottom)) {
+        state.dirty.add(node);
+        markDirtyPath(state, node);
+      }
+    }
+  }
+
+  /**
+   * Lazy mode: adds the band to the captured ones and marks the nodes it newly
+   * reaches, so only they and their ancestors are walked again.
+   */
+  function addBand(state, top, bottom) {
+    const bands = [...state.bands, [top, bottom]].sort((a, b) => a[0] - b[0]);
+    state.bands = [];
+    for (const band of bands) {
+      const last = state.bands[state.bands.length - 1];
+      if (last && band[0] <= last[1]) {
+        last[1] = Math.max(last[1], band[1]);
+      } else {
+        state.bands.push([band[0], band[1]]);
+      }
+    }
+
+    for (const [node, [nodeTop, nodeBottom]] of state.pending) {
+      if (!node.isConnected) {
+        state.pending.delete(node);
+      } else if (nodeBottom >= top && nodeTop <= bottom) {
+        state.pending.delete(node);
+        state.dirty.add(node);
+        markDirtyPath(state, node);
+      }
+    }
+  }
+
+  const INCREMENTAL = incremental ? getIncrementalState() : null;
+  const isIncrementalSnapshot = INCREMENTAL ? beginIncrementalSnapshot(INCREMENTAL) : false;
+
+  /**
+   * Whether a client rect lies outside the expanded viewport. In lazy mode the
+   * vertical extent is every captured band instead, and a node that misses all of
+   * them is remembered with its position for addBand.
+   */
+  function isRectOutsideViewport(rect, node) {
+    if (rect.right < -viewportExpansion || rect.left > window.innerWidth + viewportExpansion) return true;
+    if (!lazyBands) return rect.bottom < -viewportExpansion || rect.top > window.innerHeight + viewportExpansion;
+
+    const top = rect.top + window.scrollY;
+    const bottom = rect.bottom + window.scrollY;
+    if (INCREMENTAL.bands.some(([bandTop, bandBottom]) => bottom >= bandTop && top <= bandBottom)) return false;
+
+    const known = INCREMENTAL.pending.get(node);
+    INCREMENTAL.pending.set(node, known ? [Math.min(known[0], top), Math.max(known[1], bottom)] : [top, bottom]);
+    return true;
+  }
+
+  function nextNodeId(node) {
+    if (!INCREMENTAL) return `${ID.current++}`;
+
+    let id = INCREMENTAL.ids.get(node);
+    if (id === undefined) {
+      id = `${INCREMENTAL.nextId++}`;
+      INCREMENTAL.ids.set(node, id);
+    }
+    INCREMENTAL.emitted.add(node);
+    return id;
+  }
+
+  function nextHighlightIndex(node) {
+    if (!INCREMENTAL) return highlightIndex++;
+
+    // Keep the index an element already had so unchanged elements are not renumbered
+    let index = INCREMENTAL.highlightIndices.get(node);
+    if (index === undefined) {
+      index = INCREMENTAL.nextHighlightIndex++;
+      INCREMENTAL.highlightIndices.set(node, index);
+    }
+    return index;
+  }
+
   /**
    * Highlights an element in the DOM and returns the index of the next element.
    */
   let highlightElement = (element, index, parentIframe = null) => {
     if (!element) return index;
 
+    if (canvasHighlights) {
+      CANVAS_HIGHLIGHTS.push({ element, index, parentIframe });
+      return index + 1;
+    }
+
     // Store overlays and the single label for updating
     const overlays = [];
     let label = null;
@@ -197,22 +502,8 @@
       if (!rects || rects.length === 0) return index; // Exit if no rects
 
       // Generate a color based on the index
-      const colors = [
-        "#FF0000",
-        "#00FF00",
-        "#0000FF",
-        "#FFA500",
-        "#800080",
-        "#008080",
-        "#FF69B4",
-        "#4B0082",
-        "#FF4500",
-        "#2E8B57",
-        "#DC143C",
-        "#4682B4",
-      ];
-      const colorIndex = index % colors.length;
-      const baseColor = colors[colorIndex];
+      const colorIndex = index % HIGHLIGHT_COLORS.length;
+      const baseColor = HIGHLIGHT_COLORS[colorIndex];
       const backgroundColor = baseColor + "1A"; // 10% opacity version of the color
 
       // Get iframe offset if necessary
@@ -359,6 +650,115 @@
     }
   }
 
+  /**
+   * Draws the highlights collected in CANVAS_HIGHLIGHTS onto a single canvas that
+   * replaces the highlight container. The page gets one element instead of an
+   * overlay and a label per interactive element, and one scroll/resize listener
+   * that repaints the canvas and goes away together with it.
+   */
+  function drawCanvasHighlights() {
+    document.getElementById(HIGHLIGHT_CONTAINER_ID)?.remove();
+    if (CANVAS_HIGHLIGHTS.length === 0) return;
+
+    const canvas = document.createElement("canvas");
+    canvas.id = HIGHLIGHT_CONTAINER_ID;
+    canvas.style.position = "fixed";
+    canvas.style.pointerEvents = "none";
+    canvas.style.top = "0";
+    canvas.style.left = "0";
+    canvas.style.width = "100%";
+    canvas.style.height = "100%";
+    canvas.style.zIndex = "2147483647";
+    document.body.appendChild(canvas);
+
+    const highlights = CANVAS_HIGHLIGHTS.slice();
+    const paint = () => {
+      const ratio = window.devicePixelRatio || 1;
+      const width = window.innerWidth;
+      const height = window.innerHeight;
+      canvas.width = Math.round(width * ratio);
+      canvas.height = Math.round(height * ratio);
+      const context = canvas.getContext("2d");
+      if (!context) return;
+      context.setTransform(ratio, 0, 0, ratio, 0, 0);
+      context.clearRect(0, 0, width, height);
+      context.lineWidth = 2;
+      context.textBaseline = "middle";
+
+      for (const { element, index, parentIframe } of highlights) {
+        if (!element.isConnected) continue;
+        const rects = element.getClientRects();
+        if (!rects || rects.length === 0) continue;
+
+        const baseColor = HIGHLIGHT_COLORS[index % HIGHLIGHT_COLORS.length];
+        let offsetX = 0;
+        let offsetY = 0;
+        if (parentIframe) {
+          const iframeRect = parentIframe.getBoundingClientRect();
+          offsetX = iframeRect.left;
+          offsetY = iframeRect.top;
+        }
+
+        // Same look as the overlays: 10% opacity fill and a 2px border inside the box
+        context.fillStyle = baseColor + "1A";
+        context.strokeStyle = baseColor;
+        for (const rect of rects) {
+          if (rect.width === 0 || rect.height === 0) continue;
+          context.fillRect(rect.left + offsetX, rect.top + offsetY, rect.width, rect.height);
+          context.strokeRect(rect.left + offsetX + 1, rect.top + offsetY + 1, rect.width - 2, rect.height - 2);
+        }
+
+        // Label in the top right corner of the first rect, or above it if the rect is too small
+        const firstRect = rects[0];
+        const fontSize = Math.min(12, Math.max(8, firstRect.height / 2));
+        context.font = `${fontSize}px sans-serif`;
+        const labelWidth = context.measureText(String(index)).width + 8;
+        const labelHeight = Math.round(fontSize * 1.2) + 2;
+        const firstRectTop = firstRect.top + offsetY;
+        const firstRectLeft = firstRect.left + offsetX;
+
+        let labelTop = firstRectTop + 2;
+        let labelLeft = firstRectLeft + firstRect.width - labelWidth - 2;
+        if (firstRect.width < labelWidth + 4 || firstRect.height < labelHeight + 4) {
+          labelTop = firstRectTop - labelHeight - 2;
+          labelLeft = firstRectLeft + firstRect.width - labelWidth;
+          if (labelLeft < offsetX) labelLeft = firstRectLeft;
+        }
+        labelTop = Math.max(0, Math.min(labelTop, height - labelHeight));
+        labelLeft = Math.max(0, Math.min(labelLeft, width - labelWidth));
+
+        context.fillStyle = baseColor;
+        context.beginPath();
+        if (context.roundRect) {
+          context.roundRect(labelLeft, labelTop, labelWidth, labelHeight, 4);
+        } else {
+          context.rect(labelLeft, labelTop, labelWidth, labelHeight);
+        }
+        context.fill();
+        context.fillStyle = "white";
+        context.fillText(String(index), labelLeft + 4, labelTop + labelHeight / 2);
+      }
+    };
+    paint();
+
+    let scheduled = false;
+    const repaint = () => {
+      if (!canvas.isConnected) {
+        window.removeEventListener("scroll", repaint, true);
+        window.removeEventListener("resize", repaint);
+        return;
+      }
+      if (scheduled) return;
+      scheduled = true;
+      requestAnimationFrame(() => {
+        scheduled = false;
+        if (canvas.isConnected) paint();
+      });
+    };
+    window.addEventListener("scroll", repaint, true);
+    window.addEventListener("resize", repaint);
+  }
+
   function getElementPosition(currentElement) {
     if (!currentElement.parentElement) {
       return 0; // No parent means no siblings
@@ -427,12 +827,7 @@
           isAnyRectVisible = true;
 
           // Viewport check for this rect
-          if (!(
-            rect.bottom < -viewportExpansion ||
-            rect.top > window.innerHeight + viewportExpansion ||
-            rect.right < -viewportExpansion ||
-            rect.left > window.innerWidth + viewportExpansion
-          ) || viewportExpansion === -1) {
+          if (!isRectOutsideViewport(rect, textNode) || viewportExpansion === -1) {
             isAnyRectInViewport = true;
             break; // Found a visible rect in viewport, no need to check others
           }
@@ -727,12 +1122,7 @@
     let isAnyRectInViewport = false;
     for (const rect of rects) {
       // Use the same logic as isInExpandedViewport check
-      if (rect.width > 0 && rect.height > 0 && !( // Only check non-empty rects
-        rect.bottom < -viewportExpansion ||
-        rect.top > window.innerHeight + viewportExpansion ||
-        rect.right < -viewportExpansion ||
-        rect.left > window.innerWidth + viewportExpansion
-      )) {
+      if (rect.width > 0 && rect.height > 0 && !isRectOutsideViewport(rect, element)) { // Only check non-empty rects
         isAnyRectInViewport = true;
         break;
       }
@@ -780,6 +1170,12 @@
     const centerX = rects[Math.floor(rects.length / 2)].left + rects[Math.floor(rects.length / 2)].width / 2;
     const centerY = rects[Math.floor(rects.length / 2)].top + rects[Math.floor(rects.length / 2)].height / 2;
 
+    // Lazy mode: elementFromPoint returns null outside the window, elements of
+    // bands scrolled out of view keep the benefit of the doubt
+    if (lazyBands && (centerX < 0 || centerX >= window.innerWidth || centerY < 0 || centerY >= window.innerHeight)) {
+      return true;
+    }
+
     try {
       const topEl = document.elementFromPoint(centerX, centerY);
       if (!topEl) return false;
@@ -822,12 +1218,7 @@
       if (!boundingRect || boundingRect.width === 0 || boundingRect.height === 0) {
         return false;
       }
-      return !(
-        boundingRect.bottom < -viewportExpansion ||
-        boundingRect.top > window.innerHeight + viewportExpansion ||
-        boundingRect.right < -viewportExpansion ||
-        boundingRect.left > window.innerWidth + viewportExpansion
-      );
+      return !isRectOutsideViewport(boundingRect, element);
     }
 
 
@@ -835,12 +1226,7 @@
     for (const rect of rects) {
       if (rect.width === 0 || rect.height === 0) continue; // Skip empty rects
 
-      if (!(
-        rect.bottom < -viewportExpansion ||
-        rect.top > window.innerHeight + viewportExpansion ||
-        rect.right < -viewportExpansion ||
-        rect.left > window.innerWidth + viewportExpansion
-      )) {
+      if (!isRectOutsideViewport(rect, element)) {
         return true; // Found at least one rect in the viewport
       }
     }
@@ -995,17 +1381,26 @@
       // Check viewport status before assigning index and highlighting
       nodeData.isInViewport = isInExpandedViewport(node, viewportExpansion);
       if (nodeData.isInViewport) {
-        nodeData.highlightIndex = highlightIndex++;
+        nodeData.highlightIndex = nextHighlightIndex(node);
+
+        if (INCREMENTAL) {
+          // Drawn after the walk, together with highlights of reused subtrees
+          INCREMENTAL.highlighted.set(nodeData.highlightIndex, { node, parentIframe });
+          // Children see the same parent state as in a full walk
+          return doHighlightElements;
+        }
+
+        if (deferHighlights) {
+          // Drawn later through __browserUseDeferredHighlights, once the final index is known
+          DEFERRED_HIGHLIGHTS[nodeData.highlightIndex] = { node, parentIframe };
+          return true;
+        }
 
         if (doHighlightElements) {
-          if (focusHighlightIndex >= 0) {
-            if (focusHighlightIndex === nodeData.highlightIndex) {
-              highlightElement(node, nodeData.highlightIndex, parentIframe);
-            }
-          } else {
+          if (drawHighlights && (focusHighlightIndex < 0 || focusHighlightIndex === nodeData.highlightIndex)) {
             highlightElement(node, nodeData.highlightIndex, parentIframe);
           }
-          return true; // Successfully highlighted
+          return true; // Successfully highlighted, also when not drawn
         }
       } else {
         // console.log(`Skipping highlight for ${nodeData.tagName} (outside viewport)`);
@@ -1015,10 +1410,56 @@
     return false; // Did not highlight
   }
 
+  /**
+   * A mutation can move or cover elements of subtrees that did not change. Before a
+   * reused snapshot, highlighted elements that are now covered or outside the viewport,
+   * and covered elements that are now on top and inside it, are walked again.
+   */
+  function recheckLayout() {
+    const isHighlightable = (node) => isTopElement(node) && isInExpandedViewport(node, viewportExpansion);
+    const markDirty = (node) => {
+      INCREMENTAL.dirty.add(node);
+      markDirtyPath(INCREMENTAL, node);
+    };
+
+    for (const { node } of INCREMENTAL.highlighted.values()) {
+      if (node.isConnected && !isHighlightable(node)) markDirty(node);
+    }
+    for (const node of INCREMENTAL.covered) {
+      if (!node.isConnected) {
+        INCREMENTAL.covered.delete(node);
+      } else if (isHighlightable(node)) {
+        markDirty(node);
+      }
+    }
+    INCREMENTAL.layoutChanged = false;
+  }
+
   /**
    * Creates a node data object for a given node and its descendants.
    */
-  function buildDomTree(node, parentIframe = null, isParentHighlighted = false) {
+  function buildDomTree(node, parentIframe = null, isParentHighlighted = false, forceWalk = false) {
+    if (!INCREMENTAL) return buildDomTreeNode(node, parentIframe, isParentHighlighted, forceWalk);
+
+    // Clean subtree from an earlier snapshot: send only its ID
+    if (
+      isIncrementalSnapshot &&
+      !forceWalk &&
+      INCREMENTAL.emitted.has(node) &&
+      !INCREMENTAL.dirtyPath.has(node) &&
+      !INCREMENTAL.dirty.has(node)
+    ) {
+      if (debugMode) PERF_METRICS.nodeMetrics.reusedNodes++;
+      return INCREMENTAL.ids.get(node);
+    }
+
+    const id = buildDomTreeNode(node, parentIframe, isParentHighlighted, forceWalk || INCREMENTAL.dirty.has(node));
+    if (id === null) INCREMENTAL.emitted.delete(node);
+    if (id === null || DOM_HASH_MAP[id].highlightIndex === undefined) INCREMENTAL.highlightIndices.delete(node);
+    return id;
+  }
+
+  function buildDomTreeNode(node, parentIframe, isParentHighlighted, forceWalk) {
     if (debugMode) PERF_METRICS.nodeMetrics.totalNodes++;
 
     if (!node || node.id === HIGHLIGHT_CONTAINER_ID) {
@@ -1037,11 +1478,11 @@
 
       // Process children of body
       for (const child of node.childNodes) {
-        const domElement = buildDomTree(child, parentIframe, false); // Body's children have no highlighted parent initially
+        const domElement = buildDomTree(child, parentIframe, false, forceWalk); // Body's children have no highlighted parent initially
         if (domElement) nodeData.children.push(domElement);
       }
 
-      const id = `${ID.current++}`;
+      const id = nextNodeId(node);
       DOM_HASH_MAP[id] = nodeData;
       if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
       return id;
@@ -1068,7 +1509,7 @@
         return null;
       }
 
-      const id = `${ID.current++}`;
+      const id = nextNodeId(node);
       DOM_HASH_MAP[id] = {
         type: "TEXT_NODE",
         text: textContent,
@@ -1097,12 +1538,7 @@
 
       // Use getBoundingClientRect for the quick OUTSIDE check.
       // isInExpandedViewport will do the more accurate check later if needed.
-      if (!rect || (!isFixedOrSticky && !hasSize && (
-        rect.bottom < -viewportExpansion ||
-        rect.top > window.innerHeight + viewportExpansion ||
-        rect.right < -viewportExpansion ||
-        rect.left > window.innerWidth + viewportExpansion
-      ))) {
+      if (!rect || (!isFixedOrSticky && !hasSize && isRectOutsideViewport(rect, node))) {
         // console.log("Skipping node outside viewport (quick check):", node.tagName, rect);
         if (debugMode) PERF_METRICS.nodeMetrics.skippedNodes++;
         return null;
@@ -1137,6 +1573,16 @@
           nodeWasHighlighted = handleHighlighting(nodeData, node, parentIframe, isParentHighlighted);
         }
       }
+
+      if (INCREMENTAL) {
+        const covered = nodeData.isVisible && nodeData.highlightIndex === undefined &&
+          (!nodeData.isTopElement || nodeData.isInViewport === false) && isInteractiveCandidate(node);
+        if (covered) {
+          INCREMENTAL.covered.add(node);
+        } else {
+          INCREMENTAL.covered.delete(node);
+        }
+      }
     }
 
     // Process children, with special handling for iframes and rich text editors
@@ -1146,10 +1592,12 @@
       // Handle iframes
       if (tagName === "iframe") {
         try {
-          const iframeDoc = node.contentDocument || node.contentWindow?.document;
+          // With skipIframes every frame is extracted on its own and stitched together by DomService
+          const iframeDoc = !skipIframes && (node.contentDocument || node.contentWindow?.document);
           if (iframeDoc) {
             for (const child of iframeDoc.childNodes) {
-              const domElement = buildDomTree(child, node, false);
+              // Mutations inside iframes are not observed, always walk them
+              const domElement = buildDomTree(child, node, false, true);
               if (domElement) nodeData.children.push(domElement);
             }
           }
@@ -1167,7 +1615,7 @@
       ) {
         // Process all child nodes to capture formatted text
         for (const child of node.childNodes) {
-          const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted);
+          const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted, forceWalk);
           if (domElement) nodeData.children.push(domElement);
         }
       }
@@ -1176,7 +1624,8 @@
         if (node.shadowRoot) {
           nodeData.shadowRoot = true;
           for (const child of node.shadowRoot.childNodes) {
-            const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted);
+            // Mutations inside shadow roots are not observed, always walk them
+            const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted, true);
             if (domElement) nodeData.children.push(domElement);
           }
         }
@@ -1184,7 +1633,7 @@
         for (const child of node.childNodes) {
           // Pass the highlighted status of the *current* node to its children
           const passHighlightStatusToChild = nodeWasHighlighted || isParentHighlighted;
-          const domElement = buildDomTree(child, parentIframe, passHighlightStatusToChild);
+          const domElement = buildDomTree(child, parentIframe, passHighlightStatusToChild, forceWalk);
           if (domElement) nodeData.children.push(domElement);
         }
       }
@@ -1196,12 +1645,98 @@
       return null;
     }
 
-    const id = `${ID.current++}`;
+    const id = nextNodeId(node);
     DOM_HASH_MAP[id] = nodeData;
     if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
     return id;
   }
 
+  /**
+   * Columnar wire format.
+   *
+   * One row per node in parallel arrays instead of one object per node, so the
+   * property names are not repeated for every node. Tags, attribute keys and
+   * values, xpaths and texts are interned in a shared string table. Attributes
+   * and children are flattened, each row stores how many entries it owns.
+   * Keep the flag bits in sync with the decoder in dom/service.py.
+   */
+  const WIRE_FLAGS = {
+    textNode: 1,
+    visible: 2,
+    interactive: 4,
+    topElement: 8,
+    inViewport: 16,
+    shadowRoot: 32,
+  };
+
+  function encodeColumnar(nodeMap) {
+    const strings = [];
+    const stringIndex = new Map();
+    const intern = (value) => {
+      let index = stringIndex.get(value);
+      if (index === undefined) {
+        index = strings.length;
+        strings.push(value);
+        stringIndex.set(value, index);
+      }
+      return index;
+    };
+
+    const columns = {
+      ids: [],
+      flags: [],
+      tags: [],
+      xpaths: [],
+      texts: [],
+      highlights: [],
+      attrCounts: [],
+      attrs: [],
+      childCounts: [],
+      children: [],
+    };
+
+    for (const id in nodeMap) {
+      const data = nodeMap[id];
+      columns.ids.push(Number(id));
+
+      if (data.type === "TEXT_NODE") {
+        columns.flags.push(WIRE_FLAGS.textNode | (data.isVisible ? WIRE_FLAGS.visible : 0));
+        columns.tags.push(-1);
+        columns.xpaths.push(-1);
+        columns.texts.push(intern(data.text));
+        columns.highlights.push(-1);
+        columns.attrCounts.push(0);
+        columns.childCounts.push(0);
+        continue;
+      }
+
+      columns.flags.push(
+        (data.isVisible ? WIRE_FLAGS.visible : 0) |
+        (data.isInteractive ? WIRE_FLAGS.interactive : 0) |
+        (data.isTopElement ? WIRE_FLAGS.topElement : 0) |
+        (data.isInViewport ? WIRE_FLAGS.inViewport : 0) |
+        (data.shadowRoot ? WIRE_FLAGS.shadowRoot : 0)
+      );
+      columns.tags.push(intern(data.tagName));
+      columns.xpaths.push(intern(data.xpath));
+      columns.texts.push(-1);
+      columns.highlights.push(data.highlightIndex === undefined ? -1 : data.highlightIndex);
+
+      const attributeNames = Object.keys(data.attributes);
+      columns.attrCounts.push(attributeNames.length);
+      for (const name of attributeNames) {
+        columns.attrs.push(intern(name), intern(data.attributes[name]));
+      }
+
+      columns.childCounts.push(data.children.length);
+      for (const childId of data.children) {
+        columns.children.push(Number(childId));
+      }
+    }
+
+    return { strings, ...columns };
+  }
+
   // After all functions are defined, wrap them with performance measurement
   // Remove buildDomTree from here as we measure it separately
   const measureHighlightElement = measureTime(highlightElement);
@@ -1221,8 +1756,48 @@
   isTextNodeVisible = measureIsTextNodeVisible;
   getEffectiveScroll = measureGetEffectiveScroll;
 
+  if (isIncrementalSnapshot && INCREMENTAL.layoutChanged) recheckLayout();
+
   const rootId = buildDomTree(document.body);
 
+  if (INCREMENTAL) {
+    INCREMENTAL.dirty = new WeakSet();
+    INCREMENTAL.dirtyPath = new WeakSet();
+
+    // Redraw every live highlight, including those inside reused subtrees
+    for (const [index, { node, parentIframe }] of INCREMENTAL.highlighted) {
+      if (!node.isConnected || INCREMENTAL.highlightIndices.get(node) !== index) {
+        INCREMENTAL.highlighted.delete(index);
+        continue;
+      }
+      if (doHighlightElements && drawHighlights && (focusHighlightIndex < 0 || focusHighlightIndex === index)) {
+        highlightElement(node, index, parentIframe);
+      }
+    }
+  }
+
+  if (canvasHighlights && doHighlightElements && drawHighlights) {
+    drawCanvasHighlights();
+  }
+
+  if (deferHighlights) {
+    window.__browserUseDeferredHighlights = {
+      // indices maps the highlight index assigned here to the one shown to the agent
+      draw(indices, focusIndex) {
+        document.getElementById(HIGHLIGHT_CONTAINER_ID)?.remove();
+        CANVAS_HIGHLIGHTS.length = 0;
+        DEFERRED_HIGHLIGHTS.forEach(({ node, parentIframe }, index) => {
+          const finalIndex = indices[index];
+          if (finalIndex == null || !node.isConnected) return;
+          if (focusIndex < 0 || focusIndex === finalIndex) {
+            highlightElement(node, finalIndex, parentIframe);
+          }
+        });
+        if (canvasHighlights) drawCanvasHighlights();
+      },
+    };
+  }
+
   // Clear the cache before starting
   DOM_CACHE.clearCache();
 
@@ -1276,7 +1851,8 @@
     }
   }
 
-  return debugMode ?
-    { rootId, map: DOM_HASH_MAP, perfMetrics: PERF_METRICS } :
-    { rootId, map: DOM_HASH_MAP };
+  const result = columnar ? { rootId, columns: encodeColumnar(DOM_HASH_MAP) } : { rootId, map: DOM_HASH_MAP };
+  if (INCREMENTAL) result.incremental = isIncrementalSnapshot;
+  if (debugMode) result.perfMetrics = PERF_METRICS;
+  return result;
 };
@@ -1,5 +1,6 @@
 import hashlib
 
+from browser_use.dom.element_hash_processor.service import ElementHashProcessor
 from browser_use.dom.views import DOMElementNode
 
 
@@ -16,7 +17,7 @@ class ClickableElementProcessor:
 		clickable_elements = list()
 		for child in dom_element.children:
 			if isinstance(child, DOMElementNode):
-				if child.highlight_index:
+				if child.highlight_index is not None:
 					clickable_elements.append(child)
 
 				clickable_elements.extend(ClickableElementProcessor.get_clickable_elements(child))
@@ -25,6 +26,12 @@ class ClickableElementProcessor:
 
 	@staticmethod
 	def hash_dom_element(dom_element: DOMElementNode) -> str:
+		# Branch path digests are cached on the nodes, so this is cheap for every clickable element of a tree
+		return ElementHashProcessor.element_key(dom_element)
+
+	@staticmethod
+	def hash_dom_element_sha256(dom_element: DOMElementNode) -> str:
+		"""Previous SHA-256 based hash, rebuilds the branch path from the root on every call"""
 		parent_branch_path = ClickableElementProcessor._get_parent_branch_path(dom_element)
 		branch_path_hash = ClickableElementProcessor._parent_branch_path_hash(parent_branch_path)
 		attributes_hash = ClickableElementProcessor._attributes_hash(dom_element.attributes)
@@ -0,0 +1,95 @@
+import hashlib
+
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement, HashedDomElement
+from browser_use.dom.views import DOMElementNode
+
+# 128-bit digests are plenty to tell the elements of a page apart
+DIGEST_SIZE = 16
+
+# Branch path digest of the root, which is not part of any branch path
+ROOT_BRANCH_PATH_DIGEST = b''
+
+
+class ElementHashProcessor:
+	"""
+	Fast element hashing with blake2b.
+
+	The branch path hash of an element is chained from the digest of its parent, so
+	the digests are computed top-down once and cached on the nodes instead of
+	rebuilding the full tag path from the root for every element.
+
+	These hashes are only comparable with each other. HistoryTreeProcessor keeps the
+	SHA-256 based HashedDomElement hashes of the full path string.
+	"""
+
+	@staticmethod
+	def hash_dom_element(dom_element: DOMElementNode) -> HashedDomElement:
+		if dom_element._hash is None:
+			dom_element._hash = HashedDomElement(
+				ElementHashProcessor.branch_path_digest(dom_element).hex(),
+				ElementHashProcessor._attributes_hash(dom_element.attributes),
+				ElementHashProcessor._xpath_hash(dom_element.xpath),
+			)
+		return dom_element._hash
+
+	@staticmethod
+	def hash_dom_history_element(dom_history_element: DOMHistoryElement) -> HashedDomElement:
+		branch_path_digest = ROOT_BRANCH_PATH_DIGEST
+		for tag_name in dom_history_element.entire_parent_branch_path:
+			branch_path_digest = ElementHashProcessor._chain(branch_path_digest, tag_name)
+
+		return HashedDomElement(
+			branch_path_digest.hex(),
+			ElementHashProcessor._attributes_hash(dom_history_element.attributes),
+			ElementHashProcessor._xpath_hash(dom_history_element.xpath),
+		)
+
+	@staticmethod
+	def element_key(dom_element: DOMElementNode) -> str:
+		"""Single string identifying the element, e.g. for sets of known elements"""
+		hashed = ElementHashProcessor.hash_dom_element(dom_element)
+		return f'{hashed.branch_path_hash}-{hashed.attributes_hash}-{hashed.xpath_hash}'
+
+	@staticmethod
+	def branch_path_digest(dom_element: DOMElementNode) -> bytes:
+		"""
+		Digest of the tag path from the root down to the element.
+
+		Walks up only until the closest ancestor with a cached digest, then fills in the
+		digests of the elements below it on the way down.
+		"""
+		if dom_element._branch_path_digest is not None:
+			return dom_element._branch_path_digest
+
+		uncached: list[DOMElementNode] = []
+		current: DOMElementNode | None = dom_element
+		while current is not None and current._branch_path_digest is None:
+			uncached.append(current)
+			current = current.parent
+
+		digest = current._branch_path_digest if current is not None else None
+		for node in reversed(uncached):
+			if node.parent is None:
+				digest = ROOT_BRANCH_PATH_DIGEST
+			else:
+				digest = ElementHashProcessor._chain(digest, node.tag_name)
+			node._branch_path_digest = digest
+
+		return dom_element._branch_path_digest
+
+	@staticmethod
+	def _chain(parent_digest: bytes, tag_name: str) -> bytes:
+		return hashlib.blake2b(parent_digest + b'/' + tag_name.encode(), digest_size=DIGEST_SIZE).digest()
+
+	@staticmethod
+	def _attributes_hash(attributes: dict[str, str]) -> str:
+		attributes_string = ''.join(f'{key}={value}' for key, value in attributes.items())
+		return ElementHashProcessor._hash_string(attributes_string)
+
+	@staticmethod
+	def _xpath_hash(xpath: str) -> str:
+		return ElementHashProcessor._hash_string(xpath)
+
+	@staticmethod
+	def _hash_string(string: str) -> str:
+		return hashlib.blake2b(string.encode(), digest_size=DIGEST_SIZE).hexdigest()
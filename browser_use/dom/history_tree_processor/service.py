@@ -1,8 +1,72 @@
 import hashlib
+import logging
 from typing import Optional
 
+from browser_use.dom.element_hash_processor.service import ElementHashProcessor
 from browser_use.dom.history_tree_processor.view import DOMHistoryElement, HashedDomElement
-from browser_use.dom.views import DOMElementNode
+from browser_use.dom.views import DOMElementNode, DOMState
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryTreeIndex:
+	"""
+	Hash index over the highlighted elements of a DOM tree.
+
+	Maps the full element hash to the element, and the branch path, xpath and attribute
+	hashes alone to candidate elements for the fuzzy lookups. Candidates are kept in
+	tree order, so the first match is the same one a recursive scan would find.
+	"""
+
+	def __init__(self, tree: DOMElementNode):
+		self.by_hash: dict[HashedDomElement, DOMElementNode] = {}
+		self.by_branch_path: dict[str, list[DOMElementNode]] = {}
+		self.by_xpath: dict[str, list[DOMElementNode]] = {}
+		self.by_attributes: dict[str, list[DOMElementNode]] = {}
+
+		stack = [tree]
+		while stack:
+			node = stack.pop()
+			if node.highlight_index is not None:
+				hashed = ElementHashProcessor.hash_dom_element(node)
+				self.by_hash.setdefault(hashed, node)
+				self.by_branch_path.setdefault(hashed.branch_path_hash, []).append(node)
+				self.by_xpath.setdefault(hashed.xpath_hash, []).append(node)
+				self.by_attributes.setdefault(hashed.attributes_hash, []).append(node)
+			stack.extend(child for child in reversed(node.children) if isinstance(child, DOMElementNode))
+
+	def find(self, dom_history_element: DOMHistoryElement, fuzzy: bool = True) -> Optional[DOMElementNode]:
+		hashed = ElementHashProcessor.hash_dom_history_element(dom_history_element)
+
+		node = self.by_hash.get(hashed)
+		if node is not None or not fuzzy:
+			return node
+
+		# Same position in the page, attributes changed (e.g. a class toggled)
+		candidates = [
+			node
+			for node in self.by_xpath.get(hashed.xpath_hash, [])
+			if node.tag_name == dom_history_element.tag_name
+			and ElementHashProcessor.hash_dom_element(node).branch_path_hash == hashed.branch_path_hash
+		]
+		if len(candidates) == 1:
+			logger.debug(f'Fuzzy match for history element {dom_history_element.xpath}: same xpath, attributes changed')
+			return candidates[0]
+
+		# Same attributes, element moved (e.g. a banner was inserted above it)
+		if dom_history_element.attributes:
+			candidates = [
+				node
+				for node in self.by_attributes.get(hashed.attributes_hash, [])
+				if node.tag_name == dom_history_element.tag_name
+			]
+			if len(candidates) == 1:
+				logger.debug(
+					f'Fuzzy match for history element {dom_history_element.xpath}: same attributes, moved to {candidates[0].xpath}'
+				)
+				return candidates[0]
+
+		return None
 
 
 class HistoryTreeProcessor:
@@ -10,6 +74,9 @@ class HistoryTreeProcessor:
 	Operations on the DOM elements
 
 	@dev be careful - text nodes can change even if elements stay the same
+
+	Lookups and comparisons hash both sides with ElementHashProcessor. The SHA-256 based
+	_hash_dom_element / _hash_dom_history_element keep the original HashedDomElement values.
 	"""
 
 	@staticmethod
@@ -23,7 +90,7 @@ class HistoryTreeProcessor:
 			dom_element.xpath,
 			dom_element.highlight_index,
 			parent_branch_path,
-			dom_element.attributes,
+			dict(dom_element.attributes),
 			dom_element.shadow_root,
 			css_selector=css_selector,
 			page_coordinates=dom_element.page_coordinates,
@@ -33,11 +100,11 @@ class HistoryTreeProcessor:
 
 	@staticmethod
 	def find_history_element_in_tree(dom_history_element: DOMHistoryElement, tree: DOMElementNode) -> Optional[DOMElementNode]:
-		hashed_dom_history_element = HistoryTreeProcessor._hash_dom_history_element(dom_history_element)
+		hashed_dom_history_element = ElementHashProcessor.hash_dom_history_element(dom_history_element)
 
 		def process_node(node: DOMElementNode):
 			if node.highlight_index is not None:
-				hashed_node = HistoryTreeProcessor._hash_dom_element(node)
+				hashed_node = ElementHashProcessor.hash_dom_element(node)
 				if hashed_node == hashed_dom_history_element:
 					return node
 			for child in node.children:
@@ -49,10 +116,29 @@ class HistoryTreeProcessor:
 
 		return process_node(tree)
 
+	@staticmethod
+	def get_history_index(state: DOMState) -> HistoryTreeIndex:
+		"""Index of the state's highlighted elements, built once per state"""
+		if state._history_index is None:
+			state._history_index = HistoryTreeIndex(state.element_tree)
+		return state._history_index
+
+	@staticmethod
+	def find_history_element_in_state(
+		dom_history_element: DOMHistoryElement, state: DOMState, fuzzy: bool = True
+	) -> Optional[DOMElementNode]:
+		"""
+		Find a history element in a state using its lazily built index.
+
+		Falls back to an element with the same xpath but changed attributes, or the same
+		attributes but a moved xpath, if that match is unambiguous.
+		"""
+		return HistoryTreeProcessor.get_history_index(state).find(dom_history_element, fuzzy=fuzzy)
+
 	@staticmethod
 	def compare_history_element_and_dom_element(dom_history_element: DOMHistoryElement, dom_element: DOMElementNode) -> bool:
-		hashed_dom_history_element = HistoryTreeProcessor._hash_dom_history_element(dom_history_element)
-		hashed_dom_element = HistoryTreeProcessor._hash_dom_element(dom_element)
+		hashed_dom_history_element = ElementHashProcessor.hash_dom_history_element(dom_history_element)
+		hashed_dom_element = ElementHashProcessor.hash_dom_element(dom_element)
 
 		return hashed_dom_history_element == hashed_dom_element
 
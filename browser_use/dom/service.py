@@ -1,14 +1,20 @@
+import asyncio
+import copy
 import json
 import logging
+import secrets
+import sys
 from dataclasses import dataclass
+from functools import cache
 from importlib import resources
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Literal, Optional
 from urllib.parse import urlparse
 
 if TYPE_CHECKING:
-	from patchright.async_api import Page
+	from patchright.async_api import Frame, Page
 
 from browser_use.dom.views import (
+	EMPTY_ATTRIBUTES,
 	DOMBaseNode,
 	DOMElementNode,
 	DOMState,
@@ -20,6 +26,52 @@ from browser_use.utils import time_execution_async
 logger = logging.getLogger(__name__)
 
 
+# Flag bits of the columnar payload, keep in sync with WIRE_FLAGS in buildDomTree.js
+WIRE_FLAG_TEXT_NODE = 1
+WIRE_FLAG_VISIBLE = 2
+WIRE_FLAG_INTERACTIVE = 4
+WIRE_FLAG_TOP_ELEMENT = 8
+WIRE_FLAG_IN_VIEWPORT = 16
+WIRE_FLAG_SHADOW_ROOT = 32
+
+# Frames of these ad networks and trackers are never extracted
+AD_FRAME_DOMAINS = ('doubleclick.net', 'adroll.com', 'googletagmanager.com')
+
+# Set on the iframe elements of child frames to find them again in the parent frame's tree
+FRAME_KEY_ATTRIBUTE = 'browser-use-frame-key'
+
+# Calls the buildDomTree.js function installed in the document, or returns null if it is not installed yet
+BUILD_DOM_TREE_ENTRY_JS = '(args) => window.__browserUseBuildDomTree ? window.__browserUseBuildDomTree(args) : null'
+
+REMOVE_FRAME_KEYS_JS = f"""
+(prefix) => {{
+	for (const element of document.querySelectorAll(`iframe[{FRAME_KEY_ATTRIBUTE}^="${{prefix}}"]`)) {{
+		element.removeAttribute("{FRAME_KEY_ATTRIBUTE}");
+	}}
+}}
+"""
+
+DRAW_DEFERRED_HIGHLIGHTS_JS = """
+([indices, focusIndex]) => {
+	const deferred = window.__browserUseDeferredHighlights;
+	if (deferred) deferred.draw(indices, focusIndex);
+}
+"""
+
+
+@cache
+def load_build_dom_tree_js() -> str:
+	"""Source of buildDomTree.js, read from the package once per process"""
+	return resources.files('browser_use.dom').joinpath('buildDomTree.js').read_text()
+
+
+@cache
+def load_build_dom_tree_install_js() -> str:
+	"""Script that stores the buildDomTree.js function in the document for BUILD_DOM_TREE_ENTRY_JS"""
+	function = load_build_dom_tree_js().strip().rstrip(';')
+	return f'() => {{ window.__browserUseBuildDomTree = {function}; return true; }}'
+
+
 @dataclass
 class ViewportInfo:
 	width: int
@@ -31,7 +83,14 @@ class DomService:
 		self.page = page
 		self.xpath_cache = {}
 
-		self.js_code = resources.files('browser_use.dom').joinpath('buildDomTree.js').read_text()
+		self.js_code = load_build_dom_tree_js()
+
+		# Nodes of previous snapshots keyed by their stable in-page ID, used to
+		# resolve the subtrees an incremental snapshot did not send again
+		self._snapshot_node_map: dict[str, DOMBaseNode] = {}
+
+		# Extra pixels below the viewport to capture in the next lazy snapshot
+		self._band_expansion = 0
 
 	# region - Clickable elements
 	@time_execution_async('--get_clickable_elements')
@@ -40,18 +99,65 @@ class DomService:
 		highlight_elements: bool = True,
 		focus_element: int = -1,
 		viewport_expansion: int = 0,
+		incremental: bool = False,
+		columnar: bool = False,
+		parallel_frames: bool = False,
+		lazy: bool = False,
+		highlight_renderer: Literal['dom', 'canvas'] = 'dom',
+		draw_highlights: bool = True,
 	) -> DOMState:
-		element_tree, selector_map = await self._build_dom_tree(highlight_elements, focus_element, viewport_expansion)
+		"""
+		Extract the DOM tree and the selector map of interactive elements.
+
+		With incremental=True the page keeps track of DOM mutations between calls and only
+		re-walks the subtrees that changed; the rest of the tree is reused from the previous
+		snapshot taken by this service.
+
+		With columnar=True the page sends the tree as parallel arrays with a shared string
+		table instead of one object per node, which is much smaller on large pages.
+
+		With parallel_frames=True every frame of the page is extracted concurrently and the
+		frame trees are stitched together below their iframe elements. Ad and hidden frames
+		are skipped, and incremental is ignored.
+
+		With lazy=True only the viewport band (plus viewport_expansion) is extracted. Each
+		later call adds the band around the current scroll position, or the extra height
+		requested with expand_next_snapshot, to the captured part of the page. Only the
+		elements the new band reaches are walked, the rest is reused as with incremental.
+
+		With highlight_renderer='canvas' the highlights are drawn onto a single canvas instead
+		of adding an overlay and a label element per highlighted element to the page.
+
+		With draw_highlights=False the elements are numbered exactly as with highlight_elements,
+		including which nested elements get their own index, but nothing is drawn.
+		"""
+		element_tree, selector_map = await self._build_dom_tree(
+			highlight_elements,
+			focus_element,
+			viewport_expansion,
+			incremental,
+			columnar,
+			parallel_frames,
+			lazy,
+			highlight_renderer,
+			draw_highlights,
+		)
 		return DOMState(element_tree=element_tree, selector_map=selector_map)
 
+	def expand_next_snapshot(self, pixels: int) -> None:
+		"""Capture this many more pixels below the viewport in the next lazy snapshot"""
+		self._band_expansion += pixels
+
+	async def prewarm(self) -> None:
+		"""Install buildDomTree.js in the main frame ahead of the next snapshot, if it is not installed yet"""
+		installed = await self.page.evaluate('() => Boolean(window.__browserUseBuildDomTree)')
+		if not installed:
+			await self.page.evaluate(load_build_dom_tree_install_js())
+
 	@time_execution_async('--get_cross_origin_iframes')
 	async def get_cross_origin_iframes(self) -> list[str]:
 		# invisible cross-origin iframes are used for ads and tracking, dont open those
-		hidden_frame_urls = await self.page.locator('iframe').filter(visible=False).evaluate_all('e => e.map(e => e.src)')
-
-		is_ad_url = lambda url: any(
-			domain in urlparse(url).netloc for domain in ('doubleclick.net', 'adroll.com', 'googletagmanager.com')
-		)
+		hidden_frame_urls = await self._get_hidden_frame_urls()
 
 		return [
 			frame.url
@@ -59,27 +165,41 @@ class DomService:
 			if urlparse(frame.url).netloc  # exclude data:urls and about:blank
 			and urlparse(frame.url).netloc != urlparse(self.page.url).netloc  # exclude same-origin iframes
 			and frame.url not in hidden_frame_urls  # exclude hidden frames
-			and not is_ad_url(frame.url)  # exclude most common ad network tracker frame URLs
+			and not self._is_ad_url(frame.url)  # exclude most common ad network tracker frame URLs
 		]
 
+	async def _get_hidden_frame_urls(self) -> list[str]:
+		return await self.page.locator('iframe').filter(visible=False).evaluate_all('e => e.map(e => e.src)')
+
+	@staticmethod
+	def _is_ad_url(url: str) -> bool:
+		return any(domain in urlparse(url).netloc for domain in AD_FRAME_DOMAINS)
+
 	@time_execution_async('--build_dom_tree')
 	async def _build_dom_tree(
 		self,
 		highlight_elements: bool,
 		focus_element: int,
 		viewport_expansion: int,
+		incremental: bool = False,
+		columnar: bool = False,
+		parallel_frames: bool = False,
+		lazy: bool = False,
+		highlight_renderer: Literal['dom', 'canvas'] = 'dom',
+		draw_highlights: bool = True,
 	) -> tuple[DOMElementNode, SelectorMap]:
 		if await self.page.evaluate('1+1') != 2:
 			raise ValueError('The page cannot evaluate javascript code properly')
 
 		if self.page.url == 'about:blank':
 			# short-circuit if the page is a new empty tab for speed, no need to inject buildDomTree.js
+			self._snapshot_node_map = {}
 			return (
 				DOMElementNode(
 					tag_name='body',
 					xpath='',
-					attributes={},
-					children=[],
+					attributes=EMPTY_ATTRIBUTES,
+					children=(),
 					is_visible=False,
 					parent=None,
 				),
@@ -95,10 +215,23 @@ class DomService:
 			'focusHighlightIndex': focus_element,
 			'viewportExpansion': viewport_expansion,
 			'debugMode': debug_mode,
+			# Lazy snapshots keep their bands in the incremental state
+			'incremental': incremental or lazy,
+			# Without cached nodes there is nothing to patch, ask for a full snapshot
+			'forceFull': not self._snapshot_node_map,
+			'columnar': columnar,
+			'lazyBands': lazy,
+			'bandExpansion': self._band_expansion,
+			'canvasHighlights': highlight_renderer == 'canvas',
+			'drawHighlights': draw_highlights,
 		}
+		self._band_expansion = 0
+
+		if parallel_frames:
+			return await self._build_frames_dom_tree(args)
 
 		try:
-			eval_page: dict = await self.page.evaluate(self.js_code, args)
+			eval_page: dict = await self._evaluate_build_dom_tree(self.page.main_frame, args)
 		except Exception as e:
 			logger.error('Error evaluating JavaScript: %s', e)
 			raise
@@ -113,16 +246,217 @@ class DomService:
 
 		return await self._construct_dom_tree(eval_page)
 
+	@time_execution_async('--build_frames_dom_tree')
+	async def _build_frames_dom_tree(self, args: dict) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Extract the main frame and its child frames concurrently and stitch them into one tree.
+
+		Every frame runs buildDomTree.js on its own document without descending into iframes.
+		The iframe elements are tagged with a key first, so the tree of a child frame can be
+		attached below its iframe node afterwards. Highlight indices are then renumbered in
+		document order over the whole tree and only drawn once they are final.
+		"""
+		main_frame = self.page.main_frame
+		child_frames = await self._get_extractable_child_frames()
+
+		# Unique per call, keys of an earlier or concurrent extraction never match
+		key_prefix = f'{secrets.token_hex(4)}-'
+		keys = await asyncio.gather(*(self._tag_frame_element(frame, f'{key_prefix}{i}') for i, frame in enumerate(child_frames)))
+		frame_by_key = {key: frame for frame, key in zip(child_frames, keys) if key is not None}
+		frames = [main_frame, *frame_by_key.values()]
+
+		frame_args = {
+			**args,
+			'doHighlightElements': False,
+			'deferHighlights': args['doHighlightElements'],
+			'incremental': False,
+			'skipIframes': True,
+		}
+		results = await asyncio.gather(
+			*(self._evaluate_build_dom_tree(frame, frame_args) for frame in frames), return_exceptions=True
+		)
+
+		# The keys are in the extracted trees now, take them off the page again
+		parent_frames = {frame.parent_frame for frame in frame_by_key.values() if frame.parent_frame is not None}
+		await asyncio.gather(
+			*(frame.evaluate(REMOVE_FRAME_KEYS_JS, key_prefix) for frame in parent_frames),
+			return_exceptions=True,
+		)
+
+		roots: dict['Frame', DOMElementNode] = {}
+		for frame, result in zip(frames, results):
+			if isinstance(result, BaseException):
+				if frame is main_frame:
+					logger.error('Error evaluating JavaScript: %s', result)
+					raise result
+				# Frames navigate or detach all the time, the rest of the page is still usable
+				logger.debug('Skipping frame %s: %s', frame.url, result)
+				continue
+			roots[frame], _ = await self._construct_dom_tree(result)
+
+		main_root = roots[main_frame]
+		frame_of_root = {id(root): frame for frame, root in roots.items()}
+
+		for root in roots.values():
+			for iframe_node in self._find_iframe_nodes(root):
+				frame_key = iframe_node.attributes.get(FRAME_KEY_ATTRIBUTE)
+				if frame_key is None:
+					continue
+				# Replaced rather than edited, the mapping can be shared with an earlier snapshot
+				iframe_node.attributes = {
+					name: value for name, value in iframe_node.attributes.items() if name != FRAME_KEY_ATTRIBUTE
+				} or EMPTY_ATTRIBUTES
+				frame = frame_by_key.get(frame_key)
+				frame_root = roots.get(frame) if frame is not None else None
+				if frame_root is not None:
+					frame_root.parent = iframe_node
+					iframe_node.children = (frame_root,)
+
+		# Renumber in document order, the frames each started counting at 0
+		selector_map: SelectorMap = {}
+		frame_indices: dict['Frame', list[int | None]] = {frame: [] for frame in roots}
+		stack: list[tuple[DOMBaseNode, 'Frame']] = [(main_root, main_frame)]
+		while stack:
+			node, frame = stack.pop()
+			if not isinstance(node, DOMElementNode):
+				continue
+
+			if node.highlight_index is not None:
+				indices = frame_indices[frame]
+				indices.extend([None] * (node.highlight_index + 1 - len(indices)))
+				indices[node.highlight_index] = len(selector_map)
+				node.highlight_index = len(selector_map)
+				selector_map[node.highlight_index] = node
+
+			for child in reversed(node.children):
+				stack.append((child, frame_of_root.get(id(child), frame)))
+
+		if args['doHighlightElements'] and args['drawHighlights']:
+			await asyncio.gather(
+				*(
+					frame.evaluate(DRAW_DEFERRED_HIGHLIGHTS_JS, [indices, args['focusHighlightIndex']])
+					for frame, indices in frame_indices.items()
+					if indices
+				),
+				return_exceptions=True,
+			)
+
+		return main_root, selector_map
+
+	@time_execution_async('--evaluate_build_dom_tree')
+	async def _evaluate_build_dom_tree(self, frame: 'Frame', args: dict) -> dict:
+		"""
+		Run buildDomTree.js in a frame.
+
+		The ~57 kB script is sent and parsed only once per document. After that, each call
+		only sends the short entry function and the args, and reuses the compiled function.
+		A navigation discards the installed function, so it is installed again on demand.
+		"""
+		eval_page = await frame.evaluate(BUILD_DOM_TREE_ENTRY_JS, args)
+		if eval_page is None:
+			install_js = load_build_dom_tree_install_js()
+			logger.debug('Installing buildDomTree.js (%d bytes) in %s', len(install_js), frame.url)
+			await frame.evaluate(install_js)
+			eval_page = await frame.evaluate(BUILD_DOM_TREE_ENTRY_JS, args)
+		return eval_page
+
+	async def _get_extractable_child_frames(self) -> list['Frame']:
+		"""Child frames worth extracting, with the same filters as get_cross_origin_iframes"""
+		hidden_frame_urls = await self._get_hidden_frame_urls()
+		return [
+			frame
+			for frame in self.page.frames
+			if frame is not self.page.main_frame
+			and not frame.is_detached()
+			and frame.url not in hidden_frame_urls  # exclude hidden frames
+			and not self._is_ad_url(frame.url)  # exclude most common ad network tracker frame URLs
+		]
+
+	@staticmethod
+	async def _tag_frame_element(frame: 'Frame', key: str) -> str | None:
+		"""Set the key on the iframe element of a frame, returns None if it cannot be reached"""
+		try:
+			frame_element = await frame.frame_element()
+			await frame_element.evaluate(f'(element, key) => element.setAttribute("{FRAME_KEY_ATTRIBUTE}", key)', key)
+			await frame_element.dispose()
+		except Exception as e:
+			logger.debug('Unable to tag the element of frame %s: %s', frame.url, e)
+			return None
+		return key
+
+	@staticmethod
+	def _find_iframe_nodes(root: DOMElementNode) -> list[DOMElementNode]:
+		iframe_nodes = []
+		stack: list[DOMBaseNode] = [root]
+		while stack:
+			node = stack.pop()
+			if isinstance(node, DOMElementNode):
+				if node.tag_name == 'iframe':
+					iframe_nodes.append(node)
+				stack.extend(node.children)
+		return iframe_nodes
+
 	@time_execution_async('--construct_dom_tree')
 	async def _construct_dom_tree(
 		self,
 		eval_page: dict,
 	) -> tuple[DOMElementNode, SelectorMap]:
-		js_node_map = eval_page['map']
-		js_root_id = eval_page['rootId']
+		js_root_id = str(eval_page['rootId'])
+		is_incremental = eval_page.get('incremental')
+
+		# Subtrees an incremental snapshot did not send are taken from the previous snapshot
+		reused_node_map = self._snapshot_node_map if is_incremental else {}
+		reused_keys = {id(node): key for key, node in reused_node_map.items()}
+		# Copies of the reused nodes, the trees returned earlier are left untouched
+		copied_node_map: dict[str, DOMBaseNode] = {}
+
+		if 'columns' in eval_page:
+			node_map, children_by_id, selector_map = self._decode_columns(eval_page['columns'])
+		else:
+			node_map, children_by_id, selector_map = self._decode_node_map(eval_page['map'])
+
+		# NOTE: Link children in a second pass, with stable IDs a parent is not
+		#       guaranteed to come after its children in the map.
+		for node_id, children_ids in children_by_id.items():
+			node = node_map[node_id]
+			children = []
+			for child_id in children_ids:
+				child_node = node_map.get(child_id) or self._copy_reused_subtree(
+					child_id, reused_node_map, reused_keys, copied_node_map
+				)
+				if child_node is None:
+					continue
+
+				child_node.parent = node
+				children.append(child_node)
+			node.children = tuple(children)
+
+		html_to_dict = node_map.get(js_root_id) or self._copy_reused_subtree(
+			js_root_id, reused_node_map, reused_keys, copied_node_map
+		)
+
+		if 'incremental' in eval_page:
+			# Keep only the nodes of this snapshot, removed subtrees are dropped
+			self._snapshot_node_map = {**node_map, **copied_node_map}
+			if is_incremental and isinstance(html_to_dict, DOMElementNode):
+				selector_map = self._collect_selector_map(html_to_dict)
+		else:
+			self._snapshot_node_map = {}
 
+		del node_map
+		del children_by_id
+		del js_root_id
+
+		if html_to_dict is None or not isinstance(html_to_dict, DOMElementNode):
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		return html_to_dict, selector_map
+
+	def _decode_node_map(self, js_node_map: dict) -> tuple[dict[str, DOMBaseNode], dict[str, list[str]], SelectorMap]:
+		"""Decode the default payload, one dict per node keyed by node ID"""
 		selector_map = {}
 		node_map = {}
+		children_by_id: dict[str, list[str]] = {}
 
 		for id, node_data in js_node_map.items():
 			node, children_ids = self._parse_node(node_data)
@@ -131,31 +465,123 @@ class DomService:
 
 			node_map[id] = node
 
-			if isinstance(node, DOMElementNode) and node.highlight_index is not None:
-				selector_map[node.highlight_index] = node
-
-			# NOTE: We know that we are building the tree bottom up
-			#       and all children are already processed.
 			if isinstance(node, DOMElementNode):
-				for child_id in children_ids:
-					if child_id not in node_map:
-						continue
-
-					child_node = node_map[child_id]
-
-					child_node.parent = node
-					node.children.append(child_node)
+				if node.highlight_index is not None:
+					selector_map[node.highlight_index] = node
+				if children_ids:
+					children_by_id[id] = children_ids
+
+		return node_map, children_by_id, selector_map
+
+	@staticmethod
+	def _decode_columns(columns: dict) -> tuple[dict[str, DOMBaseNode], dict[str, list[str]], SelectorMap]:
+		"""
+		Decode the columnar payload (see encodeColumnar in buildDomTree.js).
+
+		Rows are turned into nodes directly, without building a dict per node first.
+		"""
+		strings = columns['strings']
+		flags = columns['flags']
+		tags = columns['tags']
+		xpaths = columns['xpaths']
+		texts = columns['texts']
+		highlights = columns['highlights']
+		attr_counts = columns['attrCounts']
+		attrs = columns['attrs']
+		child_counts = columns['childCounts']
+		children = columns['children']
 
-		html_to_dict = node_map[str(js_root_id)]
-
-		del node_map
-		del js_node_map
-		del js_root_id
-
-		if html_to_dict is None or not isinstance(html_to_dict, DOMElementNode):
-			raise ValueError('Failed to parse HTML to dictionary')
+		selector_map = {}
+		node_map: dict[str, DOMBaseNode] = {}
+		children_by_id: dict[str, list[str]] = {}
+		attr_pos = 0
+		child_pos = 0
+
+		for row, js_id in enumerate(columns['ids']):
+			id = str(js_id)
+			flag = flags[row]
+
+			if flag & WIRE_FLAG_TEXT_NODE:
+				node_map[id] = DOMTextNode(
+					text=strings[texts[row]],
+					is_visible=bool(flag & WIRE_FLAG_VISIBLE),
+					parent=None,
+				)
+				continue
 
-		return html_to_dict, selector_map
+			attr_end = attr_pos + 2 * attr_counts[row]
+			attributes = {strings[attrs[i]]: strings[attrs[i + 1]] for i in range(attr_pos, attr_end, 2)} or EMPTY_ATTRIBUTES
+			attr_pos = attr_end
+
+			highlight_index = highlights[row]
+			element_node = DOMElementNode(
+				tag_name=strings[tags[row]],
+				xpath=strings[xpaths[row]],
+				attributes=attributes,
+				children=(),
+				is_visible=bool(flag & WIRE_FLAG_VISIBLE),
+				is_interactive=bool(flag & WIRE_FLAG_INTERACTIVE),
+				is_top_element=bool(flag & WIRE_FLAG_TOP_ELEMENT),
+				is_in_viewport=bool(flag & WIRE_FLAG_IN_VIEWPORT),
+				highlight_index=highlight_index if highlight_index >= 0 else None,
+				shadow_root=bool(flag & WIRE_FLAG_SHADOW_ROOT),
+				parent=None,
+			)
+			node_map[id] = element_node
+
+			if highlight_index >= 0:
+				selector_map[highlight_index] = element_node
+
+			child_end = child_pos + child_counts[row]
+			if child_end > child_pos:
+				children_by_id[id] = [str(child_id) for child_id in children[child_pos:child_end]]
+			child_pos = child_end
+
+		return node_map, children_by_id, selector_map
+
+	@staticmethod
+	def _copy_reused_subtree(
+		node_id: str,
+		reused_node_map: dict[str, DOMBaseNode],
+		reused_keys: dict[int, str],
+		copied_node_map: dict[str, DOMBaseNode],
+	) -> Optional[DOMBaseNode]:
+		"""Copy a subtree of the previous snapshot, recording the copies under their node IDs"""
+		original = reused_node_map.get(node_id)
+		if original is None:
+			return None
+
+		root = copy.copy(original)
+		copied_node_map[node_id] = root
+		stack: list[DOMBaseNode] = [root]
+		while stack:
+			node = stack.pop()
+			if not isinstance(node, DOMElementNode):
+				continue
+			children = []
+			for child in node.children:
+				child_copy = copy.copy(child)
+				child_copy.parent = node
+				children.append(child_copy)
+				key = reused_keys.get(id(child))
+				if key is not None:
+					copied_node_map[key] = child_copy
+			node.children = tuple(children)
+			stack.extend(children)
+		return root
+
+	@staticmethod
+	def _collect_selector_map(root: DOMElementNode) -> SelectorMap:
+		"""Collect the highlighted elements of a tree that mixes new and reused nodes"""
+		selector_map = {}
+		stack: list[DOMBaseNode] = [root]
+		while stack:
+			node = stack.pop()
+			if isinstance(node, DOMElementNode):
+				if node.highlight_index is not None:
+					selector_map[node.highlight_index] = node
+				stack.extend(node.children)
+		return selector_map
 
 	def _parse_node(
 		self,
@@ -183,11 +609,15 @@ class DomService:
 				height=node_data['viewport']['height'],
 			)
 
+		attributes = node_data.get('attributes')
 		element_node = DOMElementNode(
-			tag_name=node_data['tagName'],
+			# Interned, every node of the same tag shares one string and unchanged nodes share them with earlier snapshots
+			tag_name=sys.intern(node_data['tagName']),
 			xpath=node_data['xpath'],
-			attributes=node_data.get('attributes', {}),
-			children=[],
+			attributes={sys.intern(name): sys.intern(value) for name, value in attributes.items()}
+			if attributes
+			else EMPTY_ATTRIBUTES,
+			children=(),
 			is_visible=node_data.get('isVisible', False),
 			is_interactive=node_data.get('isInteractive', False),
 			is_top_element=node_data.get('isTopElement', False),
@@ -1,16 +1,21 @@
-from dataclasses import dataclass
-from functools import cached_property
-from typing import TYPE_CHECKING, Dict, List, Optional
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence
 
 from browser_use.dom.history_tree_processor.view import CoordinateSet, HashedDomElement, ViewportInfo
 from browser_use.utils import time_execution_sync
 
 # Avoid circular import issues
 if TYPE_CHECKING:
+	from browser_use.dom.history_tree_processor.service import HistoryTreeIndex
+
 	from .views import DOMElementNode
 
+# Shared by every element without attributes, read-only so that no node can change it for the others
+EMPTY_ATTRIBUTES: Mapping[str, str] = MappingProxyType({})
+
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMBaseNode:
 	is_visible: bool
 	# Use None as default and set parent later to avoid circular reference issues
@@ -20,7 +25,7 @@ class DOMBaseNode:
 		raise NotImplementedError('DOMBaseNode is an abstract class')
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMTextNode(DOMBaseNode):
 	text: str
 	type: str = 'TEXT_NODE'
@@ -52,17 +57,21 @@ class DOMTextNode(DOMBaseNode):
 		}
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMElementNode(DOMBaseNode):
 	"""
 	xpath: the xpath of the element from the last root node (shadow root or iframe OR document if no shadow root or iframe).
 	To properly reference the element we need to recursively switch the root node until we find the element (work you way up the tree with `.parent`)
+
+	Nodes are slotted: a page can produce tens of thousands of them per state, and a
+	per-instance __dict__ would be the largest part of their memory. For the same reason
+	children are tuples and elements without attributes share EMPTY_ATTRIBUTES.
 	"""
 
 	tag_name: str
 	xpath: str
-	attributes: Dict[str, str]
-	children: List[DOMBaseNode]
+	attributes: Mapping[str, str]
+	children: Sequence[DOMBaseNode]
 	is_interactive: bool = False
 	is_top_element: bool = False
 	is_in_viewport: bool = False
@@ -79,11 +88,15 @@ class DOMElementNode(DOMBaseNode):
 	"""
 	is_new: Optional[bool] = None
 
+	# Caches of ElementHashProcessor (slotted classes cannot use cached_property)
+	_hash: Optional[HashedDomElement] = field(default=None, init=False, repr=False, compare=False)
+	_branch_path_digest: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+
 	def __json__(self) -> dict:
 		return {
 			'tag_name': self.tag_name,
 			'xpath': self.xpath,
-			'attributes': self.attributes,
+			'attributes': dict(self.attributes),
 			'is_visible': self.is_visible,
 			'is_interactive': self.is_interactive,
 			'is_top_element': self.is_top_element,
@@ -121,13 +134,13 @@ class DOMElementNode(DOMBaseNode):
 
 		return tag_str
 
-	@cached_property
+	@property
 	def hash(self) -> HashedDomElement:
-		from browser_use.dom.history_tree_processor.service import (
-			HistoryTreeProcessor,
+		from browser_use.dom.element_hash_processor.service import (
+			ElementHashProcessor,
 		)
 
-		return HistoryTreeProcessor._hash_dom_element(self)
+		return ElementHashProcessor.hash_dom_element(self)
 
 	def get_all_text_till_next_clickable_element(self, max_depth: int = -1) -> str:
 		text_parts = []
@@ -137,7 +150,7 @@ class DOMElementNode(DOMBaseNode):
 				return
 
 			# Skip this branch if we hit a highlighted element (except for the current node)
-			if isinstance(node, DOMElementNode) and node != self and node.highlight_index is not None:
+			if isinstance(node, DOMElementNode) and node is not self and node.highlight_index is not None:
 				return
 
 			if isinstance(node, DOMTextNode):
@@ -151,88 +164,102 @@ class DOMElementNode(DOMBaseNode):
 
 	@time_execution_sync('--clickable_elements_to_string')
 	def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
-		"""Convert the processed DOM content to HTML."""
-		formatted_text = []
-
-		def process_node(node: DOMBaseNode, depth: int) -> None:
-			next_depth = int(depth)
-			depth_str = depth * '\t'
-
+		"""
+		Convert the processed DOM content to HTML.
+
+		Single pass: the text of a highlighted element is collected while its subtree is
+		being serialized, and text nodes know from the traversal whether they are inside
+		a highlighted element.
+		"""
+		formatted_text: list[str] = []
+		attributes_key = tuple(include_attributes) if include_attributes else ()
+
+		def process_node(node: DOMBaseNode, depth: int, text_parts: list[str] | None) -> None:
+			"""text_parts collects text for the closest highlighted ancestor, None if there is none"""
 			if isinstance(node, DOMElementNode):
 				# Add element with highlight_index
 				if node.highlight_index is not None:
-					next_depth += 1
-
-					text = node.get_all_text_till_next_clickable_element()
-					attributes_html_str = ''
-					if include_attributes:
-						attributes_to_include = {
-							key: str(value) for key, value in node.attributes.items() if key in include_attributes
-						}
-
-						# Easy LLM optimizations
-						# if tag == role attribute, don't include it
-						if node.tag_name == attributes_to_include.get('role'):
-							del attributes_to_include['role']
-
-						# if aria-label == text of the node, don't include it
-						if (
-							attributes_to_include.get('aria-label')
-							and attributes_to_include.get('aria-label', '').strip() == text.strip()
-						):
-							del attributes_to_include['aria-label']
-
-						# if placeholder == text of the node, don't include it
-						if (
-							attributes_to_include.get('placeholder')
-							and attributes_to_include.get('placeholder', '').strip() == text.strip()
-						):
-							del attributes_to_include['placeholder']
-
-						if attributes_to_include:
-							# Format as key1='value1' key2='value2'
-							attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
-
-					# Build the line
-					if node.is_new:
-						highlight_indicator = f'*[{node.highlight_index}]*'
-					else:
-						highlight_indicator = f'[{node.highlight_index}]'
-
-					line = f'{depth_str}{highlight_indicator}<{node.tag_name}'
-
-					if attributes_html_str:
-						line += f' {attributes_html_str}'
-
-					if text:
-						# Add space before >text only if there were NO attributes added before
-						if not attributes_html_str:
-							line += ' '
-						line += f'>{text}'
-					# Add space before /> only if neither attributes NOR text were added
-					elif not attributes_html_str:
-						line += ' '
-
-					line += ' />'  # 1 token
-					formatted_text.append(line)
-
-				# Process children regardless
-				for child in node.children:
-					process_node(child, next_depth)
+					# Reserve the line, the text is only known once the children are processed
+					line_index = len(formatted_text)
+					formatted_text.append('')
+
+					own_text_parts: list[str] = []
+					for child in node.children:
+						process_node(child, depth + 1, own_text_parts)
+
+					text = '\n'.join(own_text_parts).strip()
+					formatted_text[line_index] = node._clickable_element_line(depth, text, attributes_key)
+				else:
+					# Process children regardless
+					for child in node.children:
+						process_node(child, depth, text_parts)
 
 			elif isinstance(node, DOMTextNode):
+				if text_parts is not None:
+					text_parts.append(node.text)
 				# Add text only if it doesn't have a highlighted parent
-				if (
-					not node.has_parent_with_highlight_index()
-					and node.parent
-					and node.parent.is_visible
-					and node.parent.is_top_element
-				):  # and node.is_parent_top_element()
+				elif node.parent and node.parent.is_visible and node.parent.is_top_element:
+					depth_str = depth * '\t'
 					formatted_text.append(f'{depth_str}{node.text}')
 
-		process_node(self, 0)
+		# Text below a highlighted ancestor of this node belongs to that ancestor and is not listed
+		inside_highlighted = False
+		current = self.parent
+		while current is not None and not inside_highlighted:
+			inside_highlighted = current.highlight_index is not None
+			current = current.parent
+
+		process_node(self, 0, [] if inside_highlighted else None)
 		return '\n'.join(formatted_text)
 
+	def _clickable_element_line(self, depth: int, text: str, include_attributes: tuple[str, ...]) -> str:
+		"""Format the line of a highlighted element"""
+		depth_str = depth * '\t'
+		attributes_html_str = ''
+		if include_attributes:
+			attributes_to_include = {key: str(value) for key, value in self.attributes.items() if key in include_attributes}
+
+			# Easy LLM optimizations
+			# if tag == role attribute, don't include it
+			if self.tag_name == attributes_to_include.get('role'):
+				del attributes_to_include['role']
+
+			# if aria-label == text of the node, don't include it
+			if attributes_to_include.get('aria-label') and attributes_to_include.get('aria-label', '').strip() == text.strip():
+				del attributes_to_include['aria-label']
+
+			# if placeholder == text of the node, don't include it
+			if attributes_to_include.get('placeholder') and attributes_to_include.get('placeholder', '').strip() == text.strip():
+				del attributes_to_include['placeholder']
+
+			if attributes_to_include:
+				# Format as key1='value1' key2='value2'
+				attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
+
+		# Build the line
+		if self.is_new:
+			highlight_indicator = f'*[{self.highlight_index}]*'
+		else:
+			highlight_indicator = f'[{self.highlight_index}]'
+
+		line = f'{depth_str}{highlight_indicator}<{self.tag_name}'
+
+		if attributes_html_str:
+			line += f' {attributes_html_str}'
+
+		if text:
+			# Add space before >text only if there were NO attributes added before
+			if not attributes_html_str:
+				line += ' '
+			line += f'>{text}'
+		# Add space before /> only if neither attributes NOR text were added
+		elif not attributes_html_str:
+			line += ' '
+
+		line += ' />'  # 1 token
+
+		return line
+
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']:
 		# Check if current element is a file input
 		if self.tag_name == 'input' and self.attributes.get('type') == 'file':
@@ -263,3 +290,6 @@ SelectorMap = dict[int, DOMElementNode]
 class DOMState:
 	element_tree: DOMElementNode
 	selector_map: SelectorMap
+
+	# Built on first use by HistoryTreeProcessor.get_history_index
+	_history_index: Optional['HistoryTreeIndex'] = field(default=None, init=False, repr=False, compare=False)
@@ -0,0 +1 @@
+# Unit tests for the browser_use core modules
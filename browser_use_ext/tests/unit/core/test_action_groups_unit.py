@@ -0,0 +1,84 @@
+"""
+Unit tests for grouping the actions of a step by their effects, see Agent._next_action_group.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from browser_use.agent.service import Agent
+from browser_use.controller.service import Controller
+
+
+@pytest.fixture
+def controller():
+	controller = Controller()
+
+	@controller.registry.action('Open a report in a tab of its own', effects='tab_local')
+	async def open_report(name: str):
+		pass
+
+	return controller
+
+
+def make_actions(controller: Controller, *actions: dict):
+	action_model = controller.registry.create_action_model()
+	return [action_model.model_validate(action) for action in actions]
+
+
+def group_names(controller: Controller, actions) -> list[tuple[list[str], str]]:
+	"""Split the actions of a step into groups like Agent.multi_act"""
+	agent = SimpleNamespace(controller=controller)
+	groups = []
+	start = 0
+	while start < len(actions):
+		group, effects = Agent._next_action_group(agent, actions, start)
+		groups.append(([next(iter(action.model_dump(exclude_unset=True))) for action in group], effects))
+		start += len(group)
+	return groups
+
+
+class TestNextActionGroup:
+	"""Test which neighbouring actions are grouped to run concurrently."""
+
+	def test_neighbouring_read_only_actions_are_grouped(self, controller):
+		actions = make_actions(
+			controller,
+			{'extract_content': {'goal': 'prices', 'should_strip_link_urls': True}},
+			{'get_dropdown_options': {'index': 3}},
+			{'scroll_down': {}},
+			{'extract_content': {'goal': 'ratings', 'should_strip_link_urls': True}},
+		)
+
+		assert group_names(controller, actions) == [
+			(['extract_content', 'get_dropdown_options'], 'read_only'),
+			(['scroll_down'], 'page_mutating'),
+			(['extract_content'], 'read_only'),
+		]
+
+	def test_page_mutating_actions_run_alone(self, controller):
+		actions = make_actions(
+			controller,
+			{'scroll_down': {}},
+			{'open_tab': {'url': 'https://example.com'}},
+			{'open_tab': {'url': 'https://example.org'}},
+		)
+
+		assert group_names(controller, actions) == [
+			(['scroll_down'], 'page_mutating'),
+			(['open_tab'], 'page_mutating'),
+			(['open_tab'], 'page_mutating'),
+		]
+
+	def test_tab_local_actions_are_not_grouped_with_read_only_ones(self, controller):
+		actions = make_actions(
+			controller,
+			{'open_report': {'name': 'sales'}},
+			{'open_report': {'name': 'costs'}},
+			{'extract_content': {'goal': 'totals', 'should_strip_link_urls': True}},
+		)
+
+		assert group_names(controller, actions) == [
+			(['open_report', 'open_report'], 'tab_local'),
+			(['extract_content'], 'read_only'),
+		]
@@ -0,0 +1,109 @@
+"""
+Unit tests for the cached action models of browser_use.controller.registry.service.Registry
+and the AgentOutput models built from them.
+"""
+
+from dataclasses import dataclass
+
+import pytest
+from pydantic import BaseModel
+
+from browser_use.agent.views import AgentOutput
+from browser_use.controller.registry.service import Registry
+
+
+@dataclass
+class FakePage:
+	"""Only the url is read by the domain filters"""
+
+	url: str
+
+
+class SearchParams(BaseModel):
+	query: str
+
+
+@pytest.fixture
+def events():
+	"""Telemetry events, captured instead of sent"""
+	return []
+
+
+@pytest.fixture
+def registry(events):
+	registry = Registry()
+	registry.telemetry.capture = events.append
+
+	@registry.action('Search the site', param_model=SearchParams)
+	async def search(params: SearchParams):
+		pass
+
+	@registry.action('Add to cart', param_model=SearchParams, domains=['*.example.com'])
+	async def add_to_cart(params: SearchParams):
+		pass
+
+	return registry
+
+
+class TestCreateActionModel:
+	"""Test that models are cached by the set of available actions."""
+
+	def test_pages_with_the_same_actions_share_a_model(self, registry, events):
+		first = registry.create_action_model(page=FakePage('https://shop.example.com/cart'))
+		second = registry.create_action_model(page=FakePage('https://www.example.com/search'))
+
+		assert first is second
+		assert set(first.model_fields) == {'search', 'add_to_cart'}
+		assert len(events) == 1
+
+	def test_different_actions_get_different_models(self, registry, events):
+		shop = registry.create_action_model(page=FakePage('https://shop.example.com/'))
+		other = registry.create_action_model(page=FakePage('https://other.org/'))
+
+		assert shop is not other
+		assert set(other.model_fields) == {'search'}
+		assert len(events) == 2
+
+	def test_key_ignores_the_order_of_include_actions(self, registry):
+		page = FakePage('https://shop.example.com/')
+		first = registry.create_action_model(include_actions=['search', 'add_to_cart'], page=page)
+		second = registry.create_action_model(include_actions=['add_to_cart', 'search'], page=page)
+
+		assert first is second
+
+	def test_registering_an_action_clears_the_cache(self, registry):
+		before = registry.create_action_model()
+
+		@registry.action('Go back')
+		async def go_back():
+			pass
+
+		after = registry.create_action_model()
+		assert after is not before
+		assert set(after.model_fields) == {'search', 'go_back'}
+
+
+class TestAgentOutputModels:
+	"""Test that AgentOutput models are cached per action model, in a bounded cache."""
+
+	def test_same_action_model_shares_an_output_model(self, registry):
+		action_model = registry.create_action_model()
+
+		assert AgentOutput.type_with_custom_actions(action_model) is AgentOutput.type_with_custom_actions(action_model)
+
+	def test_cache_is_bounded(self):
+		AgentOutput.type_with_custom_actions.cache_clear()
+		maxsize = AgentOutput.type_with_custom_actions.cache_info().maxsize
+		assert maxsize is not None
+
+		for _ in range(maxsize + 10):
+			registry = Registry()
+			registry.telemetry.capture = lambda event: None
+
+			@registry.action('Search the site', param_model=SearchParams)
+			async def search(params: SearchParams):
+				pass
+
+			AgentOutput.type_with_custom_actions(registry.create_action_model())
+
+		assert AgentOutput.type_with_custom_actions.cache_info().currsize == maxsize
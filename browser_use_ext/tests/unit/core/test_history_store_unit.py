@@ -0,0 +1,104 @@
+"""
+Unit tests for the on-disk agent history in browser_use.agent.history_store.
+"""
+
+import base64
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from browser_use.agent.history_store import HistoryStore
+from browser_use.agent.service import Agent
+from browser_use.agent.views import ActionResult, AgentHistory, AgentOutput
+from browser_use.browser.views import BrowserStateHistory, TabInfo
+
+PNG = base64.b64encode(b'\x89PNG\r\n\x1a\n' + b'\x00' * 16).decode('utf-8')
+
+
+def make_step(url: str, screenshot: str | None = None) -> AgentHistory:
+	state = BrowserStateHistory(
+		url=url,
+		title='Example',
+		tabs=[TabInfo(page_id=0, url=url, title='Example')],
+		interacted_element=[],
+		screenshot=screenshot,
+	)
+	return AgentHistory(model_output=None, result=[ActionResult(extracted_content=url)], state=state)
+
+
+class TestHistoryStore:
+	"""Test writing steps and reading them back."""
+
+	def test_round_trip(self, tmp_path):
+		store = HistoryStore(tmp_path / 'history')
+		steps = [make_step('https://example.com/a', PNG), make_step('https://example.com/b', PNG), make_step('about:blank')]
+		for step in steps:
+			store.append(step)
+
+		assert HistoryStore.is_store(tmp_path / 'history')
+		assert len(list((tmp_path / 'history' / 'screenshots').iterdir())) == 1
+
+		loaded = store.load(AgentOutput).history
+		assert [item.state.url for item in loaded] == ['https://example.com/a', 'https://example.com/b', 'about:blank']
+		assert [item.result[0].extracted_content for item in loaded] == [step.state.url for step in steps]
+		assert loaded[0].state.screenshot is None
+		assert loaded[0].state.get_screenshot() == PNG
+		assert loaded[2].state.screenshot_path is None
+
+	def test_screenshot_paths_do_not_depend_on_the_working_directory(self, tmp_path, monkeypatch):
+		monkeypatch.chdir(tmp_path)
+		store = HistoryStore('history')
+		step = make_step('https://example.com/', PNG)
+		store.append(step)
+		assert Path(step.state.screenshot_path).is_absolute()
+
+		(tmp_path / 'elsewhere').mkdir()
+		monkeypatch.chdir(tmp_path / 'elsewhere')
+		loaded = HistoryStore(tmp_path / 'history').load(AgentOutput).history
+		assert loaded[0].state.get_screenshot() == PNG
+
+	def test_reset_starts_a_new_run(self, tmp_path):
+		store = HistoryStore(tmp_path)
+		store.append(make_step('https://example.com/first-run'))
+		store.reset()
+		store.append(make_step('https://example.com/second-run'))
+
+		assert [item.state.url for item in store.load(AgentOutput).history] == ['https://example.com/second-run']
+
+	def test_skips_a_line_cut_off_by_a_killed_run(self, tmp_path):
+		store = HistoryStore(tmp_path)
+		store.append(make_step('https://example.com/'))
+		with open(store.steps_file, 'a', encoding='utf-8') as f:
+			f.write('{"model_output": null, "res')
+
+		assert len(store.load(AgentOutput).history) == 1
+
+
+class RecordingHistoryStore(HistoryStore):
+	"""Records the threads steps are appended in"""
+
+	def __init__(self, directory):
+		super().__init__(directory)
+		self.threads = []
+
+	def append(self, item):
+		self.threads.append(threading.current_thread())
+		super().append(item)
+
+
+class TestAgentHistoryStore:
+	"""Test how the agent writes its steps to the store."""
+
+	@pytest.mark.asyncio
+	async def test_steps_are_written_in_a_worker_thread(self, tmp_path):
+		store = RecordingHistoryStore(tmp_path)
+		agent = SimpleNamespace(state=SimpleNamespace(history=SimpleNamespace(history=[])), _history_store=store)
+		state = SimpleNamespace(url='https://example.com/', title='Example', tabs=[], screenshot=PNG)
+
+		await Agent._make_history_item(agent, None, state, [ActionResult(extracted_content='done')])
+
+		assert store.threads and store.threads[0] is not threading.main_thread()
+		assert agent.state.history.history[0].state.screenshot is None
+		assert store.load(AgentOutput).history[0].state.get_screenshot() == PNG
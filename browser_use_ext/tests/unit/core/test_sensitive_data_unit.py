@@ -0,0 +1,73 @@
+"""
+Unit tests for the <secret> placeholders in action params, see browser_use.controller.registry.service.
+"""
+
+from pydantic import BaseModel
+
+from browser_use.controller.registry.service import Registry, _contains_secret
+
+
+class LoginParams(BaseModel):
+	username: str
+	password: str
+	fields: dict[str, str] = {}
+	values: list[str] = []
+
+
+class NestedParams(BaseModel):
+	login: LoginParams
+	note: str = ''
+
+
+SENSITIVE_DATA = {'user': 'alice', 'pass': 'hunter2'}
+
+
+class TestContainsSecret:
+	"""Test the placeholder search through nested params."""
+
+	def test_plain_params(self):
+		assert not _contains_secret(LoginParams(username='alice', password='x', fields={'a': 'b'}, values=['c']))
+
+	def test_in_string_dict_and_list(self):
+		assert _contains_secret(LoginParams(username='<secret>user</secret>', password='x'))
+		assert _contains_secret(LoginParams(username='a', password='x', fields={'a': '<secret>pass</secret>'}))
+		assert _contains_secret(LoginParams(username='a', password='x', values=['<secret>pass</secret>']))
+
+	def test_in_nested_model(self):
+		assert _contains_secret(NestedParams(login=LoginParams(username='a', password='<secret>pass</secret>')))
+
+	def test_other_values(self):
+		assert not _contains_secret(None)
+		assert not _contains_secret(42)
+
+
+class TestReplaceSensitiveData:
+	"""Test that placeholders are replaced and params without them are returned as they are."""
+
+	def test_params_without_placeholders_are_returned_unchanged(self):
+		params = LoginParams(username='alice', password='secret')
+		assert Registry()._replace_sensitive_data(params, SENSITIVE_DATA) is params
+
+	def test_replaces_placeholders_everywhere(self):
+		params = NestedParams(
+			login=LoginParams(
+				username='<secret>user</secret>',
+				password='<secret>pass</secret>',
+				fields={'confirm': '<secret>pass</secret>'},
+				values=['id: <secret>user</secret>!'],
+			),
+			note='no secret here',
+		)
+		replaced = Registry()._replace_sensitive_data(params, SENSITIVE_DATA)
+
+		assert isinstance(replaced, NestedParams)
+		assert replaced.login.username == 'alice'
+		assert replaced.login.password == 'hunter2'
+		assert replaced.login.fields == {'confirm': 'hunter2'}
+		assert replaced.login.values == ['id: alice!']
+		assert replaced.note == 'no secret here'
+		assert params.login.username == '<secret>user</secret>'
+
+	def test_unknown_placeholder_is_kept(self):
+		params = LoginParams(username='<secret>missing</secret>', password='x')
+		assert Registry()._replace_sensitive_data(params, SENSITIVE_DATA).username == '<secret>missing</secret>'
@@ -0,0 +1,50 @@
+"""
+Unit tests for the element listing diffs in browser_use.agent.message_manager.state_diff.
+"""
+
+from browser_use.agent.message_manager.state_diff import diff_element_lines, normalize_element_lines
+
+
+class TestNormalizeElementLines:
+	"""Test that new element markers do not count as changes."""
+
+	def test_removes_new_element_marker(self):
+		text = '*[3]*<button>Buy />\n\t*[4]*<a>Details />\nSome text'
+		assert normalize_element_lines(text) == ['[3]<button>Buy />', '\t[4]<a>Details />', 'Some text']
+
+	def test_empty_listing(self):
+		assert normalize_element_lines('') == []
+
+
+class TestDiffElementLines:
+	"""Test the diff text and the number of changed lines."""
+
+	def test_no_changes(self):
+		lines = ['[0]<a>Home />', '[1]<a>About />']
+		diff = diff_element_lines(lines, lines)
+
+		assert diff.changed_lines == 0
+		assert diff.text == 'No changes since the page state above (2 lines)'
+
+	def test_added_removed_and_unchanged_runs(self):
+		previous = ['[0]<a>Home />', '[1]<a>About />', 'Welcome', '[2]<button>Old />', '[3]<a>Contact />']
+		current = ['[0]<a>Home />', '[1]<a>About />', 'Welcome', '[4]<button>New />', '[3]<a>Contact />']
+		diff = diff_element_lines(previous, current)
+
+		assert diff.changed_lines == 2
+		assert diff.text.split('\n') == [
+			'Changes since the page state above (- removed, + added or changed):',
+			'... 3 unchanged lines, elements [0] to [1] ...',
+			'- [2]<button>Old />',
+			'+ [4]<button>New />',
+			'... 1 unchanged line, element [3] ...',
+		]
+
+	def test_unchanged_run_without_elements(self):
+		diff = diff_element_lines(['Intro', '[0]<a>Old />'], ['Intro', '[0]<a>New />'])
+		assert diff.text.split('\n')[1] == '... 1 unchanged line ...'
+
+	def test_marker_only_change_is_unchanged(self):
+		previous = normalize_element_lines('[0]<a>Home />')
+		current = normalize_element_lines('*[0]*<a>Home />')
+		assert diff_element_lines(previous, current).changed_lines == 0
@@ -0,0 +1,67 @@
+"""
+Unit tests for using the prefetched state of a step, see Agent._get_step_state.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from browser_use.agent.service import Agent
+
+
+class FakeBrowserContext:
+	"""Counts fresh state captures"""
+
+	def __init__(self):
+		self.captures = 0
+
+	async def get_state(self, cache_clickable_elements_hashes: bool):
+		self.captures += 1
+		return 'fresh state'
+
+
+def make_agent(prefetch):
+	return SimpleNamespace(_state_prefetch=prefetch, browser_context=FakeBrowserContext())
+
+
+class TestGetStepState:
+	"""Test when the prefetched state is used and when the state is captured again."""
+
+	@pytest.mark.asyncio
+	async def test_uses_the_prefetched_state(self):
+		async def prefetched():
+			return 'prefetched state'
+
+		agent = make_agent(asyncio.create_task(prefetched()))
+		assert await Agent._get_step_state(agent) == 'prefetched state'
+		assert agent._state_prefetch is None
+		assert agent.browser_context.captures == 0
+
+	@pytest.mark.asyncio
+	async def test_cancelled_prefetch_is_captured_again(self):
+		prefetch = asyncio.create_task(asyncio.sleep(10))
+		prefetch.cancel()
+
+		agent = make_agent(prefetch)
+		assert await Agent._get_step_state(agent) == 'fresh state'
+		assert agent.browser_context.captures == 1
+
+	@pytest.mark.asyncio
+	async def test_failed_prefetch_is_captured_again(self):
+		async def failing():
+			raise RuntimeError('page closed')
+
+		agent = make_agent(asyncio.create_task(failing()))
+		assert await Agent._get_step_state(agent) == 'fresh state'
+
+	@pytest.mark.asyncio
+	async def test_outer_cancellation_is_not_swallowed(self):
+		agent = make_agent(asyncio.create_task(asyncio.sleep(10)))
+		step = asyncio.create_task(Agent._get_step_state(agent))
+		await asyncio.sleep(0)
+		step.cancel()
+
+		with pytest.raises(asyncio.CancelledError):
+			await step
+		assert agent.browser_context.captures == 0
@@ -0,0 +1,75 @@
+"""
+Unit tests for loading the tokenizer of browser_use.agent.message_manager.service.MessageManager.
+"""
+
+import threading
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from browser_use.agent.message_manager import service
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager.tokenizer import TokenCounter
+from browser_use.agent.views import MessageManagerState
+
+
+class CharacterCounter(TokenCounter):
+	"""One token per character"""
+
+	name = 'characters'
+
+	def _count_text(self, text: str) -> int:
+		return len(text)
+
+
+@pytest.fixture
+def loads(monkeypatch):
+	"""Threads get_token_counter was called in"""
+	loads = []
+
+	def get_token_counter(model_name, characters_per_token=3):
+		loads.append(threading.current_thread())
+		return CharacterCounter(model_name)
+
+	monkeypatch.setattr(service, 'get_token_counter', get_token_counter)
+	return loads
+
+
+def make_message_manager():
+	return MessageManager(
+		task='Find the price',
+		system_message=SystemMessage(content='You are a browser agent'),
+		settings=MessageManagerSettings(model_name='test-model', estimated_characters_per_token=3),
+		state=MessageManagerState(),
+	)
+
+
+class TestLoadTokenCounter:
+	"""Test that the tokenizer is loaded once, in a thread, and replaces the estimate."""
+
+	def test_estimates_until_loaded(self, loads):
+		message_manager = make_message_manager()
+		message_manager._add_message_with_tokens(HumanMessage(content='x' * 30))
+
+		assert loads == []
+		assert message_manager.state.history.messages[-1].metadata.tokens == 10
+
+	@pytest.mark.asyncio
+	async def test_loads_in_a_thread_once(self, loads):
+		message_manager = make_message_manager()
+		await message_manager.load_token_counter()
+		await message_manager.load_token_counter()
+
+		assert len(loads) == 1
+		assert loads[0] is not threading.main_thread()
+		assert message_manager.token_counter.name == 'characters'
+
+	@pytest.mark.asyncio
+	async def test_counts_earlier_messages_again(self, loads):
+		message_manager = make_message_manager()
+		message_manager._add_message_with_tokens(HumanMessage(content='x' * 30))
+		await message_manager.load_token_counter()
+
+		history = message_manager.state.history
+		assert history.messages[-1].metadata.tokens == 30
+		assert history.current_tokens == sum(message.metadata.tokens for message in history.messages)
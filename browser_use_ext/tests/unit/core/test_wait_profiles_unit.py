@@ -0,0 +1,187 @@
+"""
+Unit tests for the learned page load waits in browser_use.browser.wait_profiles.
+"""
+
+import pytest
+
+from browser_use.browser.wait_profiles import PageLoadSample, PageLoadWaits, WaitProfileStore
+
+
+class TestKey:
+	"""Test how URLs are grouped into profiles."""
+
+	def test_domain_only_by_default(self):
+		store = WaitProfileStore()
+		assert store.key('https://Shop.Example.com/cart/items?id=3') == 'shop.example.com'
+
+	def test_route_depth_replaces_id_segments(self):
+		store = WaitProfileStore(route_depth=2)
+		assert store.key('https://example.com/item/12345/reviews') == 'example.com/item/*'
+		assert store.key('https://example.com/search') == 'example.com/search'
+
+	def test_url_without_host(self):
+		assert WaitProfileStore().key('about:blank') is None
+
+
+DEFAULT = PageLoadWaits(minimum=0.5, idle=1.0, maximum=5.0)
+
+
+def record(store, url, seconds, timed_out=False, waits=DEFAULT, **sample):
+	store.record(url, PageLoadSample(seconds, timed_out, **sample), waits, DEFAULT)
+
+
+class TestMaximumWait:
+	"""Test the learned maximum and the hit and miss counts."""
+
+	def test_default_until_enough_samples(self):
+		store = WaitProfileStore()
+		for _ in range(WaitProfileStore.MIN_SAMPLES - 1):
+			record(store, 'https://example.com/', 0.5)
+
+		assert store.waits('https://example.com/', DEFAULT) == DEFAULT
+		assert store.metrics.misses == 1
+		assert store.metrics.hits == 0
+
+	def test_learned_from_percentile_with_headroom(self):
+		store = WaitProfileStore()
+		for seconds in (1.0, 1.2, 2.0):
+			record(store, 'https://example.com/', seconds)
+
+		assert store.waits('https://example.com/other', DEFAULT).maximum == pytest.approx(2.0 * WaitProfileStore.HEADROOM)
+		assert store.metrics.hits == 1
+
+	def test_floor_and_growth_limit(self):
+		fast = WaitProfileStore()
+		slow = WaitProfileStore()
+		for _ in range(WaitProfileStore.MIN_SAMPLES):
+			record(fast, 'https://fast.example.com/', 0.1)
+			record(slow, 'https://slow.example.com/', 30.0)
+
+		assert fast.waits('https://fast.example.com/', DEFAULT).maximum == WaitProfileStore.FLOOR
+		assert slow.waits('https://slow.example.com/', DEFAULT).maximum == 5.0 * WaitProfileStore.MAX_GROWTH
+
+	def test_keys_that_mostly_time_out_keep_the_default(self):
+		store = WaitProfileStore()
+		for timed_out in (True, True, False):
+			record(store, 'https://poll.example.com/', 1.0, timed_out)
+
+		assert store.waits('https://poll.example.com/', DEFAULT) == DEFAULT
+		assert store.metrics.misses == 1
+
+	def test_timeouts_cut_short_by_a_learned_maximum_are_not_percentiles(self):
+		store = WaitProfileStore()
+		for _ in range(WaitProfileStore.MAX_SAMPLES - 2):
+			record(store, 'https://example.com/', 0.5)
+		# The percentile falls on these, the pages took longer than the 1.5 seconds waited
+		for _ in range(2):
+			record(store, 'https://example.com/', 1.5, True)
+
+		assert store.waits('https://example.com/', DEFAULT).maximum == DEFAULT.maximum
+
+	def test_timeouts_below_the_percentile_are_ignored(self):
+		store = WaitProfileStore()
+		record(store, 'https://example.com/', 1.5, True)
+		for _ in range(WaitProfileStore.MAX_SAMPLES - 1):
+			record(store, 'https://example.com/', 2.0)
+
+		assert store.waits('https://example.com/', DEFAULT).maximum == pytest.approx(2.0 * WaitProfileStore.HEADROOM)
+
+
+class TestIdleAndMinimumWait:
+	"""Test the learned network idle and minimum waits."""
+
+	def test_idle_wait_from_the_longest_gaps(self):
+		store = WaitProfileStore()
+		for gap in (0.05, 0.2, 0.3):
+			record(store, 'https://example.com/', 1.0, idle_gap=gap)
+
+		assert store.waits('https://example.com/', DEFAULT).idle == pytest.approx(0.3 * WaitProfileStore.HEADROOM)
+
+	def test_idle_wait_limits(self):
+		quiet = WaitProfileStore()
+		bursty = WaitProfileStore()
+		for _ in range(WaitProfileStore.MIN_SAMPLES):
+			record(quiet, 'https://example.com/', 1.0, idle_gap=0.0)
+			record(bursty, 'https://example.com/', 1.0, idle_gap=0.9)
+
+		assert quiet.waits('https://example.com/', DEFAULT).idle == WaitProfileStore.IDLE_FLOOR
+		assert bursty.waits('https://example.com/', DEFAULT).idle == DEFAULT.idle
+
+	def test_minimum_wait_from_dom_settle_times(self):
+		store = WaitProfileStore()
+		for settled in (0.1, 0.15, 0.2):
+			record(store, 'https://example.com/', 0.1, dom_settled=settled)
+
+		waits = store.waits('https://example.com/', DEFAULT)
+		assert waits.minimum == pytest.approx(0.2 * WaitProfileStore.HEADROOM)
+		assert waits.maximum == WaitProfileStore.FLOOR
+
+	def test_dom_still_changing_keeps_the_minimum(self):
+		store = WaitProfileStore()
+		for changed in (False, False, True):
+			record(store, 'https://example.com/', 0.1, dom_settled=0.5, dom_timed_out=changed)
+
+		assert store.waits('https://example.com/', DEFAULT).minimum == DEFAULT.minimum
+
+	def test_loads_without_observations_are_skipped(self):
+		store = WaitProfileStore()
+		for _ in range(WaitProfileStore.MIN_SAMPLES):
+			record(store, 'https://example.com/', 2.0)
+
+		waits = store.waits('https://example.com/', DEFAULT)
+		assert (waits.minimum, waits.idle) == (DEFAULT.minimum, DEFAULT.idle)
+
+
+class TestRecord:
+	"""Test the stored samples and the saved and extra wait metrics."""
+
+	def test_keeps_the_last_samples(self):
+		store = WaitProfileStore()
+		for i in range(WaitProfileStore.MAX_SAMPLES + 5):
+			record(store, 'https://example.com/', float(i))
+
+		samples = store._samples['example.com']
+		assert len(samples) == WaitProfileStore.MAX_SAMPLES
+		assert samples[0].seconds == 5.0
+
+	def test_ignores_urls_without_host(self):
+		store = WaitProfileStore()
+		record(store, 'about:blank', 1.0)
+		assert store._samples == {}
+
+	def test_time_saved_and_extra_wait(self):
+		store = WaitProfileStore()
+		record(store, 'https://example.com/', 2.0, True, PageLoadWaits(minimum=0.5, idle=1.0, maximum=2.0))
+		record(store, 'https://example.com/', 7.0, False, PageLoadWaits(minimum=0.5, idle=1.0, maximum=10.0))
+
+		assert store.metrics.time_saved == pytest.approx(3.0)
+		assert store.metrics.extra_wait == pytest.approx(2.0)
+
+	def test_time_saved_by_idle_and_minimum_waits(self):
+		store = WaitProfileStore()
+		record(store, 'https://example.com/', 0.2, False, PageLoadWaits(minimum=0.3, idle=0.4, maximum=5.0))
+
+		assert store.metrics.time_saved == pytest.approx((1.0 - 0.4) + (0.5 - 0.3))
+
+	@pytest.mark.asyncio
+	async def test_save_and_load(self, tmp_path):
+		file = tmp_path / 'profiles' / 'waits.json'
+		store = WaitProfileStore(str(file))
+		record(store, 'https://example.com/', 1.5, idle_gap=0.2)
+		await store.save()
+
+		loaded = WaitProfileStore(str(file))
+		record(loaded, 'https://example.com/', 2.5)
+		await loaded.load()
+		assert loaded._samples == {
+			'example.com': [PageLoadSample(1.5, False, idle_gap=0.2), PageLoadSample(2.5, False)],
+		}
+
+	@pytest.mark.asyncio
+	async def test_load_samples_without_idle_and_dom_times(self, tmp_path):
+		file = tmp_path / 'waits.json'
+		file.write_text('{"example.com": [[1.5, false]]}')
+
+		store = WaitProfileStore(str(file))
+		await store.load()
+		assert store._samples == {'example.com': [PageLoadSample(1.5, False)]}